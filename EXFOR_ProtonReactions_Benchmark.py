@@ -0,0 +1,471 @@
+"""
+================================================================================
+TITLE: Benchmark Suite and Synthetic EXFORTABLES Tree Generator
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script measures the performance of the preprocessing pipeline on
+    synthetic data, so that the effect of any change can be compared against a
+    reference. It generates EXFORTABLES-like directory trees whose files follow
+    the header layout parsed by `read_experiment` (including the column variants
+    found in the real database: a leading 'Z' column, missing dE or missing
+    dxs and dE), and times ingestion, the binary and text round-trips,
+    `to_dataframe`/`prepare_data`, classification, `clean_dataframe` and the
+    IQR method at several scales, reporting throughput and memory.
+
+MAIN FEATURES:
+    - Synthetic EXFORTABLES tree generator with configurable number of files,
+      points per file and column variants (plus 'list'/'ruth' files that must
+      be skipped).
+    - Benchmark of every stage of the pipeline at several scales.
+    - Throughput (items per second) and resident set size (change over the stage
+      and lifetime peak of the process) per stage.
+    - Import time of the core and plotting modules in fresh interpreters.
+    - Results as a DataFrame, optionally saved to CSV.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - UtilityFunctions (custom module)
+    - OutlierDetection (custom module)
+    - Instrumentation (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Benchmark as bm`
+    2. Generate a tree: `bm.generate_exfortables_tree('synthetic/p', n_files=1000)`
+    3. Run the benchmarks: `results = bm.run_benchmarks(scales=(100, 1000, 10000), output='benchmark.csv')`
+    4. From a terminal: `python EXFOR_ProtonReactions_Benchmark.py 100 1000 --output benchmark.csv`
+    5. Import times: `bm.benchmark_import_time()` or `python EXFOR_ProtonReactions_Benchmark.py --import-time`
+================================================================================
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import subprocess
+import tempfile
+import contextlib
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_UtilityFunctions import (read_proton_experiments_from_exfortables, write_experiments_to_binary,
+                                                    read_experiments_from_binary, write_experiments_to_txt,
+                                                    read_experiments_from_txt, classify_experiments_by_data,
+                                                    clean_dataframe)
+from EXFOR_ProtonReactions_OutlierDetection import IQR_method
+from EXFOR_ProtonReactions_Instrumentation import Instrumentation
+
+
+# Targets of the synthetic database: (Z, A, directory name)
+SYNTHETIC_TARGETS = [(8, 16, 'O016'), (13, 27, 'Al027'), (26, 56, 'Fe056'), (28, 58, 'Ni058'),
+                     (29, 63, 'Cu063'), (40, 90, 'Zr090'), (79, 197, 'Au197'), (92, 238, 'U238')]
+
+# Channels of the synthetic database: (reaction, change of Z, change of A, quantity, MF, MT, data header)
+SYNTHETIC_CHANNELS = [('(p,n)', 1, 0, 'Cross section', 3, 4, ['E', 'xs', 'dxs', 'dE']),
+                      ('(p,2n)', 1, -1, 'Cross section', 3, 16, ['E', 'xs', 'dxs', 'dE']),
+                      ('(p,a)', -1, -3, 'Cross section', 3, 107, ['E', 'xs', 'dxs', 'dE']),
+                      ('(p,g)', 1, 1, 'Cross section', 3, 102, ['E', 'xs', 'dxs', 'dE']),
+                      ('(p,el)', 0, 0, 'Angular distribution', 4, 2, ['Angle', 'dxs/dAngle', 'ddxs/dAngle', 'dAngle']),
+                      ('(p,f)', None, None, 'Fission yields', 8, 454, ['Z', 'A', 'FY', 'dFY'])]
+
+# Column variants and their default fraction of files
+SYNTHETIC_VARIANTS = {'full': 0.6, 'no_dE': 0.2, 'no_uncertainties': 0.1, 'Z': 0.1}
+
+# Modules whose import time is measured by benchmark_import_time: the core API first, then the plotting modules
+IMPORT_MODULES = ['EXFOR_ProtonReactions_Experiment_Class', 'EXFOR_ProtonReactions_UtilityFunctions',
+                  'EXFOR_ProtonReactions_OutlierDetection', 'EXFOR_ProtonReactions_Plotting']
+
+# Heavy libraries reported as loaded (or not) by each import
+HEAVY_LIBRARIES = ['matplotlib', 'seaborn', 'sklearn']
+
+# Code run in a fresh interpreter to time an import
+_IMPORT_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {libraries!r} if name in sys.modules]}}))
+"""
+
+
+def write_synthetic_experiment(filename, target, channel, x4_id, year, n_points, variant, rng):
+    """
+    Writes one synthetic experiment file in the EXFORTABLES format parsed by `read_experiment`.
+
+    Parameters:
+    -----------
+    filename : str
+        The name of the file.
+    target : tuple
+        (Z, A, name) of the target (see SYNTHETIC_TARGETS).
+    channel : tuple
+        The reaction channel (see SYNTHETIC_CHANNELS).
+    x4_id : str
+        EXFOR ID of the experiment.
+    year : int
+        Year of the experiment.
+    n_points : int
+        Number of data points.
+    variant : str
+        'full' (four columns), 'no_dE' (no energy uncertainty), 'no_uncertainties' (only two values per row) or
+        'Z' (fission yields with leading 'Z' and 'A' columns).
+    rng : np.random.Generator
+        Random number generator.
+    """
+    target_Z, target_A, _ = target
+    reaction, dZ, dA, quantity, MF, MT, header = channel
+    final_Z = '' if dZ is None else ' {}'.format(target_Z + dZ)
+    final_A = '' if dA is None else ' {}'.format(target_A + dA)
+
+    # Smooth excitation function (or distribution) with some noise
+    if variant == 'Z':
+        x = np.sort(rng.integers(30, 65, n_points)).astype(float)
+        y = 2e-2 * np.exp(-0.5 * ((x - 46) / 6) ** 2) * rng.lognormal(0, 0.1, n_points)
+        columns = [x, np.round(x * 2.5), y, 0.1 * y]
+    else:
+        x = np.sort(rng.uniform(1, 180 if MF == 4 else 200, n_points))
+        y = 100 * np.exp(-0.5 * ((np.log(x) - 3) / 0.8) ** 2) * rng.lognormal(0, 0.05, n_points) + 1e-3
+        columns = [x, y, rng.uniform(0.03, 0.15) * y, 0.01 * x]
+    n_values = {'full': 4, 'Z': 4, 'no_dE': 3, 'no_uncertainties': 2}[variant]
+
+    lines = ['# Header      :\n',
+             '# Target Z    :  {}\n'.format(target_Z),
+             '# Target A    :  {}\n'.format(target_A),
+             '# Target state:\n',
+             '# Projectile  : p\n',
+             '# Reaction    : {}\n'.format(reaction),
+             '# E-inc       :\n',
+             '# Final Z     :{}\n'.format(final_Z),
+             '# Final A     :{}\n'.format(final_A),
+             '# Final state :\n',
+             '# MTrat       :\n',
+             '# Ratio isomer:\n',
+             '# Quantity    : {}\n'.format(quantity),
+             '# Frame       : L\n',
+             '# MF          : {}\n'.format(MF),
+             '# MT          : {}\n'.format(MT),
+             '# X4 ID       : {}\n'.format(x4_id),
+             '# X4 code     : {}\n'.format(x4_id[:5]),
+             '# Author      : Synthetic Author {}\n'.format(x4_id[1:3]),
+             '# Year        : {}\n'.format(year),
+             '# Data points : {}\n'.format(n_points),
+             '#' + ''.join('{:>15}'.format(column) for column in header) + '\n']
+    data = np.column_stack(columns[:n_values])
+    lines += [' '.join('{:14.6e}'.format(value) for value in row) + '\n' for row in data]
+    lines += ['# Reference   :\n', '# Synthetic reference for {}, J. Bench. {} ({})\n'.format(x4_id, year % 100, year), '#\n']
+
+    with open(filename, 'w') as f:
+        f.write(''.join(lines))
+
+
+def generate_exfortables_tree(root, n_files=1000, points=(5, 60), variants=None, experiments_per_channel=8,
+                              flat_fraction=0.2, seed=0):
+    """
+    Generates a synthetic EXFORTABLES tree of proton experiments.
+
+    The files are written to 'root/<target>/<p,reaction>/<quantity>/<file>' or, for a fraction of the channels,
+    directly to 'root/<target>/<p,reaction>/<file>'. Each leaf directory also gets a '.list' file and some get a
+    '.ruth' file, which the readers must skip. Experiments are spread over the channels so that each channel has
+    about `experiments_per_channel` experiments (needed by the group-based outlier methods).
+
+    Parameters:
+    -----------
+    root : str
+        Root directory of the tree (created if it does not exist).
+    n_files : int, optional
+        Number of experiment files. Default is 1000.
+    points : tuple, optional
+        (minimum, maximum) number of points per file. Default is (5, 60).
+    variants : dict, optional
+        Fraction of files of each column variant (see `write_synthetic_experiment`). Default is SYNTHETIC_VARIANTS.
+    experiments_per_channel : int, optional
+        Average number of experiments per target and channel. Default is 8.
+    flat_fraction : float, optional
+        Fraction of the channels whose files are not in a quantity subdirectory. Default is 0.2.
+    seed : int, optional
+        Seed of the random number generator. Default is 0.
+
+    Returns:
+    --------
+    dict
+        Number of files, of data points and of skipped ('list'/'ruth') files written.
+
+    Example:
+    --------
+    generate_exfortables_tree('synthetic/p', n_files=5000, points=(10, 200), variants={'full': 0.8, 'Z': 0.2})
+    """
+    rng = np.random.default_rng(seed)
+    variants = SYNTHETIC_VARIANTS if variants is None else variants
+    names = list(variants)
+    probabilities = np.array([variants[name] for name in names], dtype=float)
+    probabilities /= probabilities.sum()
+
+    # Non-fission channels get the regular variants; fission yields always have the 'Z' layout
+    regular = [channel for channel in SYNTHETIC_CHANNELS if channel[0] != '(p,f)']
+    fission = [channel for channel in SYNTHETIC_CHANNELS if channel[0] == '(p,f)']
+    n_channels = max(1, int(np.ceil(n_files / experiments_per_channel)))
+
+    summary = {'files': 0, 'points': 0, 'skipped_files': 0}
+    directories = {}
+    for i in range(n_files):
+        variant = names[rng.choice(len(names), p=probabilities)]
+        channel_number = int(rng.integers(n_channels))
+        target = SYNTHETIC_TARGETS[channel_number % len(SYNTHETIC_TARGETS)]
+        if variant == 'Z':
+            channel = fission[0]
+        else:
+            channel = regular[(channel_number // len(SYNTHETIC_TARGETS)) % len(regular)]
+
+        # Leaf directory of the channel (some channels without quantity subdirectory)
+        key = (target[2], channel[0])
+        if key not in directories:
+            reaction_dir = os.path.join(root, target[2], 'p,' + channel[0][3:-1])
+            flat = rng.random() < flat_fraction
+            directories[key] = reaction_dir if flat else os.path.join(reaction_dir, channel[3].replace(' ', '_').lower())
+            os.makedirs(directories[key], exist_ok=True)
+            # Files that are not experiments
+            base = 'p-{}-MT{:03d}'.format(target[2], channel[5])
+            with open(os.path.join(directories[key], base + '.list'), 'w') as f:
+                f.write('# List of experiments\n')
+            summary['skipped_files'] += 1
+            if rng.random() < 0.3:
+                with open(os.path.join(directories[key], base + '.ruth'), 'w') as f:
+                    f.write('# Rutherford ratios\n')
+                summary['skipped_files'] += 1
+
+        n_points = int(rng.integers(points[0], points[1] + 1))
+        x4_id = '{}{:05d}{:03d}'.format('ABCDEO'[i % 6], 10000 + i // 3, 2 + i % 3)
+        filename = os.path.join(directories[key], 'p-{}-MT{:03d}-E{:06d}.{}'.format(target[2], channel[5], i, x4_id))
+        write_synthetic_experiment(filename, target, channel, x4_id, 1960 + int(rng.integers(64)), n_points, variant, rng)
+        summary['files'] += 1
+        summary['points'] += n_points
+
+    return summary
+
+
+def _largest_classified_group(directory):
+    """
+    Returns the largest 'EXFOR_ProtonReactions_Classified_Group_*.csv' file written in a directory.
+    """
+    files = [f for f in os.listdir(directory) if f.startswith('EXFOR_ProtonReactions_Classified_Group_')]
+    return max((os.path.join(directory, f) for f in files), key=os.path.getsize) if files else None
+
+
+def benchmark_scale(n_files, workdir, points=(5, 60), variants=None, min_observations=20, seed=0, quiet=True):
+    """
+    Runs every benchmark for one synthetic database size.
+
+    Parameters:
+    -----------
+    n_files : int
+        Number of experiment files of the synthetic tree.
+    workdir : str
+        Directory where the tree and the intermediate files are written.
+    points : tuple, optional
+        (minimum, maximum) number of points per file. Default is (5, 60).
+    variants : dict, optional
+        Fraction of files of each column variant. Default is SYNTHETIC_VARIANTS.
+    min_observations : int, optional
+        Minimum group size of the IQR method. Default is 20.
+    seed : int, optional
+        Seed of the tree generator. Default is 0.
+    quiet : bool, optional
+        Whether to hide the output of the benchmarked functions. Default is True.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per stage with the time, the number of items, the throughput, the change of the resident set
+        size over the stage and the peak resident set size of the process up to the end of the stage.
+    """
+    inst = Instrumentation(progress_interval=float('inf'))
+    units = {}
+    tree = os.path.join(workdir, 'p')
+    output = io.StringIO() if quiet else None
+
+    def stage(name, unit):
+        units[name] = unit
+        return inst.stage(name)
+
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        with stage('generate', 'files') as record:
+            summary = generate_exfortables_tree(tree, n_files, points=points, variants=variants, seed=seed)
+            record['items'] = summary['files']
+
+        with stage('ingestion', 'files') as record:
+            experiments = read_proton_experiments_from_exfortables(tree, progress=False)
+            record['items'] = len(experiments)
+        n_points = int(sum(len(experiment.data) for experiment in experiments))
+
+        binary = os.path.join(workdir, 'database.bin')
+        with stage('binary_write', 'experiments') as record:
+            write_experiments_to_binary(experiments, binary)
+            record['items'] = len(experiments)
+        with stage('binary_read', 'experiments') as record:
+            record['items'] = len(read_experiments_from_binary(binary))
+
+        text = os.path.join(workdir, 'database.txt')
+        with stage('text_write', 'experiments') as record:
+            write_experiments_to_txt(experiments, text)
+            record['items'] = len(experiments)
+        with stage('text_read', 'experiments') as record:
+            record['items'] = len(read_experiments_from_txt(text))
+
+        with stage('to_dataframe', 'experiments') as record:
+            for experiment in experiments:
+                experiment.to_dataframe()
+            record['items'] = len(experiments)
+        # prepare_data adds the prepared columns to experiment.data, so every stage that calls it gets a fresh
+        # copy of the database (as in the notebooks, which read the binary file again)
+        prepared = read_experiments_from_binary(binary)
+        with stage('prepare_data', 'experiments') as record:
+            for experiment in prepared:
+                experiment.prepare_data()
+            record['items'] = len(prepared)
+        del prepared
+
+        classified = os.path.join(workdir, 'classified')
+        prepared = read_experiments_from_binary(binary)
+        with stage('classify', 'experiments') as record:
+            classify_experiments_by_data(prepared, progress=False, output_dir=classified)
+            record['items'] = len(prepared)
+        del prepared
+
+        group = _largest_classified_group(classified)
+        df = pd.read_csv(group)
+        with stage('clean', 'rows') as record:
+            df = clean_dataframe(df)
+            record['items'] = len(df)
+        with stage('IQR', 'rows') as record:
+            IQR_method(df, experiments, min_observations=min_observations)
+            record['items'] = len(df)
+
+    rows = []
+    for name, values in inst.report()['stages'].items():
+        rows.append({'n_files': n_files, 'n_points': n_points, 'stage': name, 'seconds': values['wall_s'],
+                     'items': values['items'], 'unit': units[name], 'items_per_s': values.get('items_per_s'),
+                     'rss_delta_mb': values['rss_delta_mb'],
+                     'lifetime_peak_rss_mb': values['lifetime_peak_rss_mb']})
+    return pd.DataFrame(rows)
+
+
+def run_benchmarks(scales=(100, 1000), points=(5, 60), variants=None, workdir=None, keep=False, output=None, seed=0):
+    """
+    Runs the benchmark suite at several database sizes and prints a summary table.
+
+    Parameters:
+    -----------
+    scales : tuple, optional
+        Numbers of experiment files of the synthetic databases. Default is (100, 1000).
+    points : tuple, optional
+        (minimum, maximum) number of points per file. Default is (5, 60).
+    variants : dict, optional
+        Fraction of files of each column variant. Default is SYNTHETIC_VARIANTS.
+    workdir : str, optional
+        Directory for the synthetic trees and intermediate files. Default is a temporary directory.
+    keep : bool, optional
+        Whether to keep the generated files. Default is False.
+    output : str, optional
+        CSV file where the results are saved. Default is None.
+    seed : int, optional
+        Seed of the tree generator. Default is 0.
+
+    Returns:
+    --------
+    results : pd.DataFrame
+        One row per scale and stage (see `benchmark_scale`).
+
+    Notes:
+    ------
+    'rss_delta_mb' is the memory kept by every stage. 'lifetime_peak_rss_mb' is the peak of the whole process
+    up to the end of each stage, so it is non-decreasing along the run; run a single scale per process to compare
+    the peak memory of different scales.
+    """
+    base = workdir if workdir is not None else tempfile.mkdtemp(prefix='exfor_benchmark_')
+    results = []
+    try:
+        for n_files in scales:
+            scale_dir = os.path.join(base, 'scale_{}'.format(n_files))
+            if os.path.exists(scale_dir):
+                shutil.rmtree(scale_dir)
+            os.makedirs(scale_dir)
+            print('Benchmarking {} files...'.format(n_files))
+            results.append(benchmark_scale(n_files, scale_dir, points=points, variants=variants, seed=seed))
+            if not keep:
+                shutil.rmtree(scale_dir)
+    finally:
+        if workdir is None and not keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+    results = pd.concat(results, ignore_index=True)
+    with pd.option_context('display.max_rows', None, 'display.width', 140):
+        print(results.to_string(index=False, float_format=lambda value: '{:.3f}'.format(value)))
+    if output is not None:
+        results.to_csv(output, index=False)
+    return results
+
+
+def benchmark_import_time(modules=None, repeats=5):
+    """
+    Measures the time needed to import every module in a fresh Python interpreter.
+
+    Every import is run `repeats` times in a new process (with the directory of this script in the path), so
+    that nothing is cached by the current process. The first run also warms up the disk cache and the compiled
+    bytecode, which is why the median is reported.
+
+    Parameters:
+    -----------
+    modules : list, optional
+        Names of the modules to import. Default is IMPORT_MODULES.
+    repeats : int, optional
+        Number of imports of every module. Default is 5.
+
+    Returns:
+    --------
+    results : pd.DataFrame
+        One row per module with the median and minimum import time (s), the median wall time of the whole
+        process (s, including the start of the interpreter) and the heavy libraries (HEAVY_LIBRARIES) it loads.
+    """
+    modules = IMPORT_MODULES if modules is None else modules
+    directory = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [directory, os.environ.get('PYTHONPATH')])))
+
+    rows = []
+    for module in modules:
+        script = _IMPORT_SCRIPT.format(module=module, libraries=HEAVY_LIBRARIES)
+        imports, processes, loaded = [], [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                       cwd=directory, env=environment, check=True)
+            processes.append(time.perf_counter() - start)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            imports.append(result['seconds'])
+            loaded = result['loaded']
+        rows.append({'module': module, 'import_s': float(np.median(imports)), 'min_import_s': min(imports),
+                     'process_s': float(np.median(processes)), 'loads': ', '.join(loaded) or '-'})
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False, float_format=lambda value: '{:.3f}'.format(value)))
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the EXFOR proton reactions pipeline on synthetic data.')
+    parser.add_argument('scales', nargs='*', type=int, default=[100, 1000], help='Numbers of files to benchmark.')
+    parser.add_argument('--points', nargs=2, type=int, default=[5, 60], help='Minimum and maximum points per file.')
+    parser.add_argument('--workdir', default=None, help='Directory for the generated files.')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated files.')
+    parser.add_argument('--output', default=None, help='CSV file for the results.')
+    parser.add_argument('--import-time', action='store_true', help='Measure the import time of the modules instead.')
+    args = parser.parse_args()
+    if args.import_time:
+        results = benchmark_import_time()
+        if args.output is not None:
+            results.to_csv(args.output, index=False)
+        sys.exit()
+    run_benchmarks(tuple(args.scales), tuple(args.points), workdir=args.workdir, keep=args.keep, output=args.output)
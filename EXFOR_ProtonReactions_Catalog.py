@@ -0,0 +1,420 @@
+"""
+================================================================================
+TITLE: SQLite Catalog of the Experiment Database
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script exports the experiment database to an SQLite file so that
+    catalog questions (which targets have (p,xn) data after 2000, how many
+    experiments there are per MT and quantity, ...) can be answered with
+    indexed queries instead of loading the whole binary database and looping
+    over the Experiment objects. Every experiment is a row of the
+    'experiments' table with all its attributes and its data stored as a
+    compact NumPy blob, which is only decoded for the experiments that are
+    actually requested. Optionally, the points are also stored in a 'points'
+    table (abscissa, value and uncertainty, as in the point table) for range
+    queries in SQL.
+
+MAIN FEATURES:
+    - Export of a list of experiments to an indexed SQLite catalog.
+    - Indexes on target Z/A, reaction, quantity, MF/MT, year and X4_ID.
+    - `filter_experiments` and `get_unique_values` run on the catalog, decoding
+      only the data of the matching experiments.
+    - Free SQL conditions, counts per attribute and point-range queries.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - sqlite3 (standard library)
+    - Experiment (custom class)
+    - PointTable (custom module)
+
+USAGE:
+    1. Export: `write_catalog(experiments, 'EXFOR_ProtonReactions_Catalog.sqlite', points_table=True)`
+    2. Open: `catalog = ExperimentCatalog('EXFOR_ProtonReactions_Catalog.sqlite')`
+    3. Query: `catalog.filter_experiments('MT', 5)`, `catalog.get_unique_values('year')`
+    4. Catalog questions: `catalog.get_unique_values('target_Z', where='reaction = ? AND year > ?', params=('(p,n)', 2000))`
+       or `catalog.count(['MT', 'quantity'])`
+================================================================================
+"""
+
+import io
+import os
+import sqlite3
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import Experiment
+from EXFOR_ProtonReactions_PointTable import build_point_table
+
+
+# Indexes of the experiments table: (index name, columns)
+CATALOG_INDEXES = [('idx_target', ['target_Z', 'target_A']),
+                   ('idx_reaction', ['reaction']),
+                   ('idx_quantity', ['quantity']),
+                   ('idx_mf_mt', ['MF', 'MT']),
+                   ('idx_year', ['year']),
+                   ('idx_x4_id', ['X4_ID'])]
+
+# Columns of the experiments table that are not Experiment attributes
+_EXTRA_COLUMNS = ['data_columns', 'n_points', 'data_blob']
+
+
+def _quote(name):
+    """
+    Quotes an identifier (column or table name) for SQL.
+    """
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _sql_value(value):
+    """
+    Converts an attribute value into a value that sqlite3 can store (NumPy scalars become Python scalars).
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def encode_data(data):
+    """
+    Encodes the data of an experiment as the bytes of a 2D float64 `.npy` array (one column per data column).
+
+    Text-loaded experiments store strings: they are converted to numbers (invalid values become NaN).
+    """
+    values = np.column_stack([pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=np.float64)
+                              for column in data.columns]) if data.shape[1] else np.empty((len(data), 0))
+    buffer = io.BytesIO()
+    np.save(buffer, values, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_data(blob, columns):
+    """
+    Decodes the bytes written by `encode_data` into a DataFrame with the given column names.
+    """
+    values = np.load(io.BytesIO(blob), allow_pickle=False)
+    return pd.DataFrame(values, columns=columns)
+
+
+def write_catalog(experiments, filename, points_table=False):
+    """
+    Exports a list of experiments to an SQLite catalog. An existing file is replaced.
+
+    The 'experiments' table has one row per experiment with every attribute (stored with its Python type, so
+    the values compare as in the Experiment objects), the names of the data columns, the number of points and
+    the data as a NumPy blob. With `points_table`, the 'points' table stores the abscissa, value and uncertainty
+    of every point (see `build_point_table`), indexed by experiment.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects with an 'exp_id'.
+    filename : str
+        The name of the SQLite file.
+    points_table : bool, optional
+        Whether to write the 'points' table. Default is False.
+
+    Example:
+    --------
+    write_catalog(read_experiments_from_binary('EXFOR_ProtonReactions_Database.bin'), 'catalog.sqlite')
+    """
+    # Every attribute found in the experiments, in the order of the Experiment class
+    attributes = [name for name in vars(Experiment()) if name != 'data']
+    for experiment in experiments:
+        for name in vars(experiment):
+            if name != 'data' and name not in attributes:
+                attributes.append(name)
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    try:
+        with connection:
+            # Columns without a declared type keep the type of every value (no conversion of '1' into 1, ...)
+            columns = ['{} INTEGER PRIMARY KEY'.format(_quote(name)) if name == 'exp_id' else _quote(name)
+                       for name in attributes]
+            columns += ['data_columns TEXT', 'n_points INTEGER', 'data_blob BLOB']
+            connection.execute('CREATE TABLE experiments ({})'.format(', '.join(columns)))
+            insert = 'INSERT INTO experiments ({}) VALUES ({})'.format(
+                ', '.join(_quote(name) for name in attributes + _EXTRA_COLUMNS),
+                ', '.join('?' * (len(attributes) + len(_EXTRA_COLUMNS))))
+            connection.executemany(insert, (
+                [_sql_value(getattr(experiment, name, None)) for name in attributes]
+                + [' '.join(str(column) for column in experiment.data.columns), len(experiment.data),
+                   encode_data(experiment.data)]
+                for experiment in experiments))
+
+            # Indexes are built after the inserts, which is faster than updating them row by row
+            for name, index_columns in CATALOG_INDEXES:
+                if all(column in attributes for column in index_columns):
+                    connection.execute('CREATE INDEX {} ON experiments ({})'.format(
+                        name, ', '.join(_quote(column) for column in index_columns)))
+
+            if points_table:
+                table = build_point_table(experiments)
+                connection.execute('CREATE TABLE points (exp_id INTEGER, point_index INTEGER, x REAL, y REAL, dy REAL)')
+                dy = np.where(np.isnan(table.dy), None, table.dy).tolist()
+                connection.executemany('INSERT INTO points VALUES (?, ?, ?, ?, ?)',
+                                       zip(table.exp_id[table.exp_index].tolist(), table.point_index.tolist(),
+                                           table.x.tolist(), table.y.tolist(), dy))
+                connection.execute('CREATE INDEX idx_points_exp_id ON points (exp_id, x)')
+    finally:
+        connection.close()
+    print('{} experiments written to {}'.format(len(experiments), filename))
+
+
+class ExperimentCatalog:
+    """
+    Query layer of an SQLite catalog written by `write_catalog`.
+
+    Example:
+    --------
+    with ExperimentCatalog('catalog.sqlite') as catalog:
+        targets = catalog.query("reaction LIKE '(p,%n)' AND year > 2000", columns=['target_Z', 'target_A'])
+    """
+    def __init__(self, filename):
+        """
+        Opens a catalog (read-only).
+
+        Parameters:
+        -----------
+        filename : str
+            The name of the SQLite file.
+        """
+        self.filename = filename                                    # Name of the SQLite file
+        self.connection = sqlite3.connect('file:{}?mode=ro'.format(filename), uri=True)   # Read-only connection
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(experiments)')]
+        self.attributes = [name for name in columns if name not in _EXTRA_COLUMNS]        # Experiment attributes
+        self.has_points = self.connection.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'points'").fetchone()[0] > 0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __len__(self):
+        """
+        Returns the number of experiments in the catalog.
+        """
+        return self.connection.execute('SELECT count(*) FROM experiments').fetchone()[0]
+
+
+    def close(self):
+        """
+        Closes the connection to the catalog.
+        """
+        self.connection.close()
+
+
+    def _check_attribute(self, attribute):
+        """
+        Prints the available attributes and returns False if `attribute` is not in the catalog.
+        """
+        if attribute in self.attributes:
+            return True
+        print('Attribute {} does not exist\n'.format(attribute))
+        print('Available attributes:')
+        print(self.attributes)
+        return False
+
+
+    def _experiments(self, rows, data=True):
+        """
+        Builds Experiment objects from rows of (attributes..., data_columns, data_blob).
+        """
+        experiments = []
+        for row in rows:
+            experiment = Experiment()
+            for name, value in zip(self.attributes, row):
+                setattr(experiment, name, value)
+            if data:
+                experiment.data = decode_data(row[-1], row[-2].split())
+            experiments.append(experiment)
+        return experiments
+
+
+    def _select(self, where, params, data=True):
+        """
+        Returns the Experiment objects of the rows matching an SQL condition, in exp_id order.
+        """
+        columns = ', '.join(_quote(name) for name in self.attributes)
+        columns += ', data_columns, data_blob' if data else ''
+        sql = 'SELECT {} FROM experiments WHERE {} ORDER BY exp_id'.format(columns, where)
+        return self._experiments(self.connection.execute(sql, params), data)
+
+
+    def filter_experiments(self, attribute, value, data=True):
+        """
+        Filters the experiments of the catalog by the value of an attribute, as `filter_experiments`.
+
+        Only the data of the matching experiments is decoded.
+
+        Parameters:
+        -----------
+        attribute : str
+            The attribute name based on which the filtering is to be done.
+        value : str | int | float
+            The value of the attribute.
+        data : bool, optional
+            Whether to load the data of the experiments. If False, their 'data' is an empty DataFrame.
+            Default is True.
+
+        Returns:
+        --------
+        filtered_list : list | None
+            The matching Experiment objects. Returns None if the attribute does not exist or no experiments
+            meet the condition.
+        """
+        if not self._check_attribute(attribute):
+            return None
+        if value is None:
+            experiments = self._select('{} IS NULL'.format(_quote(attribute)), (), data)
+        else:
+            experiments = self._select('{} = ?'.format(_quote(attribute)), (_sql_value(value),), data)
+
+        if len(experiments) == 0:
+            print('No experiments with {} = {}\n'.format(attribute, value))
+            print('Available values for {}:'.format(attribute))
+            print(self.get_unique_values(attribute))
+            return None
+        print('{} experiments with {} = {}'.format(len(experiments), attribute, value))
+        return experiments
+
+
+    def get_unique_values(self, attribute, where=None, params=()):
+        """
+        Returns the distinct values of an attribute, as `get_unique_values`, optionally for the experiments
+        matching an SQL condition.
+
+        Parameters:
+        -----------
+        attribute : str
+            The name of the attribute.
+        where : str, optional
+            SQL condition on the attributes (e.g. 'reaction = ? AND year > ?'). Default is None (all experiments).
+        params : tuple, optional
+            Parameters of the condition. Default is ().
+
+        Returns:
+        --------
+        unique_values : list | None
+            The sorted distinct values (missing values excluded). Returns None if the attribute does not exist.
+
+        Example:
+        --------
+        catalog.get_unique_values('target_Z', where='reaction = ? AND year > ?', params=('(p,n)', 2000))
+        """
+        if not self._check_attribute(attribute):
+            return None
+        column = _quote(attribute)
+        sql = 'SELECT DISTINCT {0} FROM experiments WHERE {0} IS NOT NULL'.format(column)
+        if where:
+            sql += ' AND ({})'.format(where)
+        sql += ' ORDER BY {}'.format(column)
+        return [row[0] for row in self.connection.execute(sql, params)]
+
+
+    def query(self, where='1', params=(), columns=None):
+        """
+        Returns the attributes of the experiments matching an SQL condition, without their data.
+
+        Parameters:
+        -----------
+        where : str, optional
+            SQL condition on the attributes. Default is '1' (all experiments).
+        params : tuple, optional
+            Parameters of the condition. Default is ().
+        columns : list, optional
+            Attributes to return. Default is None (all of them plus 'data_columns' and 'n_points').
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per matching experiment.
+
+        Example:
+        --------
+        catalog.query("reaction LIKE '(p,%n)' AND year > ?", (2000,), columns=['target_Z', 'target_A', 'X4_ID'])
+        """
+        columns = self.attributes + ['data_columns', 'n_points'] if columns is None else list(columns)
+        sql = 'SELECT {} FROM experiments WHERE {} ORDER BY exp_id'.format(', '.join(_quote(name) for name in columns),
+                                                                           where)
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+
+    def count(self, by, where='1', params=()):
+        """
+        Counts the experiments and points per value of one or several attributes.
+
+        Parameters:
+        -----------
+        by : str | list
+            The attribute(s) to group by.
+        where : str, optional
+            SQL condition on the attributes. Default is '1' (all experiments).
+        params : tuple, optional
+            Parameters of the condition. Default is ().
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per group with 'experiments' and 'points', sorted by decreasing number of experiments.
+
+        Example:
+        --------
+        catalog.count(['MT', 'quantity'])
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        columns = ', '.join(_quote(name) for name in by)
+        sql = ('SELECT {0}, count(*) AS experiments, sum(n_points) AS points FROM experiments WHERE {1} '
+               'GROUP BY {0} ORDER BY experiments DESC'.format(columns, where))
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+
+    def load_experiments(self, exp_ids, data=True):
+        """
+        Returns the experiments with the given ids (unknown ids are skipped), in exp_id order.
+        """
+        exp_ids = [int(exp_id) for exp_id in np.atleast_1d(exp_ids)]
+        experiments = []
+        # SQLite limits the number of parameters of a query
+        for start in range(0, len(exp_ids), 500):
+            chunk = exp_ids[start:start + 500]
+            experiments += self._select('exp_id IN ({})'.format(', '.join('?' * len(chunk))), chunk, data)
+        return sorted(experiments, key=lambda experiment: experiment.exp_id)
+
+
+    def get_points(self, x_min=None, x_max=None, where='1', params=()):
+        """
+        Returns the points whose abscissa is in [x_min, x_max], of the experiments matching an SQL condition.
+
+        Requires a catalog written with `points_table=True`.
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per point with 'exp_id', 'point_index', 'x', 'y' and 'dy'.
+
+        Example:
+        --------
+        catalog.get_points(10, 20, where='MT = ? AND target_Z = ?', params=(5, 26))
+        """
+        if not self.has_points:
+            raise ValueError('The catalog {} has no points table. Write it with points_table=True'.format(self.filename))
+        conditions, values = [], []
+        if x_min is not None:
+            conditions.append('p.x >= ?')
+            values.append(x_min)
+        if x_max is not None:
+            conditions.append('p.x <= ?')
+            values.append(x_max)
+        sql = ('SELECT p.exp_id, p.point_index, p.x, p.y, p.dy FROM points p WHERE p.exp_id IN '
+               '(SELECT exp_id FROM experiments WHERE {})'.format(where))
+        if conditions:
+            sql += ' AND ' + ' AND '.join(conditions)
+        sql += ' ORDER BY p.exp_id, p.x'
+        return pd.read_sql_query(sql, self.connection, params=tuple(params) + tuple(values))
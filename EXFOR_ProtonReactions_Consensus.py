@@ -0,0 +1,516 @@
+"""
+================================================================================
+TITLE: Batched Common-Grid Interpolation and Channel Consensus Curves
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script resamples every experiment of a reaction channel onto a grid
+    shared by the whole channel and combines them into a weighted consensus
+    curve (weights 1/dxs^2). All the work is done on a PointTable with
+    segmented, vectorized NumPy operations, so thousands of channels are
+    processed at once without looping over experiments. Each data point is
+    then compared with the leave-one-out consensus of the other experiments
+    of its channel, and the resulting residuals can be used as outlier features.
+
+MAIN FEATURES:
+    - Segmented searchsorted and linear interpolation over many sorted segments.
+    - Channel grids built from the union of the abscissas or a fixed number of points.
+    - Interpolation restricted to the range covered by each experiment.
+    - Weighted consensus curves with uncertainty, number of experiments and Birge ratio.
+    - Per-point leave-one-out residuals, relative residuals and pulls.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - PointTable (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Consensus as cons`
+    2. Compute the consensus: `curves, residuals = cons.compute_channel_consensus(experiments)`
+    3. Use `residuals['pull']` or `residuals['relative_residual']` as outlier features.
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_PointTable import PointTable, build_point_table, segment_ids
+
+
+def segmented_searchsorted(values, offsets, query_segment, query_values, side='left'):
+    """
+    Performs `np.searchsorted` independently inside many sorted segments with a single vectorized pass.
+
+    The values of segment `s` are `values[offsets[s]:offsets[s+1]]`; they must be sorted inside the segment.
+    Data and queries are merged with one lexsort keyed by (segment, value) and the number of data elements
+    preceding every query gives its insertion index.
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        Concatenated values of all segments, sorted inside each segment.
+    offsets : np.ndarray
+        Segment offsets (length n_segments + 1).
+    query_segment : np.ndarray
+        Segment of each query.
+    query_values : np.ndarray
+        Value of each query.
+    side : str, optional
+        'left' (first index with value >= query) or 'right' (first index with value > query). Default is 'left'.
+
+    Returns:
+    --------
+    np.ndarray
+        Global insertion index of each query into `values` (between offsets[s] and offsets[s+1]).
+    """
+    n = len(values)
+    q = len(query_values)
+    if q == 0:
+        return np.empty(0, dtype=np.int64)
+
+    segments = np.concatenate((segment_ids(offsets), np.asarray(query_segment, dtype=np.int64)))
+    merged = np.concatenate((np.asarray(values, dtype=np.float64), np.asarray(query_values, dtype=np.float64)))
+    # On ties the data goes before the query for side='right' and after the query for side='left'
+    is_query = np.concatenate((np.zeros(n, dtype=bool), np.ones(q, dtype=bool)))
+    tie_break = is_query if side == 'right' else ~is_query
+    order = np.lexsort((tie_break, merged, segments))
+
+    sorted_is_query = is_query[order]
+    # Number of data elements placed before each query
+    data_before = np.cumsum(~sorted_is_query)[sorted_is_query]
+    index = np.empty(q, dtype=np.int64)
+    index[order[sorted_is_query] - n] = data_before
+    return index
+
+
+def segmented_bracket(xp, offsets, query_segment, query_x):
+    """
+    Finds the interpolation interval of every query inside its segment.
+
+    Parameters:
+    -----------
+    xp : np.ndarray
+        Concatenated abscissas of all segments, sorted inside each segment.
+    offsets : np.ndarray
+        Segment offsets (length n_segments + 1).
+    query_segment : np.ndarray
+        Segment of each query.
+    query_x : np.ndarray
+        Abscissa of each query.
+
+    Returns:
+    --------
+    tuple
+        (lo, hi, t, valid): global indices of the interval ends, interpolation weight of `hi` and a mask of the
+        queries that fall inside the range covered by their segment.
+    """
+    query_segment = np.asarray(query_segment, dtype=np.int64)
+    query_x = np.asarray(query_x, dtype=np.float64)
+    start = offsets[query_segment]
+    end = offsets[query_segment + 1]
+
+    hi = segmented_searchsorted(xp, offsets, query_segment, query_x, side='right')
+    # Clip the interval to the segment, the queries outside it are flagged as invalid
+    last = np.maximum(end - 1, start)
+    lo = np.clip(hi - 1, start, last)
+    hi = np.clip(hi, start, last)
+    valid = end > start
+    # Empty segments get dummy (in-bounds) indices
+    lo = np.where(valid, lo, 0)
+    hi = np.where(valid, hi, 0)
+    if len(xp):
+        valid &= (query_x >= xp[np.where(valid, start, 0)]) & (query_x <= xp[np.where(valid, last, 0)])
+        dx = xp[hi] - xp[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(dx > 0, (query_x - xp[lo]) / dx, 0.0)
+    else:
+        t = np.zeros(len(query_x))
+    return lo, hi, t, valid
+
+
+def segmented_interp(xp, fp, offsets, query_segment, query_x):
+    """
+    Linear interpolation inside many segments at once (a segmented version of `np.interp`).
+
+    Queries outside the range covered by their segment are not extrapolated; NaN is returned instead.
+
+    Parameters:
+    -----------
+    xp : np.ndarray
+        Concatenated abscissas of all segments, sorted inside each segment.
+    fp : np.ndarray
+        Values at `xp`.
+    offsets : np.ndarray
+        Segment offsets (length n_segments + 1).
+    query_segment : np.ndarray
+        Segment of each query.
+    query_x : np.ndarray
+        Abscissa of each query.
+
+    Returns:
+    --------
+    np.ndarray
+        Interpolated values (NaN outside the range of the segment).
+
+    Example:
+    --------
+    y = segmented_interp(table.x, table.y, table.offsets, exp_of_query, x_of_query)
+    """
+    lo, hi, t, valid = segmented_bracket(xp, offsets, query_segment, query_x)
+    return _apply_bracket(fp, lo, hi, t, valid)
+
+
+def _apply_bracket(fp, lo, hi, t, valid):
+    """
+    Evaluates the linear interpolation of `fp` for the intervals found by `segmented_bracket`.
+    """
+    if len(fp) == 0:
+        return np.full(len(lo), np.nan)
+    return np.where(valid, _lerp(fp[lo], fp[hi], t), np.nan)
+
+
+def _lerp(f_lo, f_hi, t):
+    """
+    (1 - t) * f_lo + t * f_hi, exactly f_lo at t = 0 even if f_hi is NaN (a query on a node of its segment).
+    """
+    with np.errstate(invalid='ignore'):
+        return np.where(t == 0, f_lo, (1.0 - t) * f_lo + t * f_hi)
+
+
+def build_channel_grid(table, grid='union', spacing='linear'):
+    """
+    Builds the common abscissa grid of every reaction channel.
+
+    Parameters:
+    -----------
+    table : PointTable
+        The point table.
+    grid : str | int, optional
+        'union' uses every distinct abscissa measured in the channel. An integer uses that number of points
+        between the smallest and largest abscissa of the channel. Default is 'union'.
+    spacing : str, optional
+        'linear' or 'log' spacing for integer grids. Log spacing falls back to linear for channels that
+        reach non-positive abscissas. Default is 'linear'.
+
+    Returns:
+    --------
+    tuple
+        (grid_x, grid_offsets): the grid abscissas sorted by (channel, x) and the offsets of each channel.
+    """
+    n_channels = table.n_channels
+    point_channel = table.point_channel()
+    order = np.lexsort((table.x, point_channel))
+    sorted_channel = point_channel[order]
+    sorted_x = table.x[order]
+    channel_counts = np.bincount(sorted_channel, minlength=n_channels)
+    channel_offsets = np.concatenate(([0], np.cumsum(channel_counts))).astype(np.int64)
+
+    if grid == 'union':
+        # Keep the first point of every distinct (channel, x) pair
+        keep = np.ones(len(sorted_x), dtype=bool)
+        keep[1:] = (sorted_channel[1:] != sorted_channel[:-1]) | (sorted_x[1:] != sorted_x[:-1])
+        grid_x = sorted_x[keep]
+        grid_counts = np.bincount(sorted_channel[keep], minlength=n_channels)
+    else:
+        n_points = int(grid)
+        non_empty = channel_counts > 0
+        lo = sorted_x[channel_offsets[:-1][non_empty]]
+        hi = sorted_x[channel_offsets[1:][non_empty] - 1]
+        fraction = np.linspace(0.0, 1.0, n_points)
+        grid_x = lo[:, None] + (hi - lo)[:, None] * fraction[None, :]
+        if spacing == 'log':
+            positive = lo > 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_grid = np.exp(np.log(lo)[:, None] + np.log(hi / lo)[:, None] * fraction[None, :])
+            grid_x[positive] = log_grid[positive]
+        # Pin the ends of the grid to the measured range to avoid round-off outside the coverage
+        if n_points > 1:
+            grid_x[:, 0] = lo
+            grid_x[:, -1] = hi
+        grid_x = grid_x.ravel()
+        grid_counts = np.where(non_empty, n_points, 0)
+
+    grid_offsets = np.concatenate(([0], np.cumsum(grid_counts))).astype(np.int64)
+    return grid_x, grid_offsets
+
+
+def effective_uncertainty(y, dy, default_relative_uncertainty=0.1):
+    """
+    Replaces missing or non-positive uncertainties by a fraction of the value.
+
+    Parameters:
+    -----------
+    y : np.ndarray
+        Values (cross sections, yields, ...).
+    dy : np.ndarray
+        Uncertainties of the values (NaN if not given).
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dy is missing or zero. Default is 0.1.
+
+    Returns:
+    --------
+    np.ndarray
+        The uncertainties, with `default_relative_uncertainty * |y|` where dy is not usable.
+    """
+    usable = np.isfinite(dy) & (dy > 0)
+    return np.where(usable, dy, default_relative_uncertainty * np.abs(y))
+
+
+def _weights(dy):
+    """
+    Statistical weights 1/dy^2 (zero for unusable uncertainties).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = 1.0 / dy**2
+    return np.where(np.isfinite(weights), weights, 0.0)
+
+
+def _experiment_nodes(table, default_relative_uncertainty=0.1):
+    """
+    Interpolation nodes of every experiment: the points, with missing uncertainties replaced (see
+    `effective_uncertainty`) and the points of an experiment measured at the same abscissa merged into their
+    weighted mean (uncertainty 1/sqrt(sum(w))), since interpolating would only use the last of them.
+
+    Returns:
+    --------
+    tuple
+        (x, y, dy, offsets) of the nodes, segmented by experiment like the point table.
+    """
+    exp = segment_ids(table.offsets)
+    dy = effective_uncertainty(table.y, table.dy, default_relative_uncertainty)
+    first = np.ones(len(table.x), dtype=bool)
+    first[1:] = (exp[1:] != exp[:-1]) | (table.x[1:] != table.x[:-1])
+    if first.all():
+        return table.x, table.y, dy, table.offsets
+
+    node = np.cumsum(first) - 1
+    n_nodes = int(node[-1]) + 1
+    w = np.where(np.isfinite(table.y), _weights(dy), 0.0)
+    count = np.bincount(node, minlength=n_nodes)
+    sum_w = np.bincount(node, weights=w, minlength=n_nodes)
+    sum_wy = np.bincount(node, weights=w * np.where(w > 0, table.y, 0.0), minlength=n_nodes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Nodes without usable weights keep the plain mean and no weight
+        y = np.where(sum_w > 0, sum_wy / sum_w, np.bincount(node, weights=table.y, minlength=n_nodes) / count)
+        node_dy = np.where(sum_w > 0, 1.0 / np.sqrt(sum_w), np.nan)
+    # Single points are kept as they are
+    single = count == 1
+    y = np.where(single, table.y[first], y)
+    node_dy = np.where(single, dy[first], node_dy)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(exp[first], minlength=table.n_experiments))))
+    return table.x[first], y, node_dy, offsets.astype(np.int64)
+
+
+def sample_on_grid(table, grid_x, grid_offsets, default_relative_uncertainty=0.1):
+    """
+    Interpolates every experiment onto the grid of its channel, restricted to the range it covers.
+
+    Missing uncertainties are replaced before interpolating (see `effective_uncertainty`), and the points of
+    an experiment measured at the same abscissa are merged into their weighted mean.
+
+    Parameters:
+    -----------
+    table : PointTable
+        The point table.
+    grid_x : np.ndarray
+        Grid abscissas sorted by (channel, x), as returned by `build_channel_grid`.
+    grid_offsets : np.ndarray
+        Offsets of each channel in `grid_x`.
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dxs is missing or zero. Default is 0.1.
+
+    Returns:
+    --------
+    dict
+        Flat arrays with one entry per (experiment, grid point) pair: 'exp' (experiment index), 'grid'
+        (index into `grid_x`), 'y' and 'dy' (interpolated value and uncertainty) and 'w' (weight 1/dy^2).
+    """
+    counts = table.counts
+    experiments = np.flatnonzero(counts > 0)
+    x_min = table.x[table.offsets[experiments]]
+    x_max = table.x[table.offsets[experiments + 1] - 1]
+    channels = table.channel[experiments]
+
+    # Grid points covered by each experiment
+    first = segmented_searchsorted(grid_x, grid_offsets, channels, x_min, side='left')
+    last = segmented_searchsorted(grid_x, grid_offsets, channels, x_max, side='right')
+    n_pairs = np.maximum(last - first, 0)
+
+    # Expand the (experiment, grid point) pairs
+    total = int(n_pairs.sum())
+    pair_start = np.cumsum(n_pairs) - n_pairs
+    pair_exp = np.repeat(experiments, n_pairs)
+    pair_grid = np.repeat(first, n_pairs) + (np.arange(total, dtype=np.int64) - np.repeat(pair_start, n_pairs))
+
+    # Interpolate values and uncertainties of each experiment at its grid points
+    node_x, node_y, node_dy, node_offsets = _experiment_nodes(table, default_relative_uncertainty)
+    lo, hi, t, valid = segmented_bracket(node_x, node_offsets, pair_exp, grid_x[pair_grid])
+    y = _apply_bracket(node_y, lo, hi, t, valid)
+    dy = _apply_bracket(node_dy, lo, hi, t, valid)
+
+    return {'exp': pair_exp, 'grid': pair_grid, 'y': y, 'dy': dy, 'w': _weights(dy)}
+
+
+def consensus_from_samples(samples, n_grid):
+    """
+    Reduces the grid samples of all experiments into weighted consensus values per grid point.
+
+    Parameters:
+    -----------
+    samples : dict
+        Grid samples as returned by `sample_on_grid`.
+    n_grid : int
+        Total number of grid points.
+
+    Returns:
+    --------
+    dict
+        Arrays with one entry per grid point: 'sum_w' and 'sum_wy' (weighted sums), 'n_experiments',
+        'consensus', 'consensus_unc' (1/sqrt(sum_w)) and 'birge_ratio' (sqrt of the reduced chi-square).
+    """
+    grid = samples['grid']
+    w = np.where(np.isfinite(samples['y']), samples['w'], 0.0)
+    y = np.where(w > 0, samples['y'], 0.0)
+
+    sum_w = np.bincount(grid, weights=w, minlength=n_grid)
+    sum_wy = np.bincount(grid, weights=w * y, minlength=n_grid)
+    n_experiments = np.bincount(grid, weights=(w > 0), minlength=n_grid).astype(np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consensus = np.where(sum_w > 0, sum_wy / sum_w, np.nan)
+        consensus_unc = np.where(sum_w > 0, 1.0 / np.sqrt(sum_w), np.nan)
+        chi2 = np.bincount(grid, weights=w * (y - np.nan_to_num(consensus[grid]))**2, minlength=n_grid)
+        birge_ratio = np.where(n_experiments > 1, np.sqrt(chi2 / (n_experiments - 1)), np.nan)
+
+    return {'sum_w': sum_w, 'sum_wy': sum_wy, 'n_experiments': n_experiments,
+            'consensus': consensus, 'consensus_unc': consensus_unc, 'birge_ratio': birge_ratio}
+
+
+def point_residuals(table, grid_x, grid_offsets, samples, consensus, default_relative_uncertainty=0.1):
+    """
+    Compares every data point with the leave-one-out consensus of the other experiments of its channel.
+
+    The samples of the experiment of the point are removed from the weighted sums of the grid points around
+    it, and the sums of the other experiments are interpolated at the abscissa of the point. With a 'union'
+    grid every point lies on a grid point, so the consensus is exactly that of the other experiments there.
+
+    Parameters:
+    -----------
+    table : PointTable
+        The point table.
+    grid_x : np.ndarray
+        Grid abscissas sorted by (channel, x).
+    grid_offsets : np.ndarray
+        Offsets of each channel in `grid_x`.
+    samples : dict
+        Grid samples as returned by `sample_on_grid` (sorted by experiment and grid point).
+    consensus : dict
+        Consensus arrays as returned by `consensus_from_samples`.
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dxs is missing or zero. Default is 0.1.
+
+    Returns:
+    --------
+    dict
+        Arrays with one entry per point of the table: 'consensus', 'consensus_unc', 'residual',
+        'relative_residual', 'pull' and 'n_experiments' (number of other experiments covering the point).
+    """
+    n_grid = len(grid_x)
+    lo, hi, t, valid = segmented_bracket(grid_x, grid_offsets, table.point_channel(), table.x)
+    keys = samples['exp'].astype(np.int64) * n_grid + samples['grid']
+    sample_w = np.where(np.isfinite(samples['y']), samples['w'], 0.0)
+    sample_wy = sample_w * np.where(sample_w > 0, samples['y'], 0.0)
+
+    # Weighted sums of the other experiments at the grid points around every point
+    sums = {'sum_w': [], 'other_w': [], 'other_wy': [], 'others': []}
+    for g in (lo, hi):
+        # Sample of the experiment of the point at the grid point (it may not cover it)
+        query = table.exp_index.astype(np.int64) * n_grid + g
+        own_sample = np.minimum(np.searchsorted(keys, query), max(len(keys) - 1, 0))
+        own = keys[own_sample] == query if len(keys) else np.zeros(len(query), dtype=bool)
+        own_w = np.where(own, sample_w[own_sample] if len(keys) else 0.0, 0.0)
+        own_wy = np.where(own, sample_wy[own_sample] if len(keys) else 0.0, 0.0)
+        sums['sum_w'].append(consensus['sum_w'][g])
+        sums['other_w'].append(consensus['sum_w'][g] - own_w)
+        sums['other_wy'].append(consensus['sum_wy'][g] - own_wy)
+        sums['others'].append(consensus['n_experiments'][g] - (own_w > 0))
+
+    sum_w = _lerp(*sums['sum_w'], t)
+    other_w = _lerp(*sums['other_w'], t)
+    other_wy = _lerp(*sums['other_wy'], t)
+    has_others = valid & (other_w > 1e-12 * np.maximum(sum_w, 1e-300))
+    # A point on a grid point (always the case with a 'union' grid) is covered by the experiments of that grid
+    # point; the next grid point may be outside the range of its own experiment
+    n_experiments = np.where(t == 0, sums['others'][0], np.minimum(*sums['others']))
+    dy = effective_uncertainty(table.y, table.dy, default_relative_uncertainty)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        loo = np.where(has_others, other_wy / other_w, np.nan)
+        loo_unc = np.where(has_others, 1.0 / np.sqrt(other_w), np.nan)
+        residual = table.y - loo
+        relative_residual = np.where(loo != 0, residual / np.abs(loo), np.nan)
+        pull = residual / np.sqrt(dy**2 + loo_unc**2)
+
+    return {'consensus': loo, 'consensus_unc': loo_unc, 'residual': residual,
+            'relative_residual': relative_residual, 'pull': pull,
+            'n_experiments': np.where(has_others, np.maximum(n_experiments, 0), 0)}
+
+
+def compute_channel_consensus(experiments, grid='union', spacing='linear', default_relative_uncertainty=0.1):
+    """
+    Builds the consensus curve of every reaction channel and the residual of every data point.
+
+    Every experiment is linearly interpolated onto the common grid of its channel (only inside the range it
+    covers), the interpolated values are combined with weights 1/dxs^2, and each point is compared with the
+    leave-one-out consensus of the other experiments of the channel.
+
+    Parameters:
+    -----------
+    experiments : list | PointTable
+        A list of Experiment objects or an already built PointTable.
+    grid : str | int, optional
+        'union' or a number of grid points per channel (see `build_channel_grid`). Default is 'union'.
+    spacing : str, optional
+        'linear' or 'log' spacing for integer grids. Default is 'linear'.
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dxs is missing or zero. Default is 0.1.
+
+    Returns:
+    --------
+    curves : pd.DataFrame
+        One row per grid point with columns 'channel', 'x', 'consensus', 'consensus_unc', 'n_experiments'
+        and 'birge_ratio'.
+    residuals : pd.DataFrame
+        One row per data point with the columns of `PointTable.to_dataframe` plus 'consensus',
+        'consensus_unc', 'residual', 'relative_residual', 'pull' and 'n_experiments'.
+
+    Example:
+    --------
+    curves, residuals = compute_channel_consensus(experiments)
+    suspicious = residuals[residuals['pull'].abs() > 5]
+
+    Notes:
+    ------
+    - Channels are defined by `PointTable.CHANNEL_ATTRIBUTES` and the data column names; use
+      `table.channels_dataframe()` to see the attributes of each channel code.
+    - Points of channels measured by a single experiment have NaN residuals.
+    """
+    table = experiments if isinstance(experiments, PointTable) else build_point_table(experiments)
+
+    grid_x, grid_offsets = build_channel_grid(table, grid=grid, spacing=spacing)
+    samples = sample_on_grid(table, grid_x, grid_offsets, default_relative_uncertainty)
+    consensus = consensus_from_samples(samples, len(grid_x))
+
+    curves = pd.DataFrame({'channel': segment_ids(grid_offsets),
+                           'x': grid_x,
+                           'consensus': consensus['consensus'],
+                           'consensus_unc': consensus['consensus_unc'],
+                           'n_experiments': consensus['n_experiments'],
+                           'birge_ratio': consensus['birge_ratio']})
+
+    residuals = table.to_dataframe()
+    for column, values in point_residuals(table, grid_x, grid_offsets, samples, consensus,
+                                          default_relative_uncertainty).items():
+        residuals[column] = values
+
+    return curves, residuals
@@ -0,0 +1,231 @@
+"""
+================================================================================
+TITLE: Point Decimation for Plotting Dense Experiments
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script selects a subset of the points of a data series so that dense
+    experiments (angular distributions or excitation functions with thousands
+    of points) can be drawn quickly and saved to small vector files while
+    keeping the visual shape of the curve. Two methods are available:
+    Largest-Triangle-Three-Buckets (LTTB), which keeps the points that define
+    the shape of the curve, and min/max per bin, which keeps the extreme values
+    of every pixel-wide bin of the abscissa. Points flagged by the caller (e.g.
+    outliers) are always kept.
+
+MAIN FEATURES:
+    - Largest-Triangle-Three-Buckets downsampling.
+    - Min/max per abscissa bin downsampling.
+    - Decimation in the plotted (linear or logarithmic) coordinates.
+    - Points that must always be kept (outliers).
+    - Decimation of an experiment's data DataFrame.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Decimation as dec`
+    2. Select the points to draw: `index = dec.decimate(x, y, max_points=500, method='lttb')`
+    3. Or decimate a DataFrame: `data = dec.decimate_data(experiment.data, 500, method='minmax')`
+    4. The plotting functions accept the same options: `plot_experiments(experiments, max_points=500)`
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+
+
+DECIMATION_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Selects `n_out` points of a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept. The remaining points are split into `n_out - 2` buckets and,
+    in every bucket, the point forming the largest triangle with the previously selected point and the
+    average of the next bucket is kept.
+
+    Parameters:
+    -----------
+    x : np.ndarray
+        Abscissa of the points, sorted in increasing order and finite.
+    y : np.ndarray
+        Values of the points (finite).
+    n_out : int
+        Number of points to keep (at least 3).
+
+    Returns:
+    --------
+    np.ndarray
+        Sorted positions of the selected points.
+    """
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(int(n_out), 3)
+
+    # Bucket edges of the inner points (the first and last points are buckets on their own)
+    edges = np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Cumulative sums to get the average of any bucket in constant time
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average point of the next bucket (the last point for the last bucket)
+        if i < n_out - 3:
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = (cum_x[next_end] - cum_x[next_start]) / (next_end - next_start)
+            avg_y = (cum_y[next_end] - cum_y[next_start]) / (next_end - next_start)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Twice the area of the triangles (a, candidate, average of the next bucket)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(x, y, n_bins):
+    """
+    Selects the minimum and maximum value of every bin of the abscissa.
+
+    The abscissa range is split into `n_bins` bins of equal width (e.g. one per pixel column) and the points
+    with the lowest and highest value of every bin are kept, together with the first and last points.
+
+    Parameters:
+    -----------
+    x : np.ndarray
+        Abscissa of the points, sorted in increasing order and finite.
+    y : np.ndarray
+        Values of the points (finite).
+    n_bins : int
+        Number of bins.
+
+    Returns:
+    --------
+    np.ndarray
+        Sorted positions of the selected points.
+    """
+    n = len(x)
+    n_bins = max(int(n_bins), 1)
+    if 2 * n_bins + 2 >= n:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    if span > 0:
+        bins = np.minimum(((x - x[0]) / span * n_bins).astype(np.int64), n_bins - 1)
+    else:
+        bins = np.zeros(n, dtype=np.int64)
+
+    # Sort by bin and value: the first and last point of every bin are its minimum and maximum
+    order = np.lexsort((y, bins))
+    sorted_bins = bins[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_bins[1:] != sorted_bins[:-1])))
+    ends = np.concatenate((starts[1:], [n])) - 1
+
+    return np.unique(np.concatenate((order[starts], order[ends], [0, n - 1])))
+
+
+def decimate(x, y, max_points, method='lttb', keep=None, xlog=False, ylog=False):
+    """
+    Selects at most about `max_points` points of a series, keeping its visual shape.
+
+    The points are decimated in the plotted coordinates (logarithmic if `xlog`/`ylog`). Points that cannot be
+    drawn (missing values, or non-positive values on a logarithmic axis) are dropped, and the points flagged in
+    `keep` are always kept on top of the selected ones.
+
+    Parameters:
+    -----------
+    x : array-like
+        Abscissa of the points (in any order).
+    y : array-like
+        Values of the points.
+    max_points : int | None
+        Maximum number of points to draw. If None, or if the series is not longer, every point is kept.
+    method : str, optional
+        'lttb' (Largest-Triangle-Three-Buckets) or 'minmax' (min/max per bin). Default is 'lttb'.
+    keep : array-like of bool, optional
+        Points that must always be kept (e.g. outliers). Default is None.
+    xlog : bool, optional
+        Whether the x-axis is logarithmic. Default is False.
+    ylog : bool, optional
+        Whether the y-axis is logarithmic. Default is False.
+
+    Returns:
+    --------
+    np.ndarray
+        Sorted positions of the points to draw.
+
+    Example:
+    --------
+    index = decimate(data['E'], data['xs'], max_points=500, method='minmax', ylog=True)
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError('Unknown decimation method {}. Use one of {}'.format(method, DECIMATION_METHODS))
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool) if keep is None else np.asarray(keep, dtype=bool)
+
+    # Work in the plotted coordinates
+    with np.errstate(divide='ignore', invalid='ignore'):
+        px = np.log10(x) if xlog else x
+        py = np.log10(y) if ylog else y
+    drawable = np.flatnonzero(np.isfinite(px) & np.isfinite(py))
+    order = drawable[np.argsort(px[drawable], kind='stable')]
+
+    # The kept points count towards the budget
+    budget = max(int(max_points) - int(keep[order].sum()), 3)
+    if method == 'lttb':
+        selected = lttb_indices(px[order], py[order], budget)
+    else:
+        selected = minmax_indices(px[order], py[order], (budget - 2) // 2)
+
+    return np.union1d(order[selected], np.flatnonzero(keep))
+
+
+def decimate_data(data, max_points, method='lttb', keep=None, xlog=False, ylog=False):
+    """
+    Decimates the data of an experiment for plotting.
+
+    The first two columns are taken as the abscissa and the value, as in the plotting functions. Text-loaded
+    experiments (which store strings) are handled by converting the columns to numbers.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        The 'data' attribute of an Experiment object.
+    max_points : int | None
+        Maximum number of points to draw. If None, the data is returned unchanged.
+    method : str, optional
+        'lttb' or 'minmax'. Default is 'lttb'.
+    keep : array-like of bool, optional
+        Rows that must always be kept (e.g. outliers). Default is None.
+    xlog : bool, optional
+        Whether the x-axis is logarithmic. Default is False.
+    ylog : bool, optional
+        Whether the y-axis is logarithmic. Default is False.
+
+    Returns:
+    --------
+    pd.DataFrame
+        The selected rows of the data, in their original order.
+    """
+    if max_points is None or len(data) <= max_points or data.shape[1] < 2:
+        return data
+    x = pd.to_numeric(data.iloc[:, 0], errors='coerce').to_numpy(dtype=np.float64)
+    y = pd.to_numeric(data.iloc[:, 1], errors='coerce').to_numpy(dtype=np.float64)
+    return data.iloc[decimate(x, y, max_points, method, keep, xlog, ylog)]
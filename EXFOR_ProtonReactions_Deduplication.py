@@ -0,0 +1,434 @@
+"""
+================================================================================
+TITLE: Hash-Based Deduplication of Experiments and Data Points
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script finds the experiments of the database that contain the same
+    measurement more than once (the same EXFOR subentry given in several
+    frames, renormalized versions, ...) so that they do not inflate the model
+    fitting time and the number of outliers. Exact duplicates are found by
+    hashing the numeric data block, rounded to a number of significant
+    digits, together with the reaction channel attributes. Near duplicates
+    are found with MinHash signatures of the quantized points and
+    locality-sensitive hashing (LSH): experiments are put in buckets by bands
+    of their signatures and only experiments that share a bucket are
+    compared, so the database is never compared pair by pair. Duplicates can
+    be dropped or tagged before the classification, and repeated points of a
+    classified DataFrame can be removed with a row hash.
+
+MAIN FEATURES:
+    - Rounding to significant digits and content hash of the data of every experiment.
+    - Exact duplicates by hash buckets.
+    - Near duplicates by MinHash and LSH banding, optionally insensitive to a
+      normalization factor (renormalized versions of the same data).
+    - Report of the duplicate groups with the kept experiment of every group.
+    - Dropping or tagging of the duplicates.
+    - Removal of repeated points of a classified DataFrame.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - Experiment (custom class)
+    - PointTable (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Deduplication as dd`
+    2. Report: `report = dd.find_duplicates(experiments)`
+    3. Drop them: `experiments, report = dd.deduplicate_experiments(experiments, mode='drop')`
+    4. Or tag them: `dd.deduplicate_experiments(experiments, mode='tag')` (sets `duplicate_of`, `duplicate_kind`)
+    5. Repeated points: `df = dd.drop_duplicate_points(df)`
+================================================================================
+"""
+
+import hashlib
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import ID_COLUMNS
+from EXFOR_ProtonReactions_PointTable import build_point_table, segment_ids
+
+
+# Attributes that must be equal for two experiments to be duplicates. The frame and the EXFOR ID are not
+# included: the same subentry can be given in several frames or under several IDs.
+DEDUP_KEY_ATTRIBUTES = ['target_Z', 'target_A', 'target_state', 'projectile', 'reaction', 'final_Z', 'final_A',
+                        'final_state', 'MTrat', 'Ratio_isomer', 'quantity', 'MF', 'MT']
+
+# Constants of the 64-bit hash mixing of the quantized points
+_MIX_X = np.uint64(0x9E3779B97F4A7C15)
+_MIX_Y = np.uint64(0xC2B2AE3D27D4EB4F)
+_MIX = np.uint64(0xBF58476D1CE4E5B9)
+
+
+def round_significant(values, digits=6):
+    """
+    Rounds values to a number of significant digits (NaN and infinite values are kept).
+
+    Parameters:
+    -----------
+    values : array-like
+        The values to round.
+    digits : int, optional
+        Number of significant digits. Default is 6.
+
+    Returns:
+    --------
+    np.ndarray
+        The rounded values (float64). Negative zeros are turned into zeros so that they hash equally.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    magnitude = np.where(np.isfinite(magnitude), magnitude, 0)
+    scale = 10.0 ** (digits - 1 - magnitude)
+    with np.errstate(invalid='ignore', over='ignore'):
+        rounded = np.round(values * scale) / scale
+    rounded = np.where(np.isfinite(rounded), rounded, values)
+    return rounded + 0.0
+
+
+def data_hash(experiment, digits=6, key_attributes=DEDUP_KEY_ATTRIBUTES):
+    """
+    Computes the content hash of an experiment: its key attributes, its column names and its data rounded to
+    `digits` significant digits. The order of the rows does not change the hash.
+
+    Parameters:
+    -----------
+    experiment : Experiment
+        The experiment to hash.
+    digits : int, optional
+        Number of significant digits of the data. Default is 6.
+    key_attributes : list, optional
+        Attributes included in the hash. Default is DEDUP_KEY_ATTRIBUTES.
+
+    Returns:
+    --------
+    str
+        Hexadecimal digest (32 characters).
+    """
+    data = experiment.data
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(tuple(getattr(experiment, name, None) for name in key_attributes)).encode('utf-8'))
+    digest.update(repr(tuple(str(column) for column in data.columns)).encode('utf-8'))
+    if data.shape[1] and len(data):
+        try:
+            # Numbers, or the strings of text-loaded experiments, converted in one call
+            block = data.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            block = np.column_stack([pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=np.float64)
+                                     for column in data.columns])
+        block = round_significant(block, digits)
+        # Missing values are made identical and the rows sorted, so that their order does not matter
+        block = np.where(np.isnan(block), np.nan, block)
+        block = block[np.lexsort(block.T[::-1])]
+        digest.update(np.ascontiguousarray(block).tobytes())
+    return digest.hexdigest()
+
+
+def _quantize(values, tolerance):
+    """
+    Quantizes values on a logarithmic grid of relative step `tolerance` (sign kept, zeros on their own cell).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cells = np.floor(np.log(np.abs(values)) / np.log1p(tolerance))
+    cells = np.where(np.isfinite(cells), cells, 2**40).astype(np.int64)
+    return cells * 2 + (values < 0)
+
+
+def minhash_signatures(experiments, tolerance=0.01, n_hashes=64, scale_invariant=False, seed=0, chunk_size=2**20):
+    """
+    Computes the MinHash signature of the points of every experiment.
+
+    Every point (abscissa, value) is quantized on a logarithmic grid of relative step `tolerance` and hashed into
+    a 64-bit shingle. The signature of an experiment is the minimum of `n_hashes` random hash functions over its
+    shingles, so the fraction of equal signature entries of two experiments estimates the Jaccard index of their
+    sets of quantized points.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+    tolerance : float, optional
+        Relative size of the quantization cells. Default is 0.01 (1%).
+    n_hashes : int, optional
+        Number of hash functions. Default is 64.
+    scale_invariant : bool, optional
+        If True, the values of every experiment are divided by their mean absolute value before quantization,
+        so that renormalized versions of the same data have the same signature. Default is False.
+    seed : int, optional
+        Seed of the hash functions. Default is 0.
+    chunk_size : int, optional
+        Maximum number of (point, hash function) pairs evaluated at a time. Default is 2**20.
+
+    Returns:
+    --------
+    signatures : np.ndarray
+        uint64 array of shape (n_experiments, n_hashes). Experiments without points have every entry equal
+        to the maximum uint64 value.
+    """
+    table = build_point_table(experiments)
+    x, y = table.x, table.y
+    if scale_invariant and len(table):
+        owner = segment_ids(table.offsets)
+        scale = np.bincount(owner, np.abs(y), minlength=table.n_experiments) / np.maximum(table.counts, 1)
+        y = y / np.where(scale > 0, scale, 1.0)[owner]
+
+    # One 64-bit shingle per point (multiplications wrap around modulo 2**64)
+    shingles = _quantize(x, tolerance).astype(np.uint64) * _MIX_X ^ _quantize(y, tolerance).astype(np.uint64) * _MIX_Y
+    shingles = (shingles ^ (shingles >> np.uint64(31))) * _MIX
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=n_hashes, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=n_hashes, dtype=np.uint64, endpoint=True)
+
+    signatures = np.full((table.n_experiments, n_hashes), np.iinfo(np.uint64).max, dtype=np.uint64)
+    counts = table.counts
+    non_empty = np.flatnonzero(counts > 0)
+    # Process groups of experiments whose points fit in a chunk of (points x hash functions)
+    start = 0
+    while start < len(non_empty):
+        stop = start + 1
+        while stop < len(non_empty) and (table.offsets[non_empty[stop] + 1] - table.offsets[non_empty[start]]) \
+                * n_hashes <= chunk_size:
+            stop += 1
+        group = non_empty[start:stop]
+        first, last = table.offsets[group[0]], table.offsets[group[-1] + 1]
+        hashed = shingles[first:last, None] * a + b
+        signatures[group] = np.minimum.reduceat(hashed, table.offsets[group] - first, axis=0)
+        start = stop
+    return signatures
+
+
+class _UnionFind:
+    """
+    Disjoint sets of experiment positions (groups of duplicates).
+    """
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def find_duplicates(experiments, digits=6, near=True, tolerance=0.01, threshold=0.8, n_hashes=64, bands=16,
+                    scale_invariant=False, min_points=3, key_attributes=DEDUP_KEY_ATTRIBUTES, seed=0):
+    """
+    Finds the exact and near-duplicate experiments of a list.
+
+    Exact duplicates have the same `data_hash`. Near duplicates have the same key attributes and MinHash
+    signatures sharing at least one of `bands` LSH bands, and an estimated Jaccard index of their quantized
+    points of at least `threshold`. Duplicates are joined into groups; the experiment kept for every group is
+    the one with the most points (the first one in the list in case of a tie).
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+    digits : int, optional
+        Significant digits of the exact hash. Default is 6.
+    near : bool, optional
+        Whether to look for near duplicates. Default is True.
+    tolerance : float, optional
+        Relative quantization step of the near-duplicate search. Default is 0.01.
+    threshold : float, optional
+        Minimum estimated Jaccard index of near duplicates. Default is 0.8.
+    n_hashes : int, optional
+        Length of the MinHash signatures (a multiple of `bands`). Default is 64.
+    bands : int, optional
+        Number of LSH bands. More bands find more candidates with lower similarity. Default is 16.
+    scale_invariant : bool, optional
+        Whether renormalized versions of the same data are near duplicates (see `minhash_signatures`).
+        Default is False.
+    min_points : int, optional
+        Minimum number of points of the experiments searched for near duplicates (two single-point experiments
+        close to each other are not considered duplicates). Default is 3.
+    key_attributes : list, optional
+        Attributes that must be equal. Default is DEDUP_KEY_ATTRIBUTES.
+    seed : int, optional
+        Seed of the MinHash functions. Default is 0.
+
+    Returns:
+    --------
+    report : pd.DataFrame
+        One row per experiment with 'exp_id', 'X4_ID', 'n_points', 'hash', 'group' (position of the kept
+        experiment of its group, -1 if it has no duplicates), 'duplicate_of' (exp_id of the kept experiment,
+        None for kept and unique experiments), 'kind' ('exact', 'near' or None) and 'similarity' (estimated
+        Jaccard index with the kept experiment).
+
+    Example:
+    --------
+    report = find_duplicates(experiments, scale_invariant=True)
+    report[report['kind'].notna()].groupby('kind').size()
+    """
+    if n_hashes % bands:
+        raise ValueError('n_hashes ({}) must be a multiple of bands ({})'.format(n_hashes, bands))
+    n = len(experiments)
+    hashes = [data_hash(experiment, digits, key_attributes) for experiment in experiments]
+    keys = [repr(tuple(getattr(experiment, name, None) for name in key_attributes)) for experiment in experiments]
+    n_points = np.array([len(experiment.data) for experiment in experiments], dtype=np.int64)
+    groups = _UnionFind(n)
+
+    # Exact duplicates: one bucket per hash
+    buckets = {}
+    for position, value in enumerate(hashes):
+        buckets.setdefault(value, []).append(position)
+    for members in buckets.values():
+        for position in members[1:]:
+            groups.union(members[0], position)
+
+    # Near duplicates: buckets of (key attributes, band of the signature)
+    signatures = None
+    if near:
+        signatures = minhash_signatures(experiments, tolerance, n_hashes, scale_invariant, seed)
+        rows = n_hashes // bands
+        searched = np.flatnonzero(n_points >= max(min_points, 1))
+        for band in range(bands):
+            buckets = {}
+            band_bytes = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            for position in searched:
+                buckets.setdefault((keys[position], band_bytes[position].tobytes()), []).append(position)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                # Candidates are only compared inside their bucket, once per group already found
+                members = list({groups.find(position): position for position in members}.values())
+                for k, i in enumerate(members):
+                    for j in members[k + 1:]:
+                        if groups.find(i) != groups.find(j) and \
+                                np.mean(signatures[i] == signatures[j]) >= threshold:
+                            groups.union(i, j)
+
+    # Kept experiment of every group: most points, then first position
+    roots = np.array([groups.find(position) for position in range(n)], dtype=np.int64)
+    kept = {}
+    for position in range(n):
+        root = roots[position]
+        best = kept.get(root)
+        if best is None or n_points[position] > n_points[best]:
+            kept[root] = position
+    sizes = np.bincount(roots, minlength=n) if n else np.zeros(0, dtype=np.int64)
+
+    exp_ids = [getattr(experiment, 'exp_id', None) for experiment in experiments]
+    exp_ids = [position if exp_id is None else exp_id for position, exp_id in enumerate(exp_ids)]
+    rows = []
+    for position, experiment in enumerate(experiments):
+        keeper = kept[roots[position]]
+        duplicated = sizes[roots[position]] > 1
+        if not duplicated or keeper == position:
+            kind, duplicate_of, similarity = None, None, np.nan
+        else:
+            kind = 'exact' if hashes[position] == hashes[keeper] else 'near'
+            duplicate_of = exp_ids[keeper]
+            similarity = 1.0 if kind == 'exact' or signatures is None \
+                else float(np.mean(signatures[position] == signatures[keeper]))
+        rows.append({'exp_id': exp_ids[position], 'X4_ID': experiment.X4_ID, 'n_points': int(n_points[position]),
+                     'hash': hashes[position], 'group': int(keeper) if duplicated else -1,
+                     'duplicate_of': duplicate_of, 'kind': kind, 'similarity': similarity})
+    report = pd.DataFrame(rows, columns=['exp_id', 'X4_ID', 'n_points', 'hash', 'group', 'duplicate_of', 'kind',
+                                         'similarity'])
+    report['duplicate_of'] = report['duplicate_of'].astype('Int64')
+    n_exact = int((report['kind'] == 'exact').sum())
+    n_near = int((report['kind'] == 'near').sum())
+    print('{} exact and {} near duplicates found in {} experiments'.format(n_exact, n_near, n))
+    return report
+
+
+def deduplicate_experiments(experiments, mode='drop', **kwargs):
+    """
+    Drops or tags the duplicate experiments of a list, before the classification.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+    mode : str, optional
+        'drop' to return only the kept experiments, or 'tag' to keep every experiment and set its
+        'duplicate_of' (exp_id of the kept experiment, or None) and 'duplicate_kind' ('exact', 'near' or None)
+        attributes. Default is 'drop'.
+    **kwargs :
+        Options of `find_duplicates`.
+
+    Returns:
+    --------
+    experiments : list
+        The kept experiments ('drop') or the same list ('tag').
+    report : pd.DataFrame
+        The report of `find_duplicates`.
+
+    Example:
+    --------
+    experiments, report = deduplicate_experiments(experiments, mode='drop', scale_invariant=True)
+    classify_experiments_by_data(experiments)
+    """
+    if mode not in ('drop', 'tag'):
+        raise ValueError("Unknown mode {}. Use 'drop' or 'tag'".format(mode))
+    report = find_duplicates(experiments, **kwargs)
+    if mode == 'drop':
+        keep = report['kind'].isna().to_numpy()
+        return [experiment for experiment, kept in zip(experiments, keep) if kept], report
+    for experiment, duplicate_of, kind in zip(experiments, report['duplicate_of'], report['kind']):
+        experiment.duplicate_of = None if pd.isna(duplicate_of) else int(duplicate_of)
+        experiment.duplicate_kind = None if pd.isna(kind) else kind
+    return experiments, report
+
+
+def point_hashes(df, columns=None, digits=6):
+    """
+    Computes a hash of every row of a DataFrame, with the numeric values rounded to `digits` significant digits.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A DataFrame of points (e.g. a classified group).
+    columns : list, optional
+        Columns included in the hash. Default is None (every column except the identification columns
+        X4_ID, exp_id and point_index).
+    digits : int, optional
+        Number of significant digits. Default is 6.
+
+    Returns:
+    --------
+    pd.Series
+        uint64 hash of every row.
+    """
+    columns = [column for column in df.columns if column not in ID_COLUMNS] if columns is None else list(columns)
+    rounded = pd.DataFrame({column: round_significant(df[column], digits)
+                            if pd.api.types.is_numeric_dtype(df[column].dtype) else df[column]
+                            for column in columns}, index=df.index)
+    return pd.util.hash_pandas_object(rounded, index=False)
+
+
+def drop_duplicate_points(df, columns=None, digits=6):
+    """
+    Removes the repeated points of a DataFrame (e.g. the same point given by two experiments of a classified
+    group), keeping the first occurrence.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A DataFrame of points.
+    columns : list, optional
+        Columns compared (see `point_hashes`). Default is None.
+    digits : int, optional
+        Number of significant digits. Default is 6.
+
+    Returns:
+    --------
+    pd.DataFrame
+        The DataFrame without the repeated points.
+    """
+    duplicated = point_hashes(df, columns, digits).duplicated().to_numpy()
+    print('{} repeated points dropped out of {}'.format(int(duplicated.sum()), len(df)))
+    return df[~duplicated]
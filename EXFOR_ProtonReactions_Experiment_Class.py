@@ -23,8 +23,9 @@ hrough object attributes.
 DEPENDENCIES:
 - pandas
 - numpy
-- matplotlib
-- seaborn
+- matplotlib (imported when plotting)
+- seaborn (imported when plotting)
+- Decimation (custom module)
 
 USAGE:
 1. Initialize an Experiment object.
@@ -35,8 +36,12 @@ USAGE:
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from EXFOR_ProtonReactions_Decimation import decimate_data
+
+
+# Columns added by prepare_data to identify every data point: 'exp_id' is the compact integer id assigned to
+# the experiment at ingestion and 'point_index' the row of the point in the experiment's data
+ID_COLUMNS = ['X4_ID', 'exp_id', 'point_index']
 
 
 class Experiment:
@@ -71,6 +76,8 @@ class Experiment:
         self.data_points = None
         self.data = pd.DataFrame()
         self.reference = None
+        self.exp_id = None
+        self.schema = None
 
 
     def __str__(self):
@@ -100,6 +107,7 @@ class Experiment:
         if self.data_points != None: print('Data points: ', self.data_points)
         if not self.data.empty: print('Data: ', self.data)
         if self.reference != None: print('Reference:\n', self.reference)
+        if getattr(self, 'exp_id', None) != None: print('Experiment ID: ', self.exp_id)
         return ''
 
 
@@ -201,52 +209,65 @@ class Experiment:
     def prepare_data(self):
         """
         Combines the functionalities of add_numeric_attributes and encode_categorical_attributes to prepare the data for analysis.
+        The identification columns (X4_ID, exp_id and point_index) are added at the end.
         Returns the prepared DataFrame.
         """
         self.add_numeric_attributes()
         self.encode_categorical_attributes()
         self.data['X4_ID'] = str(getattr(self, 'X4_ID'))
+        self.data['exp_id'] = getattr(self, 'exp_id', None)
+        self.data['point_index'] = np.arange(len(self.data))
         return self.data
 
 
-    def plot(self, xlog=False, ylog=False, fig_size=(9,6)):
+    def plot(self, xlog=False, ylog=False, fig_size=(9,6), show=True, max_points=None, decimation='lttb'):
         """
         Creates a plot of the stored data with optional logarithmic scaling for x and/or y axes.
         Parameters:
         - xlog (bool): Whether to use log scale on the x-axis.
         - ylog (bool): Whether to use log scale on the y-axis.
         - fig_size (tuple): Tuple specifying the dimensions of the plot.
+        - show (bool): Whether to show the plot. If False, the figure is returned instead (e.g. to save it).
+        - max_points (int): Maximum number of points to draw. If None, all points are drawn.
+        - decimation (str): Method used to select the drawn points, 'lttb' or 'minmax' (see Decimation module).
         """
         if self.data.empty:
             print('No data to plot')
         else:
+            # Imported here so that the class can be used without loading matplotlib and seaborn
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            # Select the points to draw (all of them if max_points is None)
+            data = decimate_data(self.data, max_points, decimation, xlog=xlog, ylog=ylog)
+
             # check if the data in the third column are all NaN or 0
-            y_err = self.data.iloc[:,2].isnull().values.all() or self.data.iloc[:,2].eq(0).all()
+            y_err = data.iloc[:,2].isnull().values.all() or data.iloc[:,2].eq(0).all()
             # check if the data in the fourth column are all NaN or 0
-            x_err = self.data.iloc[:,3].isnull().values.all() or self.data.iloc[:,3].eq(0).all()
+            x_err = data.iloc[:,3].isnull().values.all() or data.iloc[:,3].eq(0).all()
             
             # Get the headers of the data
-            headers = list(self.data.columns.values)
+            headers = list(data.columns.values)
         
             # Set the size of the plot
-            plt.figure(figsize=fig_size)
+            fig = plt.figure(figsize=fig_size)
             # Plot the data with a scatter plot
             # If y_err and x_err are False, plot the data with error bars
             if y_err == False and x_err == False:
-                plt.errorbar(x=self.data[headers[0]], y=self.data[headers[1]], 
-                            xerr=self.data[headers[3]], yerr=self.data[headers[2]],
+                plt.errorbar(x=data[headers[0]], y=data[headers[1]], 
+                            xerr=data[headers[3]], yerr=data[headers[2]],
                             fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5)
             # If y_err is False, plot the data with error bars on the y-axis
             elif y_err == False:
-                plt.errorbar(x=self.data[headers[0]], y=self.data[headers[1]], yerr=self.data[headers[2]], 
+                plt.errorbar(x=data[headers[0]], y=data[headers[1]], yerr=data[headers[2]], 
                             fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5,)
             # If x_err is False, plot the data with error bars on the x-axis
             elif x_err == False:
-                plt.errorbar(x=self.data[headers[0]], y=self.data[headers[1]], xerr=self.data[headers[3]], 
+                plt.errorbar(x=data[headers[0]], y=data[headers[1]], xerr=data[headers[3]], 
                             fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5,)
             # If y_err and x_err are False, plot the data without error bars
             else:
-                sns.scatterplot(x=headers[0], y=headers[1], data=self.data)
+                sns.scatterplot(x=headers[0], y=headers[1], data=data)
 
 
             # Set the scale of the plot
@@ -261,7 +282,8 @@ class Experiment:
             # Set the ticks of the plot
             plt.xticks(fontsize=14)
             plt.yticks(fontsize=14)
-            # Show the plot
+            # Show the plot or return the figure
+            if not show: return fig
             plt.show()
             
 
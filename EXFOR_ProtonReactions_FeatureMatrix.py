@@ -0,0 +1,487 @@
+"""
+================================================================================
+TITLE: Memory-Mapped Feature Matrices for Outlier Detection
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script stores the features of a prepared (classified) group as an
+    on-disk matrix that the scikit-learn detectors read through a memory map,
+    instead of the pandas frames read from CSV files. A matrix is a directory
+    with the features as a float32 or float64 .npy file, the point keys
+    (experiment id and point index) of every row, the X4_ID of every row and a
+    JSON manifest with the names of the columns. The matrix is written chunk by
+    chunk, scaled chunk by chunk into a second file (or in place) and the
+    original values of any row are read back by index, so no inverse transform
+    is needed. A detector run then needs about one copy of the matrix in memory
+    (the one scikit-learn makes to fit), instead of the DataFrame, its float64
+    copy, the scaled copy and the inverse-transformed copy.
+
+MAIN FEATURES:
+    - Chunked writing of a feature matrix from a classified group CSV file or DataFrame.
+    - Memory-mapped, read-only access to the features and the point keys.
+    - Chunked scaling into a separate file, or in place.
+    - Recovery of the original values (and IDs) of any rows by index.
+    - Outlier detection on the matrix, with optional stratified subsample fits.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - scikit-learn (imported when a scaler is needed)
+    - OutlierDetection and ScoreStore (custom modules)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_FeatureMatrix as fm`
+    2. Write the matrix: `matrix = fm.write_feature_matrix('EXFOR_ProtonReactions_Classified_Group_1.csv', 'group_1')`
+    3. Detect outliers: `outliers_df, scores = fm.detect_outliers_in_matrix(matrix, OneClassSVM(nu=0.001), fit_budget=20000)`
+    4. Reopen it later: `matrix = fm.FeatureMatrix('group_1')`, then `matrix.original(rows)`
+================================================================================
+"""
+
+import os
+import json
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import ID_COLUMNS
+from EXFOR_ProtonReactions_OutlierDetection import (feature_columns, channel_columns, fit_scaler, score_in_chunks,
+                                                    stratified_subsample)
+from EXFOR_ProtonReactions_ScoreStore import combine_keys, split_keys, point_keys
+
+
+# Files of a feature matrix directory
+FEATURES_FILE = 'features.npy'
+SCALED_FILE = 'scaled.npy'
+KEYS_FILE = 'keys.npy'
+STRATA_FILE = 'strata.npy'
+X4_ID_FILE = 'x4_ids.npy'
+MANIFEST_FILE = 'manifest.json'
+
+
+def _chunks(n, chunk_size):
+    """
+    Yields (start, stop) bounds of consecutive chunks.
+    """
+    for start in range(0, n, chunk_size):
+        yield start, min(start + chunk_size, n)
+
+
+def _save(path, name, array):
+    """
+    Atomically writes an array to a .npy file of the matrix directory.
+    """
+    temp_path = os.path.join(path, name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(temp_path, os.path.join(path, name))
+
+
+def _save_manifest(path, manifest):
+    """
+    Atomically writes the manifest of a matrix.
+    """
+    temp_path = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, os.path.join(path, MANIFEST_FILE))
+
+
+def write_feature_matrix(source, path, dtype=np.float32, chunk_size=100000):
+    """
+    Writes the features of a classified group to a feature matrix directory, chunk by chunk.
+
+    The features are all the columns but the identification columns (see `feature_columns`). Only the ID
+    columns and one chunk of the group are in memory at any time when the source is a CSV file.
+
+    Parameters:
+    -----------
+    source : str or pd.DataFrame
+        A classified group CSV file (e.g. 'EXFOR_ProtonReactions_Classified_Group_1.csv', optionally cleaned with
+        `clean_dataframe`) or DataFrame.
+    path : str
+        Directory of the matrix. It is created if it does not exist and any previous matrix is replaced.
+    dtype : numpy dtype, optional
+        Type of the stored features, np.float32 or np.float64. Default is np.float32 (half the memory).
+    chunk_size : int, optional
+        Number of rows read and written at a time. Default is 100000.
+
+    Returns:
+    --------
+    FeatureMatrix
+        The written matrix.
+
+    Raises:
+    -------
+    ValueError:
+        If the source has no 'exp_id' and 'point_index' columns (see `point_keys`).
+
+    Example:
+    --------
+    matrix = write_feature_matrix('EXFOR_ProtonReactions_Classified_Group_1.csv', 'group_1')
+    """
+    os.makedirs(path, exist_ok=True)
+    if isinstance(source, pd.DataFrame):
+        header = list(source.columns)
+        ids = source[[col for col in ID_COLUMNS if col in header]]
+        chunks = (source.iloc[start:stop] for start, stop in _chunks(len(source), chunk_size))
+    else:
+        header = list(pd.read_csv(source, nrows=0).columns)
+        ids = pd.read_csv(source, usecols=[col for col in ID_COLUMNS if col in header])
+        chunks = pd.read_csv(source, chunksize=chunk_size)
+    columns = feature_columns(pd.DataFrame(columns=header))
+    # Before writing anything: raises if the rows have no point ids
+    keys = combine_keys(*point_keys(ids))
+
+    # Features, written through a memory map so that the whole matrix is never in memory
+    temp_path = os.path.join(path, FEATURES_FILE + '.tmp')
+    X = np.lib.format.open_memmap(temp_path, mode='w+', dtype=dtype, shape=(len(ids), len(columns)))
+    start = 0
+    for chunk in chunks:
+        X[start:start + len(chunk)] = chunk[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        start += len(chunk)
+    X.flush()
+    del X
+    if start != len(ids):
+        os.remove(temp_path)
+        raise ValueError('{} rows of features read for {} rows of IDs'.format(start, len(ids)))
+    os.replace(temp_path, os.path.join(path, FEATURES_FILE))
+
+    # Point keys and X4_IDs of every row
+    _save(path, KEYS_FILE, keys)
+    if 'X4_ID' in ids.columns:
+        _save(path, X4_ID_FILE, ids['X4_ID'].astype(str).to_numpy(dtype=str))
+    elif os.path.exists(os.path.join(path, X4_ID_FILE)):
+        os.remove(os.path.join(path, X4_ID_FILE))
+    for name in (SCALED_FILE, STRATA_FILE):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+    _save_manifest(path, {'columns': columns, 'dtype': np.dtype(dtype).str, 'n_rows': len(ids),
+                          'source': source if isinstance(source, str) else None, 'scaled': None})
+    return FeatureMatrix(path)
+
+
+class FeatureMatrix:
+    """
+    Feature matrix of a classified group stored on disk (see `write_feature_matrix`).
+
+    The arrays returned by `X`, `scaled` and `keys` are read-only memory maps: slicing them only reads the
+    selected rows from disk.
+    """
+    def __init__(self, path):
+        """
+        Opens the matrix stored in the directory `path`.
+        """
+        with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+        self.path = path                                    # Directory of the matrix
+        self.manifest = manifest                            # Contents of the manifest
+        self.columns = manifest['columns']                  # Names of the feature columns
+
+
+    def __len__(self):
+        """
+        Returns the number of rows.
+        """
+        return self.manifest['n_rows']
+
+
+    def _load(self, name, mode='r'):
+        """
+        Memory-maps a .npy file of the matrix.
+        """
+        return np.load(os.path.join(self.path, name), mmap_mode=mode)
+
+
+    @property
+    def X(self):
+        """
+        The original (unscaled) features. Not available after scaling in place.
+        """
+        if self.scaled_in_place:
+            raise ValueError('The matrix was scaled in place, the original values are not stored. Recover them '
+                             'by index from the experiments (see `ids`)')
+        return self._load(FEATURES_FILE)
+
+
+    @property
+    def is_scaled(self):
+        """
+        Whether the matrix has been scaled.
+        """
+        return self.manifest['scaled'] is not None
+
+
+    @property
+    def scaled_in_place(self):
+        """
+        Whether the matrix was scaled in place.
+        """
+        return self.is_scaled and self.manifest['scaled']['in_place']
+
+
+    @property
+    def scaled(self):
+        """
+        The scaled features (see `scale`).
+        """
+        if not self.is_scaled:
+            raise ValueError('The matrix is not scaled. Use scale first')
+        return self._load(FEATURES_FILE if self.scaled_in_place else SCALED_FILE)
+
+
+    @property
+    def keys(self):
+        """
+        The int64 point key (experiment id and point index, see `combine_keys`) of every row.
+        """
+        return self._load(KEYS_FILE)
+
+
+    def ids(self, rows=None):
+        """
+        Returns the identification columns (X4_ID if stored, exp_id and point_index) of some rows.
+
+        Parameters:
+        -----------
+        rows : array-like, optional
+            Positional indices or boolean mask of the rows. Default is None (all rows).
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per selected row.
+        """
+        rows = slice(None) if rows is None else rows
+        exp_id, point_index = split_keys(self.keys[rows])
+        ids = {}
+        if os.path.exists(os.path.join(self.path, X4_ID_FILE)):
+            ids['X4_ID'] = self._load(X4_ID_FILE)[rows]
+        ids['exp_id'] = exp_id
+        ids['point_index'] = point_index
+        return pd.DataFrame(ids)
+
+
+    def column(self, name, scaled=False):
+        """
+        Returns a feature column (a strided view of the memory map).
+        """
+        return (self.scaled if scaled else self.X)[:, self.columns.index(name)]
+
+
+    def strata_columns(self, energy_column=None):
+        """
+        Returns the names of the columns that define the strata of `stratified_subsample` (reaction channel and
+        energy).
+        """
+        columns = channel_columns(pd.DataFrame(columns=self.columns))
+        energy_columns = [energy_column] if energy_column else ['E', 'E_inc']
+        return columns + [col for col in energy_columns if col in self.columns and col not in columns]
+
+
+    def strata_dataframe(self, energy_column=None):
+        """
+        Returns the original values of the strata columns (see `strata_columns`).
+
+        After scaling in place they are read from the copy saved before scaling (only the default energy
+        columns 'E' and 'E_inc' are saved).
+        """
+        columns = self.strata_columns(energy_column)
+        if not self.scaled_in_place:
+            return pd.DataFrame({col: self.column(col) for col in columns})
+        saved = self.manifest['scaled'].get('strata_columns', [])
+        missing = [col for col in columns if col not in saved]
+        if missing:
+            raise ValueError('The matrix was scaled in place and the original values of {} were not saved. Scale '
+                             'it with in_place=False to stratify by them'.format(missing))
+        values = self._load(STRATA_FILE)
+        return pd.DataFrame({col: values[:, saved.index(col)] for col in columns})
+
+
+    def original(self, rows):
+        """
+        Returns the original values of some rows, read by index (no inverse transform).
+
+        Parameters:
+        -----------
+        rows : array-like
+            Positional indices or boolean mask of the rows.
+
+        Returns:
+        --------
+        np.ndarray
+            The original features of the selected rows.
+        """
+        return np.asarray(self.X[rows])
+
+
+    def dataframe(self, rows=None, scaled=False):
+        """
+        Returns some rows as a classified group DataFrame: the IDs and the original (or scaled) features.
+
+        If the matrix was scaled in place only the IDs are returned (the values can be recovered from the
+        experiments with the IDs, as `plot_outliers` does).
+        """
+        rows = slice(None) if rows is None else rows
+        ids = self.ids(rows)
+        if not scaled and self.scaled_in_place:
+            return ids
+        values = self.scaled[rows] if scaled else self.X[rows]
+        features = pd.DataFrame(np.asarray(values), columns=self.columns, index=ids.index)
+        return pd.concat([features, ids], axis=1)
+
+
+    def scale(self, scaler=None, in_place=False, chunk_size=100000):
+        """
+        Fits a scaler on the features and writes the scaled features, chunk by chunk.
+
+        Parameters:
+        -----------
+        scaler : object, optional
+            An unfitted scikit-learn scaler, fitted in chunks if it supports `partial_fit` (StandardScaler,
+            MinMaxScaler, MaxAbsScaler). Default is StandardScaler().
+        in_place : bool, optional
+            Whether to overwrite the original features instead of writing a second file. This saves the disk
+            space of a copy, but the original values are then only available from the experiments. Default is
+            False.
+        chunk_size : int, optional
+            Number of rows scaled at a time. Default is 100000.
+
+        Returns:
+        --------
+        object
+            The fitted scaler.
+        """
+        X = self.X
+        scaler = fit_scaler(X, scaler, chunk_size)
+        strata_columns = self.strata_columns()
+        if in_place:
+            # The strata of the subsample fits are computed on the original values
+            _save(self.path, STRATA_FILE, np.asarray(X[:, [self.columns.index(col) for col in strata_columns]]))
+            target = self._load(FEATURES_FILE, mode='r+')
+        else:
+            temp_path = os.path.join(self.path, SCALED_FILE + '.tmp')
+            target = np.lib.format.open_memmap(temp_path, mode='w+', dtype=X.dtype, shape=X.shape)
+        for start, stop in _chunks(len(X), chunk_size):
+            target[start:stop] = scaler.transform(X[start:stop])
+        target.flush()
+        del target, X
+        if not in_place:
+            os.replace(temp_path, os.path.join(self.path, SCALED_FILE))
+
+        self.manifest['scaled'] = {'scaler': type(scaler).__name__, 'in_place': in_place}
+        if in_place:
+            self.manifest['scaled']['strata_columns'] = strata_columns
+        _save_manifest(self.path, self.manifest)
+        return scaler
+
+
+def fit_and_score_matrix(matrix, detector, scaler=None, fit_budget=None, energy_column=None, min_per_stratum=1,
+                         chunk_size=50000, random_state=0, in_place=False):
+    """
+    Fits a detector on a feature matrix (or on a stratified subsample of it) and scores every row.
+
+    This is `fit_and_score` of the OutlierDetection module on the memory-mapped matrix: the matrix is scaled
+    chunk by chunk on disk (if it is not scaled yet) and scored chunk by chunk, so the only full copy in memory
+    is the one the detector makes to fit.
+
+    Parameters:
+    -----------
+    matrix : FeatureMatrix
+        The feature matrix of a classified group.
+    detector : object
+        An unfitted scikit-learn outlier detector. Detectors that cannot score new points (LocalOutlierFactor
+        with `novelty=False`) are fitted and labelled with `fit_predict` on all the rows, so they need
+        `fit_budget=None`.
+    scaler : object, optional
+        An unfitted scaler. If given (or if the matrix is not scaled yet) the matrix is scaled with it. Default
+        is None (StandardScaler() if the matrix is not scaled).
+    fit_budget : int, optional
+        Number of rows of the stratified fitting subsample. If None the detector is fitted on all the rows.
+    energy_column : str, optional
+        The column holding the energy used for stratification (see `energy_strata`).
+    min_per_stratum : int, optional
+        Minimum number of rows per stratum in the subsample. Default is 1.
+    chunk_size : int, optional
+        Number of rows scaled and scored at a time. Default is 50000.
+    random_state : int, optional
+        Seed of the subsampling. Default is 0.
+    in_place : bool, optional
+        Whether to scale the matrix in place (see `FeatureMatrix.scale`). Default is False.
+
+    Returns:
+    --------
+    tuple
+        (scores, is_outlier, fit_index): decision function and outlier mask of every row and the positional
+        indices of the rows used for fitting.
+    """
+    # Transductive detectors only label the points they are fitted on
+    transductive = not hasattr(detector, 'predict')
+    if transductive and fit_budget is not None:
+        raise ValueError('{} cannot score points outside its fitting subsample. Use fit_budget=None or a detector '
+                         'that supports new points (e.g. LocalOutlierFactor(novelty=True)).'.format(
+                             type(detector).__name__))
+
+    if fit_budget is None:
+        fit_index = None
+    else:
+        # The strata are computed on the original values, also for a matrix already scaled in place
+        strata = matrix.strata_dataframe(energy_column)
+        fit_index = stratified_subsample(strata, fit_budget, energy_column, min_per_stratum, random_state)
+
+    if scaler is not None or not matrix.is_scaled:
+        matrix.scale(scaler, in_place, chunk_size)
+    X = matrix.scaled
+    if transductive:
+        is_outlier = detector.fit_predict(X) == -1
+        # Same scale as decision_function: lower is more anomalous, negative for outliers
+        scores = detector.negative_outlier_factor_ - detector.offset_
+        return scores, is_outlier, np.arange(len(matrix), dtype=np.int64)
+
+    detector.fit(X if fit_index is None else X[fit_index])
+    scores, is_outlier = score_in_chunks(detector, X, None, chunk_size)
+    if fit_index is None:
+        fit_index = np.arange(len(matrix), dtype=np.int64)
+    return scores, is_outlier, fit_index
+
+
+def detect_outliers_in_matrix(matrix, detector, scaler=None, fit_budget=None, store=None, method=None, **kwargs):
+    """
+    Detects the outliers of a feature matrix, optionally fitting the detector on a stratified subsample.
+
+    Parameters:
+    -----------
+    matrix : FeatureMatrix
+        The feature matrix of a classified group.
+    detector : object
+        An unfitted scikit-learn outlier detector, e.g. OneClassSVM(kernel='rbf', nu=0.001).
+    scaler : object, optional
+        An unfitted scaler (see `fit_and_score_matrix`).
+    fit_budget : int, optional
+        Number of rows of the stratified fitting subsample. If None the detector is fitted on all the rows.
+    store : ScoreStore, optional
+        If given, the scores and verdicts of every row are written to it, keyed by the point keys of the matrix.
+    method : str, optional
+        Name of the method in the store. Default is None (the class name of the detector in lower case).
+    **kwargs :
+        Extra arguments passed to `fit_and_score_matrix`.
+
+    Returns:
+    --------
+    outliers_df : pd.DataFrame
+        The outlier rows with their original values, recovered by index, and IDs, ready for `plot_outliers`.
+    scores : np.ndarray
+        The decision function of every row (lower is more anomalous, negative for outliers).
+
+    Example:
+    --------
+    outliers_df, scores = detect_outliers_in_matrix(matrix, OneClassSVM(kernel='rbf', nu=0.001), fit_budget=20000)
+    """
+    scores, is_outlier, _ = fit_and_score_matrix(matrix, detector, scaler, fit_budget, **kwargs)
+    if store is not None:
+        method = type(detector).__name__.lower() if method is None else method
+        exp_id, point_index = split_keys(matrix.keys)
+        store.write(method, exp_id, point_index, scores, is_outlier, higher_is_outlier=False,
+                    params={'detector': repr(detector), 'fit_budget': fit_budget})
+    outliers_df = matrix.dataframe(np.flatnonzero(is_outlier))
+    print('Percentage of outliers: {:.2f}%'.format(len(outliers_df) / len(matrix) * 100))
+    return outliers_df, scores
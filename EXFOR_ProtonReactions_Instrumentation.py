@@ -0,0 +1,351 @@
+"""
+================================================================================
+TITLE: Timing, Memory and Progress Instrumentation of the Preprocessing Pipeline
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script measures where the time and the memory go in the preprocessing
+    pipeline (parse, serialize, prepare, classify, clean and detect). Every
+    stage is timed (wall and CPU time) together with the memory it keeps, the time
+    needed to parse every file is recorded, and the per-item prints of the long
+    loops are replaced by a progress reporter that prints at most once every
+    few seconds. The measurements are written to a JSON report that can be
+    compared across runs.
+
+MAIN FEATURES:
+    - Stage timers (wall and CPU time, number of calls and of items processed).
+    - Memory per stage: change of the resident set size of the process over the
+      stage, its lifetime peak at the end of the stage and, optionally, the
+      peak of the Python allocations traced with `tracemalloc`.
+    - Per-file parse timings with summary statistics and the slowest files.
+    - Rate-limited progress reporter with rate and estimated time left.
+    - Machine-readable JSON report.
+
+DEPENDENCIES:
+    - Standard library only (the current resident set size is read from
+      /proc/self/statm on Linux and the lifetime peak from `resource`, when
+      available, i.e. not on Windows).
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Instrumentation as ins`
+    2. Create the instrumentation: `inst = ins.Instrumentation()`
+    3. Time a stage: `with inst.stage('serialize'): write_experiments_to_binary(experiments, 'db.bin')`, or pass
+       it to a function that times its own stage: `write_experiments_to_binary(experiments, 'db.bin', inst)`
+    4. Pass it to the readers: `read_proton_experiments_from_exfortables(path, instrumentation=inst)`
+    5. Save the report: `inst.save_report('preprocessing_report.json')`
+================================================================================
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:         # Not available on Windows
+    resource = None
+
+
+# Stages of the preprocessing pipeline, in order
+PIPELINE_STAGES = ['parse', 'serialize', 'prepare', 'classify', 'clean', 'detect']
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the process since it started in MB, or None if it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes on Linux
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    """
+    Returns the current resident set size of the process in MB, or None if it cannot be measured (no /proc).
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024**2
+
+
+def optional_stage(instrumentation, name):
+    """
+    Returns the stage timer of an Instrumentation object, or a context that does nothing if it is None.
+
+    Used by the functions that accept an `instrumentation` argument: `with optional_stage(instrumentation,
+    'clean') as record: ...` (the yielded record is a plain dictionary in both cases).
+    """
+    return instrumentation.stage(name) if instrumentation is not None else nullcontext({})
+
+
+class ProgressReporter:
+    """
+    Prints the progress of a long loop at most once every `interval` seconds.
+
+    Example:
+    --------
+    progress = ProgressReporter(len(files), 'Reading experiments')
+    for f in files:
+        ...
+        progress.update()
+    progress.close()
+    """
+    def __init__(self, total=None, label='Progress', interval=5.0, enabled=True):
+        """
+        Initializes the reporter.
+
+        Parameters:
+        -----------
+        total : int, optional
+            Total number of items, if known. Default is None.
+        label : str, optional
+            Text printed before the progress. Default is 'Progress'.
+        interval : float, optional
+            Minimum number of seconds between two prints. Default is 5.
+        enabled : bool, optional
+            If False, nothing is printed. Default is True.
+        """
+        self.total = total                          # Total number of items (None if unknown)
+        self.label = label                          # Text printed before the progress
+        self.interval = interval                    # Minimum time between prints (s)
+        self.enabled = enabled                      # Whether anything is printed
+        self.count = 0                              # Items processed so far
+        self.start = time.perf_counter()            # Start time
+        self._last = self.start                     # Time of the last print
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def _message(self, now):
+        """
+        Builds the progress line.
+        """
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            message = '{}: {}/{} ({:.1f}%), {:.1f}/s'.format(self.label, self.count, self.total,
+                                                            100 * self.count / self.total, rate)
+            if rate > 0 and self.count < self.total:
+                message += ', ETA {:.0f}s'.format((self.total - self.count) / rate)
+        else:
+            message = '{}: {}, {:.1f}/s'.format(self.label, self.count, rate)
+        return message
+
+
+    def update(self, n=1):
+        """
+        Adds `n` processed items and prints the progress if `interval` seconds have passed since the last print.
+        """
+        self.count += n
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            print(self._message(now))
+
+
+    def close(self):
+        """
+        Prints the final count and the total time.
+        """
+        if self.enabled:
+            now = time.perf_counter()
+            print('{} ({:.1f}s)'.format(self._message(now).split(', ETA')[0], now - self.start))
+        self.enabled = False
+
+
+class Instrumentation:
+    """
+    Collects stage timings, peak memory and per-file parse timings, and writes them to a JSON report.
+    """
+    def __init__(self, trace_memory=False, progress_interval=5.0):
+        """
+        Initializes the instrumentation.
+
+        Parameters:
+        -----------
+        trace_memory : bool, optional
+            If True, the peak of the Python allocations of every stage is measured with `tracemalloc`. This is
+            exact but slows down allocation-heavy code. Default is False (only the resident set size is measured).
+        progress_interval : float, optional
+            Interval of the progress reporters created with `progress`. Default is 5 seconds.
+        """
+        self.trace_memory = trace_memory                # Whether tracemalloc is used
+        self.progress_interval = progress_interval      # Interval of the progress reporters (s)
+        self.stages = {}                                # Stage name -> accumulated measurements
+        self.files = []                                 # (file, parse time in s) of every parsed file
+        self.created = time.time()                      # Creation time (epoch)
+
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """
+        Times a stage of the pipeline. Stages with the same name are accumulated.
+
+        The memory recorded is 'rss_delta_mb', the change of the current resident set size between the start and
+        the end of the stage (the largest one over the calls), which is the memory the stage keeps, and
+        'lifetime_peak_rss_mb', the peak resident set size of the process up to the end of the stage, which
+        includes every earlier stage. The peak within a stage is only measured with `trace_memory`.
+
+        Parameters:
+        -----------
+        name : str
+            Name of the stage (e.g. one of PIPELINE_STAGES).
+        items : int, optional
+            Number of items processed by the stage (experiments, rows, ...), used to compute the throughput.
+            It can also be set inside the block through the yielded record: `record['items'] = n`.
+
+        Example:
+        --------
+        with inst.stage('clean') as record:
+            df = clean_dataframe(df)
+            record['items'] = len(df)
+        """
+        record = {'items': items}
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        rss_start = current_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            rss_end = current_rss_mb()
+            peak_traced = None
+            if self.trace_memory:
+                peak_traced = tracemalloc.get_traced_memory()[1] / 1024**2
+                if started_tracing:
+                    tracemalloc.stop()
+
+            stage = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'items': None,
+                                                  'rss_delta_mb': None, 'lifetime_peak_rss_mb': None,
+                                                  'peak_traced_mb': None})
+            stage['calls'] += 1
+            stage['wall_s'] += wall
+            stage['cpu_s'] += cpu
+            if record.get('items') is not None:
+                stage['items'] = (stage['items'] or 0) + record['items']
+            if rss_start is not None and rss_end is not None:
+                delta = rss_end - rss_start
+                stage['rss_delta_mb'] = delta if stage['rss_delta_mb'] is None else max(stage['rss_delta_mb'], delta)
+            stage['lifetime_peak_rss_mb'] = peak_rss_mb()
+            if peak_traced is not None:
+                stage['peak_traced_mb'] = max(stage['peak_traced_mb'] or 0.0, peak_traced)
+
+
+    def record_file(self, filename, seconds):
+        """
+        Records the time needed to parse a file.
+        """
+        self.files.append((filename, seconds))
+
+
+    def progress(self, total=None, label='Progress', enabled=True):
+        """
+        Creates a ProgressReporter with the interval of this instrumentation.
+        """
+        return ProgressReporter(total, label, self.progress_interval, enabled)
+
+
+    def file_statistics(self, n_slowest=20):
+        """
+        Summarizes the per-file parse timings.
+
+        Parameters:
+        -----------
+        n_slowest : int, optional
+            Number of slowest files listed. Default is 20.
+
+        Returns:
+        --------
+        dict
+            Number of files, total, mean, median, 95th percentile and maximum time (s) and the slowest files.
+        """
+        if not self.files:
+            return {'count': 0}
+        times = sorted(seconds for _, seconds in self.files)
+        n = len(times)
+        slowest = sorted(self.files, key=lambda item: item[1], reverse=True)[:n_slowest]
+        return {'count': n,
+                'total_s': sum(times),
+                'mean_s': sum(times) / n,
+                'median_s': times[n // 2],
+                'p95_s': times[min(n - 1, int(0.95 * n))],
+                'max_s': times[-1],
+                'slowest': [{'file': filename, 'seconds': seconds} for filename, seconds in slowest]}
+
+
+    def report(self):
+        """
+        Builds the report as a dictionary (see `save_report`).
+        """
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            if stage['items'] is not None and stage['wall_s'] > 0:
+                stage['items_per_s'] = stage['items'] / stage['wall_s']
+            stages[name] = stage
+        return {'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'rss_mb': current_rss_mb(),
+                'lifetime_peak_rss_mb': peak_rss_mb(),
+                'stages': stages,
+                'files': self.file_statistics()}
+
+
+    def save_report(self, filename):
+        """
+        Writes the report to a JSON file.
+
+        Parameters:
+        -----------
+        filename : str
+            The name of the output JSON file.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+    def summary(self):
+        """
+        Prints a table with the measurements of every stage.
+        """
+        print('{:<12}{:>7}{:>11}{:>11}{:>12}{:>16}{:>20}'.format('Stage', 'Calls', 'Wall (s)', 'CPU (s)', 'Items/s',
+                                                                 'RSS delta (MB)', 'Lifetime peak (MB)'))
+        ordered = [name for name in PIPELINE_STAGES if name in self.stages]
+        ordered += [name for name in self.stages if name not in PIPELINE_STAGES]
+        for name in ordered:
+            stage = self.stages[name]
+            rate = stage['items'] / stage['wall_s'] if stage['items'] and stage['wall_s'] > 0 else None
+            print('{:<12}{:>7}{:>11.2f}{:>11.2f}{:>12}{:>16}{:>20}'.format(
+                name, stage['calls'], stage['wall_s'], stage['cpu_s'],
+                '-' if rate is None else '{:.1f}'.format(rate),
+                '-' if stage['rss_delta_mb'] is None else '{:+.1f}'.format(stage['rss_delta_mb']),
+                '-' if stage['lifetime_peak_rss_mb'] is None else '{:.1f}'.format(stage['lifetime_peak_rss_mb'])))
+        files = self.file_statistics(n_slowest=0)
+        if files['count']:
+            print('{} files parsed: mean {:.2f} ms, p95 {:.2f} ms, max {:.2f} ms'.format(
+                files['count'], 1e3 * files['mean_s'], 1e3 * files['p95_s'], 1e3 * files['max_s']))
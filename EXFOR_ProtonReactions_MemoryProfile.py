@@ -0,0 +1,331 @@
+"""
+================================================================================
+TITLE: Memory Footprint Accounting of a Loaded Experiment Database
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script measures how much memory a loaded list of Experiment objects
+    uses and where it goes, to find out where a more compact representation
+    would pay off. Every experiment is split into the Experiment object itself,
+    its scalar attributes, its reference string and its 'data' DataFrame, and
+    the DataFrame is further split into the numeric values, the object/string
+    columns and the fixed overhead of the DataFrame container (index, blocks,
+    column labels). The results are given per experiment, per attribute, per
+    data column and aggregated by reaction, quantity and MT.
+
+MAIN FEATURES:
+    - Deep memory usage of every experiment by component.
+    - Estimation of the DataFrame container overhead (measured once per schema).
+    - Memory per Experiment attribute and per data column.
+    - Aggregation by reaction, quantity and MT (or any attribute).
+    - Printed summary with the share of every component.
+
+DEPENDENCIES:
+    - pandas
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_MemoryProfile as mp`
+    2. Per-experiment report: `report = mp.memory_report(experiments)`
+    3. Aggregate: `mp.aggregate_memory(report, by=['reaction', 'quantity', 'MT'])`
+    4. Print a summary: `mp.print_memory_summary(experiments)`
+================================================================================
+"""
+
+import sys
+import tracemalloc
+import pandas as pd
+
+
+# Components of the memory of an experiment, in the order they are reported
+MEMORY_COMPONENTS = ['object_bytes', 'attributes_bytes', 'reference_bytes', 'data_values_bytes',
+                     'data_object_bytes', 'data_overhead_bytes']
+
+# Cache of the measured DataFrame overhead per schema (column names and dtypes)
+_OVERHEAD_CACHE = {}
+
+
+def value_size(value):
+    """
+    Returns the memory used by a scalar attribute value (str, int, float, ...) in bytes.
+
+    None is shared by every object, so it counts as 0. Other shared objects (small integers, interned strings)
+    are counted as if they were owned by the experiment, so the result is an upper bound.
+    """
+    if value is None:
+        return 0
+    return sys.getsizeof(value)
+
+
+def is_object_column(dtype):
+    """
+    Tells whether a data column stores Python objects (object or string dtype) instead of packed numbers.
+    """
+    return not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype))
+
+
+def dataframe_overhead(data):
+    """
+    Estimates the fixed memory of a DataFrame that does not depend on its number of rows.
+
+    The overhead (index, block manager, column labels, ...) is measured with `tracemalloc` by copying an empty
+    slice of the DataFrame, which keeps its column names, dtypes and block layout. The copy is made twice and only
+    the second one is measured, so that the caches filled by pandas on first use are not counted. The result is
+    cached per schema, so the cost is paid once for every distinct set of columns.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        The DataFrame whose overhead is estimated.
+
+    Returns:
+    --------
+    int
+        The estimated overhead in bytes.
+    """
+    schema = tuple((str(column), str(dtype)) for column, dtype in data.dtypes.items())
+    if schema not in _OVERHEAD_CACHE:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        warm_up = data.iloc[:0].copy()
+        before = tracemalloc.get_traced_memory()[0]
+        empty = data.iloc[:0].copy()
+        after = tracemalloc.get_traced_memory()[0]
+        if started:
+            tracemalloc.stop()
+        del warm_up, empty
+        _OVERHEAD_CACHE[schema] = max(after - before, 0)
+    return _OVERHEAD_CACHE[schema]
+
+
+def experiment_footprint(experiment):
+    """
+    Measures the memory of one experiment, split by component.
+
+    Parameters:
+    -----------
+    experiment : Experiment
+        The experiment to measure.
+
+    Returns:
+    --------
+    dict
+        'object_bytes' (Experiment object and its attribute dictionary), 'attributes_bytes' (scalar attributes
+        except the reference), 'reference_bytes', 'data_values_bytes' (numeric columns), 'data_object_bytes'
+        (object/string columns, including the Python objects), 'data_overhead_bytes' (DataFrame container),
+        'total_bytes', 'n_points' and 'attributes' (bytes of every attribute).
+    """
+    footprint = dict.fromkeys(MEMORY_COMPONENTS, 0)
+    footprint['object_bytes'] = sys.getsizeof(experiment) + sys.getsizeof(vars(experiment))
+
+    attributes = {}
+    for name, value in vars(experiment).items():
+        if isinstance(value, pd.DataFrame):
+            continue
+        attributes[name] = value_size(value)
+    footprint['reference_bytes'] = attributes.get('reference', 0)
+    footprint['attributes_bytes'] = sum(size for name, size in attributes.items() if name != 'reference')
+
+    data = getattr(experiment, 'data', None)
+    if isinstance(data, pd.DataFrame):
+        for column in data.columns:
+            series = data[column]
+            if is_object_column(series.dtype):
+                footprint['data_object_bytes'] += int(series.memory_usage(index=False, deep=True))
+            else:
+                footprint['data_values_bytes'] += int(series.memory_usage(index=False, deep=False))
+        footprint['data_overhead_bytes'] = dataframe_overhead(data) + int(data.index.memory_usage(deep=True))
+        attributes['data'] = sum(footprint[key] for key in ['data_values_bytes', 'data_object_bytes', 'data_overhead_bytes'])
+        footprint['n_points'] = len(data)
+    else:
+        footprint['n_points'] = 0
+
+    footprint['total_bytes'] = sum(footprint[key] for key in MEMORY_COMPONENTS)
+    footprint['attributes'] = attributes
+    return footprint
+
+
+def memory_report(experiments):
+    """
+    Measures the memory of every experiment of a list.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    report : pd.DataFrame
+        One row per experiment with its identification (exp_id, X4_ID, reaction, quantity, MT), its number of
+        points and the bytes of every component (see `experiment_footprint`).
+
+    Example:
+    --------
+    report = memory_report(experiments)
+    report.sort_values('total_bytes', ascending=False).head(20)
+    """
+    rows = []
+    for position, experiment in enumerate(experiments):
+        footprint = experiment_footprint(experiment)
+        footprint.pop('attributes')
+        exp_id = getattr(experiment, 'exp_id', None)
+        row = {'exp_id': position if exp_id is None else exp_id,
+               'X4_ID': getattr(experiment, 'X4_ID', None),
+               'reaction': getattr(experiment, 'reaction', None),
+               'quantity': getattr(experiment, 'quantity', None),
+               'MT': getattr(experiment, 'MT', None)}
+        row.update(footprint)
+        rows.append(row)
+    columns = ['exp_id', 'X4_ID', 'reaction', 'quantity', 'MT', 'n_points'] + MEMORY_COMPONENTS + ['total_bytes']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def attribute_report(experiments):
+    """
+    Measures the memory used by every attribute of the Experiment objects, summed over all the experiments.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per attribute with the total bytes, the mean bytes per experiment and the share of the total,
+        sorted by decreasing total.
+    """
+    totals = {}
+    for experiment in experiments:
+        for name, size in experiment_footprint(experiment)['attributes'].items():
+            totals[name] = totals.get(name, 0) + size
+    report = pd.DataFrame({'attribute': list(totals), 'total_bytes': list(totals.values())})
+    report['mean_bytes'] = report['total_bytes'] / max(len(experiments), 1)
+    report['share'] = report['total_bytes'] / max(report['total_bytes'].sum(), 1)
+    return report.sort_values('total_bytes', ascending=False).reset_index(drop=True)
+
+
+def column_report(experiments):
+    """
+    Measures the memory used by every data column name, summed over all the experiments.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per column name with its dtypes, the number of experiments having it, its number of values, the
+        total bytes and the bytes per value, sorted by decreasing total.
+    """
+    columns = {}
+    for experiment in experiments:
+        data = getattr(experiment, 'data', None)
+        if not isinstance(data, pd.DataFrame):
+            continue
+        for column in data.columns:
+            series = data[column]
+            entry = columns.setdefault(str(column), {'dtypes': set(), 'experiments': 0, 'values': 0, 'total_bytes': 0})
+            entry['dtypes'].add(str(series.dtype))
+            entry['experiments'] += 1
+            entry['values'] += len(series)
+            entry['total_bytes'] += int(series.memory_usage(index=False, deep=is_object_column(series.dtype)))
+    report = pd.DataFrame([{'column': name, 'dtypes': ', '.join(sorted(entry['dtypes'])),
+                            'experiments': entry['experiments'], 'values': entry['values'],
+                            'total_bytes': entry['total_bytes']} for name, entry in columns.items()],
+                          columns=['column', 'dtypes', 'experiments', 'values', 'total_bytes'])
+    report['bytes_per_value'] = report['total_bytes'] / report['values'].clip(lower=1)
+    return report.sort_values('total_bytes', ascending=False).reset_index(drop=True)
+
+
+def aggregate_memory(report, by=('reaction', 'quantity', 'MT')):
+    """
+    Aggregates a per-experiment memory report by one or several attributes.
+
+    Parameters:
+    -----------
+    report : pd.DataFrame
+        The result of `memory_report`.
+    by : str | list, optional
+        The attribute(s) to group by. Default is ('reaction', 'quantity', 'MT').
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per group with the number of experiments and points, the bytes of every component, the total,
+        the bytes per point and the share of the total, sorted by decreasing total.
+
+    Example:
+    --------
+    aggregate_memory(report, by='quantity')
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    aggregated = (report.groupby(by, dropna=False)
+                  .agg(experiments=('exp_id', 'size'), n_points=('n_points', 'sum'),
+                       **{component: (component, 'sum') for component in MEMORY_COMPONENTS + ['total_bytes']})
+                  .reset_index())
+    aggregated['bytes_per_point'] = aggregated['total_bytes'] / aggregated['n_points'].clip(lower=1)
+    aggregated['share'] = aggregated['total_bytes'] / max(report['total_bytes'].sum(), 1)
+    return aggregated.sort_values('total_bytes', ascending=False).reset_index(drop=True)
+
+
+def _format_bytes(n_bytes):
+    """
+    Formats a number of bytes with a binary unit.
+    """
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n_bytes) < 1024 or unit == 'GB':
+            return '{:.1f} {}'.format(n_bytes, unit) if unit != 'B' else '{:d} B'.format(int(n_bytes))
+        n_bytes /= 1024
+
+
+def print_memory_summary(experiments, by=('reaction', 'quantity', 'MT'), top=10):
+    """
+    Prints the memory used by a list of experiments: the share of every component, the largest attributes and
+    data columns, and the groups that use the most memory.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+    by : str | list, optional
+        The attribute(s) used to group the experiments. Default is ('reaction', 'quantity', 'MT').
+    top : int, optional
+        Number of rows shown in every table. Default is 10.
+
+    Returns:
+    --------
+    report : pd.DataFrame
+        The per-experiment report (see `memory_report`).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    report = memory_report(experiments)
+    total = report['total_bytes'].sum()
+    labels = {'object_bytes': 'Experiment objects',
+              'attributes_bytes': 'Scalar attributes',
+              'reference_bytes': 'Reference strings',
+              'data_values_bytes': 'Numeric data values',
+              'data_object_bytes': 'Object/string data columns',
+              'data_overhead_bytes': 'DataFrame overhead'}
+
+    print('{} experiments, {} points, {} in total ({} per experiment, {:.1f} bytes per point)\n'.format(
+        len(report), int(report['n_points'].sum()), _format_bytes(total),
+        _format_bytes(total / max(len(report), 1)), total / max(report['n_points'].sum(), 1)))
+    for component in MEMORY_COMPONENTS:
+        value = report[component].sum()
+        print('{:<28}{:>12}{:>8.1f}%'.format(labels[component], _format_bytes(value), 100 * value / max(total, 1)))
+
+    with pd.option_context('display.max_columns', None, 'display.width', 140):
+        print('\nLargest attributes:')
+        print(attribute_report(experiments).head(top).to_string(index=False))
+        print('\nLargest data columns:')
+        print(column_report(experiments).head(top).to_string(index=False))
+        print('\nLargest groups by {}:'.format(', '.join(by)))
+        aggregated = aggregate_memory(report, by)
+        columns = by + ['experiments', 'n_points', 'total_bytes', 'bytes_per_point', 'share']
+        print(aggregated[columns].head(top).to_string(index=False))
+    return report
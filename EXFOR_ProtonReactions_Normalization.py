@@ -0,0 +1,341 @@
+"""
+================================================================================
+TITLE: Batched Normalization-Factor Fit Against the Channel Consensus
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    A common failure in EXFOR data is a whole experiment that is off by a
+    constant factor (wrong monitor, units or normalization). The per-point
+    detectors (IQR method, ML notebooks) do not see the common cause and flag
+    the points of such an experiment one by one, or not at all when the factor
+    is small. This script fits one scale factor per experiment against the
+    reference curve of its channel by weighted least squares in log space with
+    the dxs uncertainties. The reference of every point is the median of
+    log(y) of the other experiments of the channel, interpolated on the channel
+    grid of the Consensus module: unlike the 1/dxs^2 weighted mean, it is not
+    dominated by a low-valued peer with small absolute uncertainties or by the
+    chord of a sparse peer across a peak. The fit of all the experiments is
+    solved at once with segmented reductions (np.bincount) over the PointTable,
+    and the fit is repeated with the significant experiments removed from the
+    reference until the set of significant experiments does not change.
+
+MAIN FEATURES:
+    - Robust leave-one-out reference: median of the other experiments in log space.
+    - Closed-form weighted least squares of log(y / reference) per experiment.
+    - Uncertainties from dxs and the reference, inflated by the Birge ratio of the fit.
+    - Reduced chi-square of every experiment before and after applying its factor.
+    - Iterative exclusion of the significant experiments from the reference.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - PointTable and Consensus (custom modules)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Normalization as nf`
+    2. Fit the factors: `report = nf.fit_normalization_factors(experiments)`
+    3. Inspect the suspicious experiments: `report[report['significant']]`
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_PointTable import PointTable, build_point_table
+from EXFOR_ProtonReactions_Consensus import (build_channel_grid, sample_on_grid, segmented_bracket,
+                                             effective_uncertainty)
+
+
+def _median_without(sorted_values, start, count, removed):
+    """
+    Median of the `count` values of sorted segments (beginning at `start`) after removing the value at rank
+    `removed` of each segment (`removed` >= `count` removes nothing). NaN for empty segments.
+    """
+    remaining = count - (removed < count)
+    first = (remaining - 1) // 2
+    second = remaining // 2
+    first = first + (first >= removed)
+    second = second + (second >= removed)
+    valid = remaining > 0
+    if len(sorted_values) == 0:
+        return np.full(len(start), np.nan)
+    low = sorted_values[np.where(valid, start + first, 0)]
+    high = sorted_values[np.where(valid, start + second, 0)]
+    return np.where(valid, 0.5 * (low + high), np.nan)
+
+
+def sort_grid_samples(samples):
+    """
+    Prepares the grid samples of `sample_on_grid` for `robust_reference`: keeps the samples with positive
+    values and uncertainties, takes their logarithm and sorts them once by (grid point, log(y)).
+
+    Parameters:
+    -----------
+    samples : dict
+        Grid samples as returned by `sample_on_grid`.
+
+    Returns:
+    --------
+    dict
+        'exp', 'grid', 'log_y' and 'w' (relative weight (y/dy)^2) of the kept samples, sorted by (experiment,
+        grid point), plus 'keys' (experiment * n_grid + grid point, sorted), 'order' (permutation that sorts
+        them by (grid point, log(y))) and 'n_grid'.
+    """
+    y = samples['y']
+    dy = samples['dy']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keep = np.isfinite(y) & (y > 0) & np.isfinite(dy) & (dy > 0)
+    n_grid = int(samples['grid'].max()) + 1 if len(samples['grid']) else 0
+
+    # sample_on_grid returns the samples sorted by (experiment, grid point), the sort only checks it
+    keys = samples['exp'][keep].astype(np.int64) * n_grid + samples['grid'][keep]
+    key_order = np.argsort(keys, kind='stable')
+    exp = samples['exp'][keep][key_order]
+    grid = samples['grid'][keep][key_order]
+    log_y = np.log(y[keep][key_order])
+    w = (y[keep][key_order] / dy[keep][key_order])**2
+
+    return {'exp': exp, 'grid': grid, 'log_y': log_y, 'w': w, 'keys': keys[key_order],
+            'order': np.lexsort((log_y, grid)), 'n_grid': n_grid}
+
+
+def robust_reference(table, grid_x, grid_offsets, samples, excluded=None, min_experiments=2):
+    """
+    Computes the leave-one-out reference of every data point: the median of log(y) of the other experiments of
+    its channel at the grid points around it.
+
+    The samples are sorted by (grid point, log(y)) once (see `sort_grid_samples`); excluding experiments keeps
+    that order, so the median of every grid point without the sample of a given experiment is read directly
+    from the ranks. The uncertainty of the median is sqrt(pi/2) times the uncertainty of the mean weighted
+    with the relative uncertainties (y/dy)^2 of the other experiments.
+
+    Parameters:
+    -----------
+    table : PointTable
+        The point table.
+    grid_x : np.ndarray
+        Grid abscissas sorted by (channel, x), as returned by `build_channel_grid`.
+    grid_offsets : np.ndarray
+        Offsets of each channel in `grid_x`.
+    samples : dict
+        Sorted grid samples as returned by `sort_grid_samples`.
+    excluded : np.ndarray, optional
+        Boolean mask of the experiments that do not contribute to the reference. Default is None (all do).
+    min_experiments : int, optional
+        Minimum number of other experiments at both grid points around a point to give it a reference.
+        Default is 2.
+
+    Returns:
+    --------
+    dict
+        Arrays with one entry per point of the table: 'reference', 'reference_unc' and 'n_experiments'
+        (number of other experiments). The reference is NaN where there are not enough other experiments.
+    """
+    n_grid = len(grid_x)
+    grid = samples['grid']
+    order = samples['order']
+    active = np.ones(len(grid), dtype=bool) if excluded is None else ~excluded[samples['exp']]
+
+    # Sorted values of the active samples and rank of every active sample inside its grid point
+    active_sorted = active[order]
+    sorted_log_y = samples['log_y'][order][active_sorted]
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.cumsum(active_sorted) - 1
+    counts = np.bincount(grid[active], minlength=n_grid)
+    starts = np.cumsum(counts) - counts
+    rank = position - starts[grid]
+    w = np.where(active, samples['w'], 0.0)
+    sum_w = np.bincount(grid, weights=w, minlength=n_grid)
+
+    lo, hi, t, valid = segmented_bracket(grid_x, grid_offsets, table.point_channel(), table.x)
+    keys = samples['keys']
+    log_reference = []
+    variance = []
+    n_experiments = []
+    for g in (lo, hi):
+        # Sample of the experiment of every point at the grid point, removed from its own reference
+        query = table.exp_index * n_grid + g
+        if len(keys):
+            own_sample = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+            own = (keys[own_sample] == query) & active[own_sample]
+        else:
+            own_sample = np.zeros(len(query), dtype=np.int64)
+            own = np.zeros(len(query), dtype=bool)
+        removed = np.where(own, rank[own_sample] if len(rank) else 0, counts[g])
+        log_reference.append(_median_without(sorted_log_y, starts[g], counts[g], removed))
+        other_w = sum_w[g] - np.where(own, w[own_sample] if len(w) else 0.0, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance.append(np.where(other_w > 0, 0.5 * np.pi / other_w, np.nan))
+        n_experiments.append(counts[g] - own)
+
+    # A point on a grid point (always the case with a 'union' grid) only uses that grid point: the next one may
+    # be outside the range of its own experiment or of its peers
+    on_grid = t == 0
+    n_experiments = np.where(valid, np.where(on_grid, n_experiments[0], np.minimum(*n_experiments)), 0)
+    usable = valid & (n_experiments >= min_experiments)
+    with np.errstate(invalid='ignore'):
+        log_reference = np.where(on_grid, log_reference[0], (1.0 - t) * log_reference[0] + t * log_reference[1])
+        variance = np.where(on_grid, variance[0], (1.0 - t) * variance[0] + t * variance[1])
+    log_reference = np.where(usable, log_reference, np.nan)
+    log_reference_unc = np.sqrt(np.where(usable, variance, np.nan))
+    reference = np.exp(log_reference)
+
+    return {'reference': reference, 'reference_unc': reference * log_reference_unc,
+            'n_experiments': n_experiments}
+
+
+def fit_scale_factors(table, reference, reference_unc, default_relative_uncertainty=0.1, min_points=3):
+    """
+    Fits y = factor * reference for every experiment of a point table at once.
+
+    The fit is a weighted least squares of r = log(y / reference) with a single parameter, log(factor), per
+    experiment: log(factor) = sum(w r) / sum(w) with w = 1 / ((dy/y)^2 + (reference_unc/reference)^2). The sums
+    over the points of every experiment are segmented reductions with np.bincount. Points with a non-positive
+    value or reference (the logarithm is undefined) are not used.
+
+    Parameters:
+    -----------
+    table : PointTable
+        The point table.
+    reference : np.ndarray
+        Reference value at every point of the table (NaN where there is none).
+    reference_unc : np.ndarray
+        Uncertainty of the reference at every point (NaN is taken as 0).
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dxs is missing or zero. Default is 0.1.
+    min_points : int, optional
+        Minimum number of usable points to fit an experiment. Default is 3.
+
+    Returns:
+    --------
+    dict
+        Arrays with one entry per experiment of the table: 'n_points' (usable points), 'log_factor',
+        'log_factor_unc' (statistical), 'birge_ratio' (of the fit), 'chi2_before' (reduced chi-square of the
+        data against the reference) and 'chi2_after' (after applying the factor). NaN when the experiment has
+        fewer than `min_points` usable points.
+    """
+    n_experiments = table.n_experiments
+    exp_index = table.exp_index
+    y = table.y
+    dy = effective_uncertainty(y, table.dy, default_relative_uncertainty)
+    reference_unc = np.where(np.isfinite(reference_unc), reference_unc, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        usable = np.isfinite(reference) & (reference > 0) & (y > 0) & np.isfinite(dy) & (dy > 0)
+        r = np.where(usable, np.log(y / reference), 0.0)
+        variance = (dy / y)**2 + (reference_unc / reference)**2
+        w = np.where(usable, 1.0 / variance, 0.0)
+
+    # Segmented sums over the points of every experiment
+    n_points = np.bincount(exp_index, weights=usable, minlength=n_experiments).astype(np.int64)
+    sum_w = np.bincount(exp_index, weights=w, minlength=n_experiments)
+    sum_wr = np.bincount(exp_index, weights=w * r, minlength=n_experiments)
+    fitted = (n_points >= min_points) & (sum_w > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_factor = np.where(fitted, sum_wr / sum_w, np.nan)
+        log_factor_unc = np.where(fitted, 1.0 / np.sqrt(sum_w), np.nan)
+        chi2_before = np.bincount(exp_index, weights=w * r**2, minlength=n_experiments)
+        chi2_after = np.bincount(exp_index, weights=w * (r - np.nan_to_num(log_factor)[exp_index])**2,
+                                 minlength=n_experiments)
+        chi2_before = np.where(fitted, chi2_before / n_points, np.nan)
+        chi2_after = np.where(fitted & (n_points > 1), chi2_after / (n_points - 1), np.nan)
+
+    return {'n_points': n_points, 'log_factor': log_factor, 'log_factor_unc': log_factor_unc,
+            'birge_ratio': np.sqrt(chi2_after), 'chi2_before': chi2_before, 'chi2_after': chi2_after}
+
+
+def fit_normalization_factors(experiments, grid='union', spacing='linear', default_relative_uncertainty=0.1,
+                              min_points=3, min_experiments=2, threshold=3.0, min_deviation=0.05, max_iterations=5):
+    """
+    Fits one normalization factor per experiment against the robust reference of the other experiments of its
+    channel and reports the experiments whose factor is significant.
+
+    The reference of every point is the median of the other experiments (see `robust_reference`), so an
+    experiment is not compared with itself. The uncertainty of log(factor) is inflated by the Birge ratio of
+    the fit when it is larger than one, so experiments whose shape disagrees with the reference (and not only
+    their scale) are not reported as significant just because they have many points. The significant
+    experiments are then removed from the reference of the others and the fit is repeated, until the set of
+    significant experiments does not change or `max_iterations` fits are done.
+
+    Parameters:
+    -----------
+    experiments : list | PointTable
+        A list of Experiment objects or an already built PointTable.
+    grid : str | int, optional
+        'union' or a number of grid points per channel (see `build_channel_grid`). Default is 'union'.
+    spacing : str, optional
+        'linear' or 'log' spacing for integer grids. Default is 'linear'.
+    default_relative_uncertainty : float, optional
+        Relative uncertainty used when dxs is missing or zero. Default is 0.1.
+    min_points : int, optional
+        Minimum number of points with a reference to fit an experiment. Default is 3.
+    min_experiments : int, optional
+        Minimum number of other experiments covering a point to give it a reference. Default is 2.
+    threshold : float, optional
+        Significance threshold: |log(factor)| / uncertainty. Default is 3.0.
+    min_deviation : float, optional
+        Minimum relative deviation |factor - 1| to report a factor, so that tiny but precise differences are
+        not reported. Default is 0.05.
+    max_iterations : int, optional
+        Maximum number of fits. Default is 5 (1 fits once, without excluding any experiment).
+
+    Returns:
+    --------
+    report : pd.DataFrame
+        One row per experiment with 'exp_id', 'X4_ID', 'title', 'channel', 'n_points', 'factor', 'factor_unc',
+        'log_factor', 'log_factor_unc' (inflated), 'birge_ratio', 'chi2_before', 'chi2_after', 'z'
+        (|log_factor| / log_factor_unc) and 'significant'. Experiments that could not be fitted have NaN
+        factors and are not significant.
+
+    Example:
+    --------
+    report = fit_normalization_factors(experiments)
+    suspicious = report[report['significant']].sort_values('z', ascending=False)
+
+    Notes:
+    ------
+    - A factor is relative to the reference of the channel: if most experiments of a channel share the same
+      normalization problem, the correct experiments are the ones reported.
+    - A large 'chi2_after' means that a constant factor does not explain the disagreement of the experiment
+      (shape differences or single outliers, better found with the per-point detectors).
+    """
+    table = experiments if isinstance(experiments, PointTable) else build_point_table(experiments)
+
+    grid_x, grid_offsets = build_channel_grid(table, grid=grid, spacing=spacing)
+    samples = sort_grid_samples(sample_on_grid(table, grid_x, grid_offsets, default_relative_uncertainty))
+
+    # Fit, then remove the significant experiments from the reference of the others and fit again
+    excluded = np.zeros(table.n_experiments, dtype=bool)
+    for iteration in range(1, max(max_iterations, 1) + 1):
+        reference = robust_reference(table, grid_x, grid_offsets, samples, excluded, min_experiments)
+        fit = fit_scale_factors(table, reference['reference'], reference['reference_unc'],
+                                default_relative_uncertainty, min_points)
+        log_factor_unc = fit['log_factor_unc'] * np.fmax(fit['birge_ratio'], 1.0)
+        factor = np.exp(fit['log_factor'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.abs(fit['log_factor']) / log_factor_unc
+        significant = (z > threshold) & (np.abs(factor - 1.0) > min_deviation)
+        if np.array_equal(significant, excluded):
+            break
+        excluded = significant
+
+    report = pd.DataFrame({'exp_id': table.exp_id,
+                           'X4_ID': table.X4_ID,
+                           'title': table.title,
+                           'channel': table.channel,
+                           'n_points': fit['n_points'],
+                           'factor': factor,
+                           'factor_unc': factor * log_factor_unc,
+                           'log_factor': fit['log_factor'],
+                           'log_factor_unc': log_factor_unc,
+                           'birge_ratio': fit['birge_ratio'],
+                           'chi2_before': fit['chi2_before'],
+                           'chi2_after': fit['chi2_after'],
+                           'z': z,
+                           'significant': significant})
+
+    n_fitted = int(np.isfinite(fit['log_factor']).sum())
+    print('{} experiments fitted in {} iteration(s), {} with a significant normalization factor'.format(
+        n_fitted, iteration, int(significant.sum())))
+    return report
@@ -0,0 +1,618 @@
+"""
+================================================================================
+TITLE: Outlier Detection Pipeline for Classified Proton Experiment Groups
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors (IQR method by Juan A. Monleón de la Lluvia, moved from its notebook)
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script gathers the steps shared by the scikit-learn outlier detection
+    notebooks (ID handling, scaling, fitting, prediction and extraction of the
+    outliers) into reusable functions. Besides the usual full fit, detectors
+    whose cost grows super-linearly with the group size (OneClassSVM, LOF) can
+    be fitted on a stratified subsample drawn per reaction channel and energy
+    decade and then used to score every point in chunks. A report compares the
+    outliers found with several subsample budgets against a full fit.
+
+MAIN FEATURES:
+    - Detection of the reaction channel and energy columns of a classified group.
+    - Stratified subsampling per reaction channel and energy decade with a budget.
+    - Chunked scaling and scoring of all the points of a group.
+    - Full-fit or subsample-fit outlier detection returning an `outliers_df`.
+    - Agreement report between subsample fits and a full fit.
+    - Interquartile Range (IQR) method per group of reaction attributes.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - scikit-learn (imported when a scaler or detector is needed)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_OutlierDetection as od`
+    2. Detect outliers: `outliers_df, scores = od.detect_outliers(df, OneClassSVM(nu=0.001), fit_budget=20000)`
+    3. Choose the budget: `od.subsample_agreement_report(df, lambda: OneClassSVM(nu=0.001), [5000, 20000])`
+================================================================================
+"""
+
+import time
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import ID_COLUMNS
+from EXFOR_ProtonReactions_Instrumentation import optional_stage
+from EXFOR_ProtonReactions_UtilityFunctions import build_experiment_index
+
+
+# Columns added by Experiment.prepare_data that describe the reaction channel
+NUMERIC_ATTRIBUTES = ['E_inc', 'MF', 'MT', 'MTrat', 'Ratio_isomer', 'final_A', 'final_Z', 'target_A', 'target_Z']
+CATEGORICAL_PREFIXES = ('projectile_', 'final_state_', 'frame_', 'qty_', 'reaction_', 'target_state_')
+
+
+def feature_columns(df):
+    """
+    Returns the columns of a classified group used as detector features (all but the identification columns).
+    """
+    return [col for col in df.columns if col not in ID_COLUMNS]
+
+
+def channel_columns(df):
+    """
+    Returns the columns of a classified group that describe the reaction channel.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group (optionally cleaned with `clean_dataframe`).
+
+    Returns:
+    --------
+    list
+        The numeric attribute and one-hot encoded columns present in the DataFrame.
+    """
+    return [col for col in df.columns if col in NUMERIC_ATTRIBUTES or col.startswith(CATEGORICAL_PREFIXES)]
+
+
+def energy_strata(df, energy_column=None):
+    """
+    Returns the energy decade of every row of a classified group.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group.
+    energy_column : str, optional
+        The column holding the energy. By default 'E' is used if present, otherwise 'E_inc'.
+
+    Returns:
+    --------
+    np.ndarray
+        floor(log10(E)) for every row. Rows with a missing or non-positive energy share a separate stratum.
+        If no energy column is available all rows share the same stratum.
+    """
+    if energy_column is None:
+        energy_column = next((col for col in ('E', 'E_inc') if col in df.columns), None)
+    if energy_column is None or energy_column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+
+    energy = pd.to_numeric(df[energy_column], errors='coerce').to_numpy(dtype=np.float64)
+    decades = np.full(len(df), np.iinfo(np.int64).min, dtype=np.int64)
+    positive = np.isfinite(energy) & (energy > 0)
+    decades[positive] = np.floor(np.log10(energy[positive])).astype(np.int64)
+    return decades
+
+
+def stratum_codes(df, energy_column=None):
+    """
+    Assigns an integer stratum (reaction channel x energy decade) to every row of a classified group.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group.
+    energy_column : str, optional
+        The column holding the energy (see `energy_strata`).
+
+    Returns:
+    --------
+    np.ndarray
+        The stratum code of every row (0 .. n_strata-1).
+    """
+    keys = df[channel_columns(df)].copy()
+    keys['__energy_decade'] = energy_strata(df, energy_column)
+    # groupby().ngroup() treats NaN as a regular key with dropna=False
+    return keys.groupby(list(keys.columns), dropna=False, sort=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def stratified_subsample(df, budget, energy_column=None, min_per_stratum=1, random_state=0):
+    """
+    Draws a stratified random subsample of a classified group.
+
+    The budget is shared among the strata (reaction channel x energy decade) proportionally to their size,
+    guaranteeing at least `min_per_stratum` rows per stratum (or the whole stratum if it is smaller).
+    Because of this minimum the subsample can slightly exceed the budget when there are many small strata.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group.
+    budget : int
+        Target number of rows of the subsample.
+    energy_column : str, optional
+        The column holding the energy (see `energy_strata`).
+    min_per_stratum : int, optional
+        Minimum number of rows drawn from every stratum. Default is 1.
+    random_state : int, optional
+        Seed of the random generator. Default is 0.
+
+    Returns:
+    --------
+    np.ndarray
+        Sorted positional indices of the selected rows.
+
+    Example:
+    --------
+    idx = stratified_subsample(df, 20000)
+    df_fit = df.iloc[idx]
+    """
+    n = len(df)
+    if budget >= n:
+        return np.arange(n, dtype=np.int64)
+
+    strata = stratum_codes(df, energy_column)
+    sizes = np.bincount(strata)
+    # Proportional allocation with a minimum per stratum
+    allocation = np.round(budget * sizes / n).astype(np.int64)
+    allocation = np.minimum(np.maximum(allocation, min_per_stratum), sizes)
+
+    # Rank the rows of each stratum in random order and keep the first 'allocation' rows
+    rng = np.random.default_rng(random_state)
+    order = np.lexsort((rng.random(n), strata))
+    sorted_strata = strata[order]
+    stratum_start = np.cumsum(sizes) - sizes
+    rank = np.arange(n) - stratum_start[sorted_strata]
+    selected = order[rank < allocation[sorted_strata]]
+    return np.sort(selected)
+
+
+def _chunks(n, chunk_size):
+    """
+    Yields (start, stop) bounds of consecutive chunks.
+    """
+    for start in range(0, n, chunk_size):
+        yield start, min(start + chunk_size, n)
+
+
+def fit_scaler(X, scaler=None, chunk_size=100000):
+    """
+    Fits a scaler on a feature matrix, in chunks when the scaler supports `partial_fit`.
+
+    Parameters:
+    -----------
+    X : np.ndarray
+        The feature matrix.
+    scaler : object, optional
+        An unfitted scikit-learn scaler. Default is StandardScaler().
+    chunk_size : int, optional
+        Number of rows per chunk. Default is 100000.
+
+    Returns:
+    --------
+    object
+        The fitted scaler.
+    """
+    if scaler is None:
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler()
+    if hasattr(scaler, 'partial_fit'):
+        for start, stop in _chunks(len(X), chunk_size):
+            scaler.partial_fit(X[start:stop])
+    else:
+        scaler.fit(X)
+    return scaler
+
+
+def score_in_chunks(detector, X, scaler=None, chunk_size=50000):
+    """
+    Scales and scores a feature matrix chunk by chunk with a fitted detector.
+
+    Only one scaled chunk exists at any time, so the full matrix is never copied.
+
+    Parameters:
+    -----------
+    detector : object
+        A fitted scikit-learn outlier detector with `predict` and `decision_function` (for
+        LocalOutlierFactor use `novelty=True`).
+    X : np.ndarray
+        The unscaled feature matrix.
+    scaler : object, optional
+        A fitted scaler applied to every chunk before scoring.
+    chunk_size : int, optional
+        Number of rows per chunk. Default is 50000.
+
+    Returns:
+    --------
+    tuple
+        (scores, is_outlier): the decision function (lower is more anomalous) and a boolean outlier mask.
+    """
+    scores = np.empty(len(X), dtype=np.float64)
+    is_outlier = np.empty(len(X), dtype=bool)
+    for start, stop in _chunks(len(X), chunk_size):
+        chunk = X[start:stop]
+        if scaler is not None:
+            chunk = scaler.transform(chunk)
+        scores[start:stop] = detector.decision_function(chunk)
+        is_outlier[start:stop] = detector.predict(chunk) == -1
+    return scores, is_outlier
+
+
+def fit_and_score(df, detector, scaler=None, fit_budget=None, energy_column=None, min_per_stratum=1,
+                  chunk_size=50000, random_state=0):
+    """
+    Fits a detector on a classified group (or on a stratified subsample of it) and scores every point.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group, usually cleaned with `clean_dataframe`.
+    detector : object
+        An unfitted scikit-learn outlier detector. Detectors that cannot score new points (LocalOutlierFactor
+        with `novelty=False`) are fitted and labelled with `fit_predict` on all the rows, so they need
+        `fit_budget=None`.
+    scaler : object, optional
+        An unfitted scaler. Default is StandardScaler().
+    fit_budget : int, optional
+        Number of rows of the stratified fitting subsample. If None the detector is fitted on all the rows.
+    energy_column : str, optional
+        The column holding the energy used for stratification (see `energy_strata`).
+    min_per_stratum : int, optional
+        Minimum number of rows per stratum in the subsample. Default is 1.
+    chunk_size : int, optional
+        Number of rows scored at a time. Default is 50000.
+    random_state : int, optional
+        Seed of the subsampling. Default is 0.
+
+    Returns:
+    --------
+    tuple
+        (scores, is_outlier, fit_index): decision function and outlier mask of every row and the positional
+        indices of the rows used for fitting.
+    """
+    X = df[feature_columns(df)].to_numpy(dtype=np.float64)
+
+    # Transductive detectors only label the points they are fitted on
+    transductive = not hasattr(detector, 'predict')
+    if transductive and fit_budget is not None:
+        raise ValueError('{} cannot score points outside its fitting subsample. Use fit_budget=None or a detector '
+                         'that supports new points (e.g. LocalOutlierFactor(novelty=True)).'.format(
+                             type(detector).__name__))
+
+    if fit_budget is None:
+        fit_index = np.arange(len(df), dtype=np.int64)
+    else:
+        fit_index = stratified_subsample(df, fit_budget, energy_column, min_per_stratum, random_state)
+
+    scaler = fit_scaler(X, scaler, chunk_size)
+    if transductive:
+        is_outlier = detector.fit_predict(scaler.transform(X)) == -1
+        # Same scale as decision_function: lower is more anomalous, negative for outliers
+        scores = detector.negative_outlier_factor_ - detector.offset_
+        return scores, is_outlier, fit_index
+
+    detector.fit(scaler.transform(X[fit_index]))
+    scores, is_outlier = score_in_chunks(detector, X, scaler, chunk_size)
+    return scores, is_outlier, fit_index
+
+
+def detect_outliers(df, detector, scaler=None, fit_budget=None, instrumentation=None, store=None, method=None,
+                    **kwargs):
+    """
+    Detects the outliers of a classified group, optionally fitting the detector on a stratified subsample.
+
+    This is the pipeline of the scikit-learn notebooks (drop the IDs, scale, fit, predict and put the IDs back)
+    with chunked scoring. The original values are taken from `df` directly, so no `inverse_transform` is needed.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group, usually cleaned with `clean_dataframe`.
+    detector : object
+        An unfitted scikit-learn outlier detector, e.g. OneClassSVM(kernel='rbf', nu=0.001) or
+        LocalOutlierFactor(n_neighbors=20, contamination=0.01) (with `novelty=True` for subsample fits).
+    scaler : object, optional
+        An unfitted scaler. Default is StandardScaler().
+    fit_budget : int, optional
+        Number of rows of the stratified fitting subsample. If None the detector is fitted on all the rows.
+    instrumentation : Instrumentation, optional
+        If given, the detection is timed as the 'detect' stage.
+    store : ScoreStore, optional
+        If given, the scores and verdicts of every point are written to it (see `ScoreStore.write_dataframe`).
+    method : str, optional
+        Name of the method in the store. Default is None (the class name of the detector in lower case).
+    **kwargs :
+        Extra arguments passed to `fit_and_score`.
+
+    Returns:
+    --------
+    outliers_df : pd.DataFrame
+        The rows of `df` flagged as outliers (same columns as `df`), ready for `plot_outliers`.
+    scores : np.ndarray
+        The decision function of every row of `df` (lower is more anomalous, negative for outliers).
+
+    Example:
+    --------
+    outliers_df, scores = detect_outliers(df, OneClassSVM(kernel='rbf', nu=0.001), fit_budget=20000, store=store)
+    """
+    if len(df) == 0:
+        print('No points to check for outliers')
+        return df, np.empty(0)
+    with optional_stage(instrumentation, 'detect') as record:
+        scores, is_outlier, _ = fit_and_score(df, detector, scaler, fit_budget, **kwargs)
+        record['items'] = len(df)
+    if store is not None:
+        method = type(detector).__name__.lower() if method is None else method
+        store.write_dataframe(method, df, scores, is_outlier, higher_is_outlier=False,
+                              params={'detector': repr(detector), 'fit_budget': fit_budget})
+    outliers_df = df[is_outlier]
+    print('Percentage of outliers: {:.2f}%'.format(len(outliers_df) / len(df) * 100))
+    return outliers_df, scores
+
+
+def subsample_agreement_report(df, make_detector, budgets, make_scaler=None, energy_column=None,
+                               min_per_stratum=1, chunk_size=50000, random_state=0):
+    """
+    Compares the outliers found with subsample fits of several budgets against a full fit.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified test group.
+    make_detector : callable | object
+        Function returning a new unfitted detector, or an unfitted detector that will be cloned.
+    budgets : list
+        Subsample budgets to evaluate.
+    make_scaler : callable, optional
+        Function returning a new unfitted scaler. Default is None (StandardScaler).
+    energy_column : str, optional
+        The column holding the energy used for stratification (see `energy_strata`).
+    min_per_stratum : int, optional
+        Minimum number of rows per stratum in the subsamples. Default is 1.
+    chunk_size : int, optional
+        Number of rows scored at a time. Default is 50000.
+    random_state : int, optional
+        Seed of the subsampling. Default is 0.
+
+    Returns:
+    --------
+    report : pd.DataFrame
+        One row per budget (plus the full fit) with the fit size, fit and score times, number of outliers,
+        precision and recall of the outliers with respect to the full fit, Jaccard index of both outlier sets,
+        fraction of points with the same verdict and Spearman correlation of the scores.
+
+    Example:
+    --------
+    report = subsample_agreement_report(df, lambda: OneClassSVM(kernel='rbf', nu=0.001), [2000, 10000, 50000])
+
+    Notes:
+    ------
+    - The full fit of a detector with `novelty=True` (LocalOutlierFactor) is done with `novelty=False`, so that
+      the rows are labelled with `fit_predict` like in the notebooks and not as new points.
+    """
+    # scikit-learn is only imported here, so that the IQR method can be used without loading it
+    from sklearn.base import clone
+    from sklearn.preprocessing import StandardScaler
+    make_scaler = StandardScaler if make_scaler is None else make_scaler
+    new_detector = make_detector if callable(make_detector) and not hasattr(make_detector, 'fit') \
+        else (lambda: clone(make_detector))
+
+    def run(budget):
+        detector = new_detector()
+        if budget is None and detector.get_params().get('novelty', False):
+            detector.set_params(novelty=False)
+        start = time.perf_counter()
+        scores, is_outlier, fit_index = fit_and_score(df, detector, make_scaler(), budget, energy_column,
+                                                      min_per_stratum, chunk_size, random_state)
+        return scores, is_outlier, len(fit_index), time.perf_counter() - start
+
+    print('Fitting the detector on the full group ({} points)...'.format(len(df)))
+    full_scores, full_outliers, full_size, full_time = run(None)
+    full_ranks = pd.Series(full_scores).rank()
+
+    rows = []
+    for budget in [None] + list(budgets):
+        if budget is None:
+            scores, outliers, fit_size, elapsed = full_scores, full_outliers, full_size, full_time
+        else:
+            print('Fitting the detector on a subsample with budget {}...'.format(budget))
+            scores, outliers, fit_size, elapsed = run(budget)
+
+        both = np.count_nonzero(outliers & full_outliers)
+        either = np.count_nonzero(outliers | full_outliers)
+        rows.append({'budget': 'full' if budget is None else budget,
+                     'fit_size': fit_size,
+                     'time_s': elapsed,
+                     'speedup': full_time / elapsed if elapsed > 0 else np.nan,
+                     'n_outliers': int(np.count_nonzero(outliers)),
+                     'precision': both / np.count_nonzero(outliers) if np.any(outliers) else np.nan,
+                     'recall': both / np.count_nonzero(full_outliers) if np.any(full_outliers) else np.nan,
+                     'jaccard': both / either if either else 1.0,
+                     'verdict_agreement': float(np.mean(outliers == full_outliers)),
+                     'score_spearman': full_ranks.corr(pd.Series(scores).rank())})
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+    return report
+
+
+def IQR_scores(grouped_df, experiment, limit=1.5, uncertainties=False):
+    """
+    Computes the IQR outlier score of every point of a group: how far the point is beyond the IQR fences.
+
+    The columns and fences are those of `detect_outliers_IQR`. The score is the distance between the point (or,
+    with uncertainties, the nearest end of its uncertainty range) and the nearest fence, divided by the IQR of
+    the column when it is not zero, and the largest over the checked columns. It is positive exactly for the
+    points flagged by `detect_outliers_IQR`.
+
+    Parameters:
+    -----------
+    grouped_df : DataFrame
+        The grouped dataframe containing the data.
+    experiment : object
+        An Experiment object containing the data and metadata.
+    limit : float, optional
+        The limit factor to multiply with the IQR to determine the range for outliers (default is 1.5).
+    uncertainties : bool, optional
+        Whether to consider uncertainties in the data (default is False).
+
+    Returns:
+    --------
+    Series
+        The score of every row of `grouped_df` (NaN where the values needed are missing).
+    """
+
+    def excess(low, high, column):
+        # Distance beyond the fences of a column, for the lower and upper ends of every point
+        Q1 = grouped_df[column].quantile(0.25)
+        Q3 = grouped_df[column].quantile(0.75)
+        IQR = Q3 - Q1
+        distance = np.maximum((Q1 - limit * IQR) - high, low - (Q3 + limit * IQR))
+        return distance / IQR if IQR > 0 else distance
+
+    if experiment.data.columns[0] != 'Z':
+        first_column = experiment.data.columns[0]
+        second_column = experiment.data.columns[1]
+    else:
+        first_column = experiment.data.columns[2]
+        second_column = experiment.data.columns[3]
+
+    if not uncertainties:
+        columns = [grouped_df[col].astype(float) for col in (first_column, second_column)]
+        return np.fmax(*[excess(values, values, col) for values, col in zip(columns, (first_column, second_column))])
+
+    values = grouped_df[second_column].astype(float)
+    if experiment.data.columns[0] != 'Z' and experiment.data[experiment.data.columns[2]].isnull().values.any():
+        return excess(values, values, second_column)
+    third_column = experiment.data.columns[2] if experiment.data.columns[0] != 'Z' else experiment.data.columns[4]
+    # Both ends of the uncertainty range must be outside the same fence
+    lower_values = values - grouped_df[third_column]
+    upper_values = values + grouped_df[third_column]
+    return excess(np.fmin(lower_values, upper_values), np.fmax(lower_values, upper_values), second_column)
+
+
+def detect_outliers_IQR(grouped_df, experiment, limit=1.5, uncertainties=False):
+    """
+    Identifies outliers in the data of an Experiment object using the Interquartile Range (IQR) method.
+    
+    The function takes a grouped dataframe and an Experiment object, then calculates the first (Q1) and third (Q3) quartiles
+    along with the interquartile range (IQR) for specified columns. Outliers are determined based on these statistics.
+    
+    Parameters:
+    -----------
+    grouped_df : DataFrame
+        The grouped dataframe containing the data.
+    experiment : object
+        An Experiment object containing the data and metadata.
+    limit : float, optional
+        The limit factor to multiply with the IQR to determine the range for outliers (default is 1.5).
+    uncertainties : bool, optional
+        Whether to consider uncertainties in the data (default is False).
+        
+    Returns:
+    --------
+    DataFrame
+        A dataframe containing only the outliers.
+    
+    Example:
+    --------
+    detect_outliers_IQR(grouped_df, experiment_object)
+
+    Notes:
+    ------
+    - Assumes the Experiment object contains a dataframe representation in its `data` attribute.
+    - If uncertainties are considered, it assumes the Experiment object's dataframe includes columns for uncertainties.
+    - Without uncertainties a point is an outlier if its value in one of the first two data columns is outside
+      the fences [Q1 - limit*IQR, Q3 + limit*IQR]. With uncertainties only the cross section column is checked,
+      and its whole uncertainty range must be outside a fence (see `IQR_scores`).
+    """
+    return grouped_df[IQR_scores(grouped_df, experiment, limit, uncertainties) > 0]
+
+
+def IQR_method(df, experiments, min_observations=20, uncertainties=False, instrumentation=None, store=None,
+               method='iqr'):
+    """
+    Applies the IQR method to identify outliers from a DataFrame using data from a list of Experiment objects.
+    
+    The function first identifies columns by which to group the data. It then filters the groups based on the 
+    minimum number of observations specified. For each valid group, it applies the `detect_outliers_IQR` function 
+    to identify outliers.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        The input DataFrame containing the data to be checked for outliers.
+    experiments : list
+        A list of Experiment objects containing relevant data and metadata.
+    min_observations : int, optional
+        The minimum number of observations required to consider a group for outlier detection (default is 20).
+    uncertainties : bool, optional
+        Whether to consider uncertainties in the data (default is False).
+    instrumentation : Instrumentation, optional
+        If given, the detection is timed as the 'detect' stage (default is None).
+    store : ScoreStore, optional
+        If given, the scores (see `IQR_scores`) and verdicts of the points of the checked groups are written to
+        it (default is None).
+    method : str, optional
+        Name of the method in the store (default is 'iqr').
+        
+    Returns:
+    --------
+    DataFrame
+        A DataFrame containing only the outliers.
+    
+    Example:
+    --------
+    IQR_method(df, experiment_list, store=ScoreStore('EXFOR_ProtonReactions_Scores'))
+
+    Notes:
+    ------
+    - Assumes the Experiment object contains a dataframe representation in its `data` attribute.
+    - If uncertainties are considered, it assumes the Experiment object's dataframe includes columns for uncertainties.
+    """
+    
+    # Get the name of the 'data' columns from a corresponding experiment (found by id when available)
+    if 'exp_id' in df.columns:
+        example_exp = build_experiment_index(experiments)[int(df['exp_id'].iloc[0])]
+    else:
+        example_exp = next(experiment for experiment in experiments if experiment.X4_ID in df['X4_ID'].tolist())
+    data_columns = example_exp.data.columns.values.tolist()
+
+    # Get columns from outliers_df that are not in data and also not identification columns
+    groupby_columns = [col for col in df.columns if col not in data_columns and col not in ID_COLUMNS]
+    
+    # Group by columns and perform initial size count
+    grouped = df.groupby(groupby_columns).size().reset_index(name='count')
+    
+    # Filter groups by minimum number of observations
+    valid_groups = grouped[grouped['count'] >= min_observations][groupby_columns].to_dict('records')
+    # MultiIndex even for a single column, so the rows match the group tuples
+    filtered_df = df[pd.MultiIndex.from_frame(df[groupby_columns]).isin([tuple(d.values()) for d in valid_groups])]
+
+    print('Number of groups with at least {} observations: {}\n'.format(min_observations, len(valid_groups)))
+
+    print('Calculating outliers {} uncertainties...\n'.format('with' if uncertainties else 'without'))
+    
+    # Detect outliers
+    with optional_stage(instrumentation, 'detect') as record:
+        # Concatenated by hand: apply would widen the scores into a DataFrame when there is a single group
+        groups = filtered_df.groupby(groupby_columns)
+        scores = (pd.concat([IQR_scores(group, example_exp, uncertainties=uncertainties) for _, group in groups])
+                  if len(filtered_df) else pd.Series(dtype=np.float64))
+        outliers_df = filtered_df.loc[scores.index[scores > 0]].reset_index(drop=True)
+        record['items'] = len(filtered_df)
+
+    if store is not None:
+        scored_df = filtered_df.loc[scores.index]
+        store.write_dataframe(method, scored_df, scores.to_numpy(), (scores > 0).to_numpy(), higher_is_outlier=True,
+                              params={'min_observations': min_observations, 'uncertainties': uncertainties})
+
+    if len(filtered_df):
+        print('Percentage of outliers: {:.2f}%'.format(len(outliers_df) / len(filtered_df) * 100))
+
+    return outliers_df
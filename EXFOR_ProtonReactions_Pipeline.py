@@ -0,0 +1,699 @@
+"""
+================================================================================
+TITLE: Content-Addressed Runner for the Preprocessing Pipeline
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script runs the preprocessing pipeline of the Data Preprocessing
+    notebook (ingest the EXFORTABLES files into the binary database, write the
+    text database, classify the experiments by data, split groups with missing
+    values and clean the groups) as a set of declared stages, like a small
+    build tool. Every stage reads and writes files, and its key is a hash of
+    the contents of its input files, its parameters and its code (the stage
+    function and the modules of the project it calls). A stage is
+    only run when no build with the same key exists: its outputs are reused
+    when they are up to date, restored from the cache when a previous build
+    with the same key was kept, and rebuilt otherwise. Since the key of a stage
+    includes the contents of the outputs of the stages it depends on, a change
+    only rebuilds the stages downstream of it. Stages that do not depend on
+    each other can run concurrently in separate processes.
+
+MAIN FEATURES:
+    - Declaration of stages with their input files, output files and parameters.
+    - Dependencies found automatically from the files (outputs of other stages).
+    - Content hashes of files and directories, memoized by size and modification time.
+    - Cache of the outputs of every build, restored when the same key comes back.
+    - Concurrent execution of independent stages in a process pool.
+    - Ready-made pipeline of the Data Preprocessing notebook.
+
+DEPENDENCIES:
+    - pandas
+    - UtilityFunctions (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Pipeline as pl`
+    2. Declare the pipeline: `pipeline = pl.preprocessing_pipeline('exfortables/p', workdir='preprocessing')`
+    3. Run it (only what changed is rebuilt): `report = pipeline.run(processes=2)`
+    4. From the command line: `python EXFOR_ProtonReactions_Pipeline.py exfortables/p --workdir preprocessing`
+================================================================================
+"""
+
+import os
+import ast
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from EXFOR_ProtonReactions_UtilityFunctions import (read_proton_experiments_from_exfortables,
+                                                    write_experiments_to_binary, read_experiments_from_binary,
+                                                    write_experiments_to_txt, classify_experiments_by_data,
+                                                    clean_dataframe)
+
+
+# Cache directory of a pipeline, inside its working directory
+DEFAULT_CACHE_DIR = '.pipeline_cache'
+
+# Groups split by the Data Preprocessing notebook: group number -> column whose missing values define the split
+DEFAULT_SPLITS = {4: 'final_A'}
+
+# Size of the blocks read to hash a file (bytes)
+_CHUNK_SIZE = 1 << 20
+
+# Modules of the project: the ones imported by the module of a stage are hashed into its code, since the stages call
+# their functions (parse_experiment, Experiment.prepare_data, clean_dataframe, ...)
+PROJECT_MODULES = 'EXFOR_ProtonReactions_*'
+
+
+def project_modules(filename):
+    """
+    Returns the source files of the project modules (PROJECT_MODULES) imported by a source file, directly or
+    through other project modules, including the file itself. The imports are read from the source (also the
+    ones inside functions), without importing anything.
+
+    Parameters:
+    -----------
+    filename : str
+        The source file.
+
+    Returns:
+    --------
+    list
+        The sorted paths of the files (modules that are not next to `filename` are ignored).
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    found = set()
+    pending = [os.path.abspath(filename)]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.isfile(path):
+            continue
+        found.add(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            pending.extend(os.path.join(directory, name + '.py') for name in names
+                           if fnmatch.fnmatchcase(name, PROJECT_MODULES))
+    return sorted(found)
+
+
+def file_digest(filename):
+    """
+    Returns the content hash (BLAKE2b, hexadecimal) of a file.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactHasher:
+    """
+    Computes the content hash of files and directories.
+
+    Hashing the whole EXFORTABLES tree on every run would take longer than some stages, so the hash of every
+    file is memoized with its size and modification time (as git does) in a JSON file.
+    """
+    def __init__(self, filename=None):
+        """
+        Initializes the hasher and loads the memoized hashes from `filename` if it exists.
+        """
+        self.filename = filename                            # JSON file with the memoized hashes
+        self.entries = {}                                   # Path -> [size, mtime_ns, hash]
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as f:
+                self.entries = json.load(f)
+
+
+    def file(self, path):
+        """
+        Returns the content hash of a file.
+        """
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = file_digest(path)
+        self.entries[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+
+    def artifact(self, path):
+        """
+        Returns the content hash of a file or directory (names and contents of all its files), or None if the
+        path does not exist.
+        """
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                relative = os.path.relpath(full_path, path).replace(os.sep, '/')
+                digest.update('{}\0{}\n'.format(relative, self.file(full_path)).encode())
+        return digest.hexdigest()
+
+
+    def save(self):
+        """
+        Saves the memoized hashes.
+        """
+        if self.filename is not None:
+            with open(self.filename, 'w') as f:
+                json.dump(self.entries, f)
+
+
+class Stage:
+    """
+    A stage of a pipeline: a function called with its input paths, output paths and parameters as keyword
+    arguments, `function(**inputs, **outputs, **params)`. The function must write every output (file or
+    directory) and nothing else.
+    """
+    def __init__(self, name, function, inputs=None, outputs=None, params=None, version=None):
+        """
+        Initializes the stage. See `Pipeline.add_stage`.
+        """
+        self.name = name                                    # Name of the stage
+        self.function = function                            # Module-level function that runs the stage
+        self.inputs = dict(inputs or {})                    # Argument -> input path (absolute)
+        self.outputs = dict(outputs or {})                  # Argument -> output path (absolute)
+        self.params = dict(params or {})                    # Argument -> value (JSON serializable)
+        self.version = version                              # Changed by hand to force a rebuild
+
+
+    def code_digest(self, hasher=None):
+        """
+        Returns the hash of the code of the stage: the source code of the function (its name if the source is not
+        available) and the contents of the project modules imported by the file that defines it (see
+        `project_modules`), so that editing any function it calls (e.g. `clean_dataframe` or
+        `Experiment.prepare_data`) changes the key. `hasher` (an ArtifactHasher) memoizes the file hashes.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        try:
+            digest.update(inspect.getsource(self.function).encode())
+            source_file = inspect.getsourcefile(self.function)
+        except (OSError, TypeError):
+            digest.update('{}.{}'.format(self.function.__module__, self.function.__qualname__).encode())
+            source_file = __file__
+        for filename in project_modules(source_file):
+            module_digest = hasher.file(filename) if hasher is not None else file_digest(filename)
+            digest.update('{}\0{}\n'.format(os.path.basename(filename), module_digest).encode())
+        return digest.hexdigest()
+
+
+def _run_stage(function, inputs, outputs, params):
+    """
+    Runs the function of a stage (in the worker processes of the pool). Returns the elapsed time.
+    """
+    start = time.perf_counter()
+    for path in outputs.values():
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    function(**inputs, **outputs, **params)
+    return time.perf_counter() - start
+
+
+def _remove(path):
+    """
+    Removes a file or a directory if it exists.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _copy(source, target):
+    """
+    Copies a file or a directory, replacing the target.
+    """
+    _remove(target)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    if os.path.isdir(source):
+        shutil.copytree(source, target)
+    else:
+        shutil.copy2(source, target)
+
+
+class Pipeline:
+    """
+    Set of stages connected by their files, run like a content-addressed build.
+
+    Example:
+    --------
+    pipeline = Pipeline('work')
+    pipeline.add_stage('ingest', ingest_stage, inputs={'source': 'exfortables/p'},
+                       outputs={'database': 'EXFOR_ProtonReactions_Database.bin'})
+    pipeline.add_stage('text', text_stage, inputs={'database': 'EXFOR_ProtonReactions_Database.bin'},
+                       outputs={'text': 'EXFOR_ProtonReactions_Database.txt'})
+    report = pipeline.run()
+    """
+    def __init__(self, workdir='.', cache_dir=None):
+        """
+        Initializes an empty pipeline.
+
+        Parameters:
+        -----------
+        workdir : str, optional
+            Directory against which the relative paths of the stages are resolved. Default is '.'.
+        cache_dir : str, optional
+            Directory of the cache. Default is None (DEFAULT_CACHE_DIR inside the working directory).
+        """
+        self.workdir = os.path.abspath(workdir)                                         # Working directory
+        self.cache_dir = os.path.abspath(cache_dir or os.path.join(workdir, DEFAULT_CACHE_DIR))   # Cache
+        self.stages = {}                                                                # Name -> Stage
+        self.producers = {}                                                             # Output path -> stage
+
+
+    def path(self, path):
+        """
+        Resolves a path against the working directory.
+        """
+        return os.path.normpath(os.path.join(self.workdir, path))
+
+
+    def add_stage(self, name, function, inputs=None, outputs=None, params=None, version=None):
+        """
+        Declares a stage.
+
+        Parameters:
+        -----------
+        name : str
+            Name of the stage.
+        function : callable
+            Module-level function (it may run in another process) called as
+            `function(**inputs, **outputs, **params)` with absolute paths.
+        inputs : dict, optional
+            Argument -> path of a file or directory read by the stage. Paths written by another stage (or inside
+            a directory written by another stage) make this stage depend on it.
+        outputs : dict, optional
+            Argument -> path of a file or directory written by the stage.
+        params : dict, optional
+            Other arguments of the function. They must be JSON serializable, since they are part of the key.
+        version : str, optional
+            Change it to force a rebuild when something the key does not see changes (e.g. a helper function).
+
+        Returns:
+        --------
+        Stage
+            The declared stage.
+        """
+        if name in self.stages:
+            raise ValueError('Stage {} already declared'.format(name))
+        inputs = {argument: self.path(path) for argument, path in (inputs or {}).items()}
+        outputs = {argument: self.path(path) for argument, path in (outputs or {}).items()}
+        for path in outputs.values():
+            if path in self.producers:
+                raise ValueError('{} is already written by stage {}'.format(path, self.producers[path]))
+        stage = Stage(name, function, inputs, outputs, params, version)
+        self.stages[name] = stage
+        for path in outputs.values():
+            self.producers[path] = name
+        return stage
+
+
+    def dependencies(self, name):
+        """
+        Returns the names of the stages whose outputs are read by a stage.
+        """
+        dependencies = set()
+        for path in self.stages[name].inputs.values():
+            for output, producer in self.producers.items():
+                if path == output or path.startswith(output + os.sep):
+                    dependencies.add(producer)
+        dependencies.discard(name)
+        return dependencies
+
+
+    def order(self, targets=None):
+        """
+        Returns the names of the stages needed to build `targets` (default all stages) in dependency order.
+
+        Raises:
+        -------
+        ValueError:
+            If a target is unknown or the stages have a cycle.
+        """
+        targets = list(self.stages) if targets is None else list(targets)
+        unknown = [target for target in targets if target not in self.stages]
+        if unknown:
+            raise ValueError('Unknown stage(s) {}. Available stages: {}'.format(unknown, list(self.stages)))
+        dependencies = {name: self.dependencies(name) for name in self.stages}
+
+        # Stages needed for the targets
+        needed, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(dependencies[name])
+
+        # Topological order, keeping the declaration order among independent stages
+        order, done = [], set()
+        while len(order) < len(needed):
+            ready = [name for name in self.stages if name in needed and name not in done
+                     and dependencies[name] <= done]
+            if not ready:
+                raise ValueError('The stages {} have a cycle'.format(sorted(needed - done)))
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+
+    def stage_key(self, stage, hasher):
+        """
+        Returns the key of a stage: the hash of its name, code (including the project modules, see
+        `Stage.code_digest`), version, parameters and input contents.
+
+        Raises:
+        -------
+        FileNotFoundError:
+            If an input does not exist.
+        """
+        inputs = {}
+        for argument, path in stage.inputs.items():
+            inputs[argument] = hasher.artifact(path)
+            if inputs[argument] is None:
+                raise FileNotFoundError('Input {} of stage {} does not exist'.format(path, stage.name))
+        description = {'name': stage.name, 'code': stage.code_digest(hasher), 'version': stage.version,
+                       'params': stage.params, 'inputs': inputs}
+        content = json.dumps(description, sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode(), digest_size=20).hexdigest()
+
+
+    def _artifacts(self, key):
+        """
+        Returns the cache directory of the build of a key.
+        """
+        return os.path.join(self.cache_dir, 'artifacts', key)
+
+
+    def _manifest(self, key):
+        """
+        Returns the manifest of the build of a key ({'stage', 'outputs': argument -> hash, 'stored'}), or None.
+        """
+        filename = os.path.join(self._artifacts(key), 'manifest.json')
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+
+    def _reuse(self, stage, key, hasher):
+        """
+        Reuses a previous build of a stage. Returns 'cached' if its outputs are up to date, 'restored' if they
+        were copied from the cache, or None if the stage has to be built.
+        """
+        manifest = self._manifest(key)
+        if manifest is None:
+            return None
+        if all(hasher.artifact(path) == manifest['outputs'][argument] for argument, path in stage.outputs.items()):
+            return 'cached'
+        if not manifest['stored']:
+            return None
+        for argument, path in stage.outputs.items():
+            _copy(os.path.join(self._artifacts(key), argument), path)
+        return 'restored'
+
+
+    def _store(self, stage, key, hasher, keep):
+        """
+        Records the build of a stage (and copies its outputs to the cache if `keep`).
+        """
+        directory = self._artifacts(key)
+        os.makedirs(directory, exist_ok=True)
+        outputs = {}
+        for argument, path in stage.outputs.items():
+            outputs[argument] = hasher.artifact(path)
+            if outputs[argument] is None:
+                raise FileNotFoundError('Stage {} did not write its output {}'.format(stage.name, path))
+            if keep:
+                _copy(path, os.path.join(directory, argument))
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump({'stage': stage.name, 'outputs': outputs, 'stored': keep}, f, indent=1)
+
+
+    def run(self, targets=None, processes=1, force=(), keep=True, mp_context=None):
+        """
+        Runs the pipeline, building only the stages whose key has no previous build.
+
+        Parameters:
+        -----------
+        targets : list, optional
+            Names of the stages to bring up to date (and the stages they depend on). Default is None (all).
+        processes : int, optional
+            Maximum number of stages run concurrently in separate processes. Default is 1 (run the stages one
+            after the other in this process).
+        force : list, optional
+            Names of the stages to rebuild even if they are up to date. Default is ().
+        keep : bool, optional
+            Whether to copy the outputs of every build to the cache, so that they can be restored when the same
+            key comes back (e.g. after reverting a parameter). Default is True.
+        mp_context : multiprocessing context, optional
+            Context of the process pool (e.g. multiprocessing.get_context('spawn')). Default is None.
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per stage with its status ('cached', 'restored', 'built', 'failed' or 'skipped' when a stage
+            it depends on failed), key, time in seconds and error.
+        """
+        order = self.order(targets)
+        dependencies = {name: self.dependencies(name) & set(order) for name in order}
+        hasher = ArtifactHasher(os.path.join(self.cache_dir, 'hashes.json'))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        results = {}
+        keys = {}
+        running = {}
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) if processes > 1 else None
+
+        def finish(name, status, seconds=0.0, error=None):
+            results[name] = {'stage': name, 'status': status, 'key': keys.get(name), 'seconds': seconds,
+                             'error': error}
+            print('[{}] {}{}'.format(name, status, '' if error is None else ': ' + error))
+
+        try:
+            while len(results) < len(order):
+                # Start (or reuse) every stage whose dependencies are finished
+                for name in order:
+                    if name in results or name in running or not dependencies[name] <= set(results):
+                        continue
+                    failed = [dependency for dependency in dependencies[name]
+                              if results[dependency]['status'] in ('failed', 'skipped')]
+                    if failed:
+                        finish(name, 'skipped', error='depends on {}'.format(', '.join(sorted(failed))))
+                        continue
+                    stage = self.stages[name]
+                    try:
+                        keys[name] = self.stage_key(stage, hasher)
+                        status = None if name in force else self._reuse(stage, keys[name], hasher)
+                    except Exception as error:
+                        finish(name, 'failed', error=repr(error))
+                        continue
+                    if status is not None:
+                        finish(name, status)
+                    elif executor is None:
+                        try:
+                            seconds = _run_stage(stage.function, stage.inputs, stage.outputs, stage.params)
+                            self._store(stage, keys[name], hasher, keep)
+                            finish(name, 'built', seconds)
+                        except Exception as error:
+                            finish(name, 'failed', error=repr(error))
+                    else:
+                        running[name] = executor.submit(_run_stage, stage.function, stage.inputs, stage.outputs,
+                                                        stage.params)
+
+                # Wait for a running stage to finish
+                if running:
+                    done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                    for name in [name for name, future in running.items() if future in done]:
+                        future = running.pop(name)
+                        try:
+                            seconds = future.result()
+                            self._store(self.stages[name], keys[name], hasher, keep)
+                            finish(name, 'built', seconds)
+                        except Exception as error:
+                            finish(name, 'failed', error=repr(error))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            hasher.save()
+
+        report = pd.DataFrame([results[name] for name in order], columns=['stage', 'status', 'key', 'seconds',
+                                                                           'error'])
+        counts = report['status'].value_counts()
+        print('{} stages built, {} reused, {} failed or skipped'.format(
+            counts.get('built', 0), counts.get('cached', 0) + counts.get('restored', 0),
+            counts.get('failed', 0) + counts.get('skipped', 0)))
+        return report
+
+
+    def clear_cache(self):
+        """
+        Removes the cache (the next run rebuilds every stage whose outputs are not up to date).
+        """
+        _remove(self.cache_dir)
+
+
+# ---------------------------------------------------------------------------------------------------------------
+# Stages of the Data Preprocessing notebook
+# ---------------------------------------------------------------------------------------------------------------
+
+def ingest_stage(source, database, root=''):
+    """
+    Reads the experiments of an EXFORTABLES directory (or archive) and writes the binary database.
+    """
+    experiments = read_proton_experiments_from_exfortables(source, root=root, progress=False)
+    write_experiments_to_binary(experiments, database)
+
+
+def text_stage(database, text):
+    """
+    Writes the text database from the binary database.
+    """
+    write_experiments_to_txt(read_experiments_from_binary(database), text)
+
+
+def classify_stage(database, classified, groups=None):
+    """
+    Classifies the experiments of the binary database by data and writes the group CSV files to a directory.
+    """
+    _remove(classified)
+    os.makedirs(classified)
+    classify_experiments_by_data(read_experiments_from_binary(database), groups=groups, progress=False,
+                                 output_dir=classified)
+
+
+def split_stage(classified, split, splits):
+    """
+    Splits classified groups in two files: the rows where a column is missing ('_1') and the others ('_2').
+
+    Parameters:
+    -----------
+    classified : str
+        Directory with the group CSV files.
+    split : str
+        Directory where the split files are written.
+    splits : dict
+        Group number -> column (e.g. {4: 'final_A'}, as in the Data Preprocessing notebook).
+    """
+    _remove(split)
+    os.makedirs(split)
+    for number, column in splits.items():
+        filename = os.path.join(classified, 'EXFOR_ProtonReactions_Classified_Group_{}.csv'.format(number))
+        if not os.path.exists(filename):
+            print('Group {} not found. It is not split'.format(number))
+            continue
+        df = pd.read_csv(filename)
+        stem = os.path.join(split, 'EXFOR_ProtonReactions_Classified_Group_{}'.format(number))
+        df[df[column].isna()].to_csv(stem + '_1.csv', index=False)
+        df[df[column].notna()].to_csv(stem + '_2.csv', index=False)
+
+
+def clean_stage(classified, split, cleaned, uncertainties=False):
+    """
+    Cleans every group with `clean_dataframe` (the split parts instead of the groups that were split) and
+    writes the results, with the same file names, to a directory.
+    """
+    _remove(cleaned)
+    os.makedirs(cleaned)
+    parts = sorted(os.listdir(split))
+    was_split = {name.rsplit('_', 1)[0] + '.csv' for name in parts}
+    sources = [os.path.join(classified, name) for name in sorted(os.listdir(classified)) if name not in was_split]
+    sources += [os.path.join(split, name) for name in parts]
+    for filename in sources:
+        df = clean_dataframe(pd.read_csv(filename), uncertainties=uncertainties)
+        df.to_csv(os.path.join(cleaned, os.path.basename(filename)), index=False)
+
+
+def preprocessing_pipeline(source, workdir='.', root='', groups=None, splits=None, uncertainties=False, text=True,
+                           cache_dir=None):
+    """
+    Declares the pipeline of the Data Preprocessing notebook.
+
+    Stages and outputs (relative to `workdir`):
+        ingest   -> EXFOR_ProtonReactions_Database.bin
+        text     -> EXFOR_ProtonReactions_Database.txt (independent of the next stages)
+        classify -> classified/EXFOR_ProtonReactions_Classified_Group_{n}.csv
+        split    -> split/EXFOR_ProtonReactions_Classified_Group_{n}_{1,2}.csv
+        clean    -> cleaned/ (every group cleaned, the split parts instead of the groups that were split)
+
+    Parameters:
+    -----------
+    source : str
+        EXFORTABLES directory with the proton experiments, or an archive of it.
+    workdir : str, optional
+        Directory of the outputs. Default is '.'.
+    root : str, optional
+        Only for archives: directory inside the archive that plays the role of the root directory. Default is ''.
+    groups : list, optional
+        Numbers of the groups to classify (see `classify_experiments_by_data`). Default is None (all groups).
+    splits : dict, optional
+        Groups to split, group number -> column. Default is None (DEFAULT_SPLITS).
+    uncertainties : bool, optional
+        Whether to keep the uncertainty columns when cleaning. Default is False.
+    text : bool, optional
+        Whether to write the text database. Default is True.
+    cache_dir : str, optional
+        Directory of the cache. Default is None (DEFAULT_CACHE_DIR inside `workdir`).
+
+    Returns:
+    --------
+    Pipeline
+        The declared pipeline. Run it with `pipeline.run()`.
+
+    Example:
+    --------
+    pipeline = preprocessing_pipeline('exfortables/p', workdir='preprocessing', splits={4: 'final_A'})
+    report = pipeline.run(processes=2)
+    """
+    splits = DEFAULT_SPLITS if splits is None else splits
+    database = 'EXFOR_ProtonReactions_Database.bin'
+    pipeline = Pipeline(workdir, cache_dir)
+    pipeline.add_stage('ingest', ingest_stage, inputs={'source': os.path.abspath(source)},
+                       outputs={'database': database}, params={'root': root})
+    if text:
+        pipeline.add_stage('text', text_stage, inputs={'database': database},
+                           outputs={'text': 'EXFOR_ProtonReactions_Database.txt'})
+    pipeline.add_stage('classify', classify_stage, inputs={'database': database},
+                       outputs={'classified': 'classified'}, params={'groups': groups})
+    pipeline.add_stage('split', split_stage, inputs={'classified': 'classified'}, outputs={'split': 'split'},
+                       params={'splits': splits})
+    pipeline.add_stage('clean', clean_stage, inputs={'classified': 'classified', 'split': 'split'},
+                       outputs={'cleaned': 'cleaned'}, params={'uncertainties': uncertainties})
+    return pipeline
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run the EXFOR proton reactions preprocessing pipeline.')
+    parser.add_argument('source', help='EXFORTABLES directory with the proton experiments, or an archive of it.')
+    parser.add_argument('--workdir', default='.', help='Directory of the outputs.')
+    parser.add_argument('--root', default='', help='Root directory inside the archive.')
+    parser.add_argument('--groups', nargs='*', type=int, default=None, help='Numbers of the groups to classify.')
+    parser.add_argument('--split', nargs='*', default=None, help='Groups to split, as number:column.')
+    parser.add_argument('--uncertainties', action='store_true', help='Keep the uncertainty columns when cleaning.')
+    parser.add_argument('--no-text', action='store_true', help='Do not write the text database.')
+    parser.add_argument('--processes', type=int, default=1, help='Maximum number of stages run concurrently.')
+    parser.add_argument('--force', nargs='*', default=(), help='Stages to rebuild even if they are up to date.')
+    parser.add_argument('--targets', nargs='*', default=None, help='Stages to bring up to date (default all).')
+    args = parser.parse_args()
+
+    splits = None if args.split is None else {int(item.split(':')[0]): item.split(':')[1] for item in args.split}
+    pipeline = preprocessing_pipeline(args.source, args.workdir, root=args.root, groups=args.groups, splits=splits,
+                                      uncertainties=args.uncertainties, text=not args.no_text)
+    print(pipeline.run(targets=args.targets, processes=args.processes, force=args.force).to_string(index=False))
@@ -0,0 +1,283 @@
+"""
+================================================================================
+TITLE: Headless Parallel Batch Export of Experiment and Outlier Plots
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script renders the plots of `Experiment.plot`, `plot_experiments` and
+    `plot_outlier_group` to image files instead of showing them, so that review
+    plots can be generated for every experiment, classified group and outlier
+    group of the database. Figures are rendered in a pool of worker processes
+    with the non-interactive 'Agg' backend, one figure per task, written to a
+    directory tree keyed by group or X4_ID, and closed explicitly so that the
+    memory does not grow over thousands of plots.
+
+MAIN FEATURES:
+    - Worker processes initialized with the non-interactive 'Agg' backend.
+    - One figure per task, saved in several formats (PNG, PDF, SVG, ...).
+    - Experiment plots organized by classified group, any attribute or X4_ID.
+    - Outlier group plots with an index CSV describing every group.
+    - Per-task error handling: a failing plot does not stop the batch.
+
+DEPENDENCIES:
+    - pandas
+    - matplotlib
+    - Plotting (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_PlotExport as pe`
+    2. Export experiments: `pe.export_experiment_plots(experiments, 'plots/experiments', group_by='classified')`
+    3. Export outliers: `pe.export_outlier_plots(outliers_df, experiments, 'plots/outliers', ylog=True)`
+================================================================================
+"""
+
+import os
+import re
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from EXFOR_ProtonReactions_Plotting import group_outliers, plot_outlier_group, plot_experiments
+
+
+def _init_worker():
+    """
+    Selects the non-interactive 'Agg' backend in a worker process.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    # With the 'fork' start method pyplot may have been imported by the parent with another backend
+    plt.switch_backend('Agg')
+
+
+def _safe_name(value):
+    """
+    Converts any value into a string usable as a file or directory name.
+    """
+    name = re.sub(r'[^A-Za-z0-9_.,()+\-=]+', '_', str(value)).strip('._')
+    return name[:150] if name else 'None'
+
+
+def _render_task(task):
+    """
+    Renders one figure and saves it in every requested format.
+
+    Parameters:
+    -----------
+    task : tuple
+        (kind, payload, base_path, formats, dpi, plot_kwargs). `kind` is 'experiment' (payload: Experiment),
+        'experiments' (payload: list of Experiment) or 'outliers' (payload: (outliers, experiments)).
+
+    Returns:
+    --------
+    tuple
+        (base_path, list of written files, error message or None).
+    """
+    import matplotlib.pyplot as plt
+    kind, payload, base_path, formats, dpi, plot_kwargs = task
+    fig = None
+    try:
+        if kind == 'experiment':
+            fig = payload.plot(show=False, **plot_kwargs)
+        elif kind == 'experiments':
+            fig = plot_experiments(payload, show=False, **plot_kwargs)
+        elif kind == 'outliers':
+            outliers, experiments = payload
+            fig = plot_outlier_group(outliers, experiments, show=False, **plot_kwargs)
+        else:
+            raise ValueError('Unknown plot kind {}'.format(kind))
+        if fig is None:
+            return base_path, [], 'Nothing to plot'
+
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        written = []
+        for fmt in formats:
+            path = '{}.{}'.format(base_path, fmt)
+            fig.savefig(path, format=fmt, dpi=dpi, bbox_inches='tight')
+            written.append(path)
+        return base_path, written, None
+    except Exception as error:
+        return base_path, [], '{}: {}'.format(type(error).__name__, error)
+    finally:
+        # Close the figure explicitly (and anything left open by seaborn) to keep the memory flat
+        if fig is not None:
+            plt.close(fig)
+        plt.close('all')
+
+
+def export_figures(tasks, processes=None, chunksize=8, mp_context=None):
+    """
+    Renders a list of plot tasks in a pool of headless worker processes.
+
+    Parameters:
+    -----------
+    tasks : list
+        Tasks as described in `_render_task`.
+    processes : int, optional
+        Number of worker processes. Default is the number of CPUs.
+    chunksize : int, optional
+        Number of tasks sent to a worker at a time. Default is 8.
+    mp_context : multiprocessing context, optional
+        Context used to start the workers (e.g. `multiprocessing.get_context('spawn')`).
+
+    Returns:
+    --------
+    results : pd.DataFrame
+        One row per task with 'path' (base path without extension), 'files' (written files) and 'error'.
+    """
+    if not tasks:
+        return pd.DataFrame(columns=['path', 'files', 'error'])
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context, initializer=_init_worker) as executor:
+        results = list(executor.map(_render_task, tasks, chunksize=chunksize))
+
+    results = pd.DataFrame(results, columns=['path', 'files', 'error'])
+    n_errors = results['error'].notna().sum()
+    print('{} figures written, {} skipped or failed'.format(len(results) - n_errors, n_errors))
+    return results
+
+
+def classified_group_labels(experiments):
+    """
+    Returns the classified group ('Group_1', 'Group_2', ...) of every experiment.
+
+    The numbering follows `classify_experiments_by_data`: experiments are grouped by their data columns and the
+    groups are numbered in order of first appearance.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    list
+        The group label of every experiment.
+    """
+    numbers = {}
+    labels = []
+    for experiment in experiments:
+        key = tuple(experiment.data.columns)
+        if key not in numbers:
+            numbers[key] = len(numbers) + 1
+        labels.append('Group_{}'.format(numbers[key]))
+    return labels
+
+
+def export_experiment_plots(experiments, output_dir, group_by=None, formats=('png',), dpi=100, processes=None,
+                            chunksize=8, mp_context=None, **plot_kwargs):
+    """
+    Exports the plot of every experiment (`Experiment.plot`) to image files.
+
+    Files are written to `output_dir/<group>/<X4_ID>/<title>.<format>`, or to `output_dir/<X4_ID>/<title>.<format>`
+    when `group_by` is None.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+    output_dir : str
+        Root directory of the exported plots.
+    group_by : str | callable, optional
+        'classified' to use the classified group of `classify_experiments_by_data`, the name of an Experiment
+        attribute (e.g. 'MT') or a function returning the group of an experiment. Default is None.
+    formats : tuple, optional
+        Image formats to write (any format supported by `savefig`). Default is ('png',).
+    dpi : int, optional
+        Resolution of raster formats. Default is 100.
+    processes : int, optional
+        Number of worker processes. Default is the number of CPUs.
+    chunksize : int, optional
+        Number of tasks sent to a worker at a time. Default is 8.
+    mp_context : multiprocessing context, optional
+        Context used to start the workers.
+    **plot_kwargs :
+        Extra arguments of `Experiment.plot` (xlog, ylog, fig_size, max_points, decimation).
+
+    Returns:
+    --------
+    results : pd.DataFrame
+        One row per experiment with the written files and the error (if any).
+
+    Example:
+    --------
+    export_experiment_plots(experiments, 'plots', group_by='classified', formats=('png', 'pdf'), ylog=True)
+    """
+    if group_by == 'classified':
+        groups = classified_group_labels(experiments)
+    elif callable(group_by):
+        groups = [group_by(experiment) for experiment in experiments]
+    elif group_by is not None:
+        groups = ['{}_{}'.format(group_by, getattr(experiment, group_by)) for experiment in experiments]
+    else:
+        groups = [None] * len(experiments)
+
+    tasks = []
+    for experiment, group in zip(experiments, groups):
+        directory = output_dir if group is None else os.path.join(output_dir, _safe_name(group))
+        # The title is the file name of the experiment (the full path on non-Windows systems)
+        file_name = os.path.basename(str(experiment.title).replace('\\', '/'))
+        base_path = os.path.join(directory, _safe_name(experiment.X4_ID), _safe_name(file_name))
+        tasks.append(('experiment', experiment, base_path, tuple(formats), dpi, plot_kwargs))
+
+    return export_figures(tasks, processes, chunksize, mp_context)
+
+
+def export_outlier_plots(outliers_df, experiments, output_dir, formats=('png',), dpi=100, processes=None,
+                         chunksize=1, mp_context=None, **plot_kwargs):
+    """
+    Exports one plot per group of outliers (the figures of `plot_outliers`) to image files.
+
+    Every group is written to `output_dir/group_XXXX/outliers.<format>` and `output_dir/index.csv` lists the
+    values of the grouping columns, the X4_IDs and the number of outliers of every group.
+
+    Parameters:
+    -----------
+    outliers_df : pd.DataFrame
+        The outliers, as passed to `plot_outliers`.
+    experiments : list
+        A list of Experiment objects.
+    output_dir : str
+        Root directory of the exported plots.
+    formats : tuple, optional
+        Image formats to write. Default is ('png',).
+    dpi : int, optional
+        Resolution of raster formats. Default is 100.
+    processes : int, optional
+        Number of worker processes. Default is the number of CPUs.
+    chunksize : int, optional
+        Number of tasks sent to a worker at a time. Default is 1.
+    mp_context : multiprocessing context, optional
+        Context used to start the workers.
+    **plot_kwargs :
+        Extra arguments of `plot_outlier_group` (xlog, ylog, fig_size, max_points, decimation).
+
+    Returns:
+    --------
+    results : pd.DataFrame
+        The index of the groups with the written files and the error (if any) of every group.
+
+    Example:
+    --------
+    export_outlier_plots(outliers_df, experiments, 'plots/svm_group_2', formats=('png', 'svg'), ylog=True)
+    """
+    groupby_columns, groups = group_outliers(outliers_df, experiments)
+
+    tasks, index = [], []
+    for number, (key, outliers, group_experiments) in enumerate(groups, start=1):
+        key = key if isinstance(key, tuple) else (key,)
+        base_path = os.path.join(output_dir, 'group_{:04d}'.format(number), 'outliers')
+        tasks.append(('outliers', (outliers, group_experiments), base_path, tuple(formats), dpi, plot_kwargs))
+        row = dict(zip(groupby_columns, key))
+        row.update({'group': number,
+                    'X4_IDs': ' '.join(sorted({str(experiment.X4_ID) for experiment in group_experiments})),
+                    'n_outliers': len(outliers)})
+        index.append(row)
+
+    results = export_figures(tasks, processes, chunksize, mp_context)
+    index = pd.DataFrame(index)
+    index['files'] = results['files'].values if len(results) else []
+    index['error'] = results['error'].values if len(results) else []
+    os.makedirs(output_dir, exist_ok=True)
+    index.to_csv(os.path.join(output_dir, 'index.csv'), index=False)
+    return index
@@ -0,0 +1,424 @@
+"""
+================================================================================
+TITLE: Plotting Functions for Proton Experiment Data Analysis
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors (plotting functions by Juan A. Monleón de la Lluvia, moved from UtilityFunctions)
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script contains the plotting functions of the analysis: plots of lists
+    of experiments and of the outliers found by the outlier detection methods,
+    drawn on top of the experiments they belong to. They are kept apart from
+    the parsing, storage and query functions of `UtilityFunctions` so that the
+    core of the analysis can be imported without loading matplotlib and
+    seaborn, which take most of the import time. The functions are still
+    available from `UtilityFunctions`, where they are imported on first use.
+
+MAIN FEATURES:
+    - Plot of a list of experiments with their uncertainties.
+    - Grouping of the outliers by the columns that are not data columns.
+    - Plot of every group of outliers with batched artists and a capped legend.
+    - Optional decimation of dense experiments (see Decimation).
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - matplotlib
+    - seaborn
+    - Experiment (custom class)
+    - UtilityFunctions (custom module)
+    - Decimation (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Plotting as pl`
+    2. Plot experiments: `pl.plot_experiments(experiments, ylog=True)`
+    3. Plot outliers: `pl.plot_outliers(outliers_df, experiments, ylog=True)`
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
+import seaborn as sns
+from EXFOR_ProtonReactions_Experiment_Class import ID_COLUMNS
+from EXFOR_ProtonReactions_UtilityFunctions import build_experiment_index
+from EXFOR_ProtonReactions_Decimation import decimate_data
+
+
+def plot_experiments(experiments, xlog=False, ylog=False, fig_size=(9,6), show=True, max_points=None, decimation='lttb'):
+    """
+    Plots a list of experiments using matplotlib and seaborn libraries.
+
+    The function accepts a list of experiment objects and plots them on a 2D graph based on
+    their data attributes. It can plot with or without error bars along the x and y axes.
+    Additionally, it supports logarithmic scaling for both axes and allows figure size customization.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of experiment objects to be plotted. Each object should have a 'data' attribute 
+        which is a pandas DataFrame containing the relevant data.
+    xlog : bool, optional
+        A flag to specify if the x-axis should be logarithmic. Default is False.
+    ylog : bool, optional
+        A flag to specify if the y-axis should be logarithmic. Default is False.
+    fig_size : tuple, optional
+        The dimensions of the figure to be plotted. Default is (9, 6).
+    show : bool, optional
+        Whether to display the plot. If False, the figure is returned instead. Default is True.
+    max_points : int, optional
+        Maximum number of points drawn per experiment. If None, all points are drawn. Default is None.
+    decimation : str, optional
+        Method used to select the drawn points, 'lttb' or 'minmax' (see `decimate`). Default is 'lttb'.
+
+    Returns:
+    --------
+    None | matplotlib.figure.Figure : 
+        Nothing when the plot is displayed; the figure when `show` is False.
+
+    Example:
+    --------
+    plot_experiments([experiment1, experiment2], xlog=True, ylog=False, fig_size=(10,8))
+
+    Notes:
+    ------
+    - The function first validates that all experiments have the same DataFrame columns.
+    - The plotting accounts for possible error attributes in the x and y axes.
+    - The resulting plot can be customized through optional parameters like `xlog`, `ylog`, and `fig_size`.
+    """
+    
+    # First, check if there are experiments to plot
+    if not experiments:
+        print('No experiments to plot')
+        return
+    
+    # Then, verify that all dataframes have the same headers
+    headers = list(experiments[0].data.columns.values)
+    for experiment in experiments[1:]:
+        if list(experiment.data.columns.values) != headers:
+            print('Mismatch in headers between experiments.')
+            return
+    
+    # Now proceed to set up and plot each experiment
+    fig = plt.figure(figsize=fig_size)
+    for experiment in experiments:
+        data = decimate_data(experiment.data, max_points, decimation, xlog=xlog, ylog=ylog)
+        y_err = data.iloc[:,2].isnull().values.all() or data.iloc[:,2].eq(0).all()
+        x_err = data.iloc[:,3].isnull().values.all() or data.iloc[:,3].eq(0).all()
+        
+        # Depending on y_err and x_err, we decide how to plot
+        if y_err == False and x_err == False:
+            plt.errorbar(x=data[headers[0]], y=data[headers[1]], 
+                        xerr=data[headers[3]], yerr=data[headers[2]],
+                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
+        elif y_err == False:
+            plt.errorbar(x=data[headers[0]], y=data[headers[1]], yerr=data[headers[2]], 
+                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
+        elif x_err == False:
+            plt.errorbar(x=data[headers[0]], y=data[headers[1]], xerr=data[headers[3]], 
+                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
+        else:
+            sns.scatterplot(x=headers[0], y=headers[1], data=data, label=experiment.X4_ID)
+    
+    # Set scale, labels, title, and display the plot
+    if xlog: plt.xscale('log')
+    if ylog: plt.yscale('log')
+    
+    plt.xlabel(headers[0], fontsize=16, labelpad=10)
+    plt.ylabel(headers[1], fontsize=16, labelpad=10)
+    plt.xticks(fontsize=14)
+    plt.yticks(fontsize=14)
+    plt.legend()
+    if not show: return fig
+    plt.show()
+
+
+def group_outliers(outliers_df, experiments):
+    """
+    Splits an outliers DataFrame into the groups drawn by `plot_outliers`.
+
+    The outliers are grouped by the columns that are not part of the experiments' 'data' and are not
+    identification columns (i.e. by the reaction attributes). For every group, the experiments involved and
+    the outlier points to mark are returned.
+
+    Parameters:
+    -----------
+    outliers_df : pd.DataFrame
+        A DataFrame containing the outlier data points. Should have an 'exp_id' column (or, for older group files,
+        an 'X4_ID' column) which matches the experiments.
+    experiments : list
+        A list of experiment objects.
+
+    Returns:
+    --------
+    groupby_columns : list
+        The columns used to group the outliers.
+    groups : list
+        A list of (key, outliers, group_experiments) tuples, one per group: the values of the groupby columns,
+        the outlier points to mark and the experiments to draw.
+
+    Raises:
+    -------
+    ValueError
+        If none of the outliers belong to the given experiments.
+
+    Example:
+    --------
+    columns, groups = group_outliers(outliers_df, experiments)
+
+    Notes:
+    ------
+    - The outliers of experiments that are not in the list (e.g. when plotting a subset) are dropped.
+    """
+    # If the outliers carry the experiment ids, the experiments are found with an array lookup.
+    # Otherwise they are matched by X4_ID (which is not unique).
+    use_ids = 'exp_id' in outliers_df.columns
+    if use_ids:
+        index = build_experiment_index(experiments)
+        exp_ids = outliers_df['exp_id'].to_numpy(dtype=np.int64)
+        known = (exp_ids >= 0) & (exp_ids < len(index))
+        known[known] = np.not_equal(index[exp_ids[known]], None)
+    else:
+        experiments_by_x4_id = {}
+        for experiment in experiments:
+            experiments_by_x4_id.setdefault(experiment.X4_ID, []).append(experiment)
+        known = outliers_df['X4_ID'].isin(experiments_by_x4_id).to_numpy()
+    if not known.any():
+        raise ValueError('None of the {} outliers belong to the given experiments'.format(len(outliers_df)))
+    if not known.all():
+        print('{} outliers of experiments that are not in the list are not plotted'.format(int((~known).sum())))
+        outliers_df = outliers_df[known]
+
+    if use_ids:
+        example_experiment = index[int(outliers_df['exp_id'].iloc[0])]
+    else:
+        example_experiment = experiments_by_x4_id[outliers_df['X4_ID'].iloc[0]][0]
+    # Get the column names from the 'data' attribute of a corresponding experiment
+    data_columns = example_experiment.data.columns.values.tolist()
+
+    # Get columns from outliers_df that are not in 'data' and are also not identification columns
+    groupby_columns = [col for col in outliers_df.columns if col not in data_columns and col not in ID_COLUMNS]
+
+    # Build the lookup once: X4_ID -> positions of its outliers
+    if not use_ids:
+        outlier_positions = outliers_df.groupby('X4_ID', sort=False).indices
+
+    groups = []
+    for key, group in outliers_df.groupby(groupby_columns):
+        if use_ids:
+            # The rows of the group are exactly the outliers of its experiments
+            group_experiments = list(index[group['exp_id'].unique().astype(np.int64)])
+            group_outliers = group
+        else:
+            x4_ids = group['X4_ID'].unique()
+            group_experiments = [experiment for x4_id in x4_ids for experiment in experiments_by_x4_id[x4_id]]
+            positions = np.sort(np.concatenate([outlier_positions[x4_id] for x4_id in x4_ids]))
+            group_outliers = outliers_df.iloc[positions]
+        groups.append((key, group_outliers, group_experiments))
+
+    return groupby_columns, groups
+
+
+def _stack_experiment_data(datas):
+    """
+    Concatenates the data of several experiments into flat arrays, so that they can be drawn with a few artists.
+
+    The first four data columns are taken as (x, y, dy, dx), as in `plot_experiments`. The uncertainties of an
+    experiment are set to NaN (no error bar) when they are all missing or zero.
+
+    Parameters:
+    -----------
+    datas : list
+        The 'data' DataFrames of the experiments (possibly decimated).
+
+    Returns:
+    --------
+    tuple
+        (x, y, xerr, yerr, owner) arrays with one entry per data point; `owner` is the position of the point's
+        experiment in the list.
+    """
+    blocks = {'x': [], 'y': [], 'xerr': [], 'yerr': [], 'owner': []}
+    for i, data in enumerate(datas):
+        n = len(data)
+        # Text-loaded experiments store strings; missing columns are treated as missing values
+        columns = [pd.to_numeric(data.iloc[:, c], errors='coerce').to_numpy(dtype=np.float64)
+                   if data.shape[1] > c else np.full(n, np.nan) for c in range(4)]
+        x, y, dy, dx = columns
+        if np.all(np.isnan(dy) | (dy == 0)): dy = np.full(n, np.nan)
+        if np.all(np.isnan(dx) | (dx == 0)): dx = np.full(n, np.nan)
+        blocks['x'].append(x)
+        blocks['y'].append(y)
+        blocks['xerr'].append(dx)
+        blocks['yerr'].append(dy)
+        blocks['owner'].append(np.full(n, i, dtype=np.int64))
+
+    if not datas:
+        return tuple(np.empty(0) for _ in range(4)) + (np.empty(0, dtype=np.int64),)
+    return tuple(np.concatenate(blocks[name]) for name in ['x', 'y', 'xerr', 'yerr', 'owner'])
+
+
+def _outlier_masks(outliers, experiments, headers):
+    """
+    Flags the rows of every experiment's data that are outliers, so that decimation keeps them.
+
+    The rows are found from the 'exp_id' and 'point_index' columns of the outliers when present; otherwise the
+    rows whose abscissa and value both appear among the outliers are flagged.
+
+    Parameters:
+    -----------
+    outliers : pd.DataFrame
+        The outlier points.
+    experiments : list
+        The experiments of the group.
+    headers : list
+        The data column names (abscissa first, value second).
+
+    Returns:
+    --------
+    list
+        One boolean array per experiment.
+    """
+    masks = []
+    if 'exp_id' in outliers.columns and 'point_index' in outliers.columns:
+        rows = outliers.groupby('exp_id')['point_index'].apply(np.asarray).to_dict()
+        for experiment in experiments:
+            masks.append(np.isin(np.arange(len(experiment.data)), rows.get(experiment.exp_id, [])))
+    else:
+        outlier_x = pd.to_numeric(outliers[headers[0]], errors='coerce').to_numpy(dtype=np.float64)
+        outlier_y = pd.to_numeric(outliers[headers[1]], errors='coerce').to_numpy(dtype=np.float64)
+        for experiment in experiments:
+            data = experiment.data
+            masks.append(np.isin(pd.to_numeric(data.iloc[:, 0], errors='coerce').to_numpy(dtype=np.float64), outlier_x) &
+                         np.isin(pd.to_numeric(data.iloc[:, 1], errors='coerce').to_numpy(dtype=np.float64), outlier_y))
+    return masks
+
+
+def plot_outlier_group(outliers, experiments, xlog=False, ylog=False, fig_size=(9,6), show=True, max_legend_entries=30,
+                       max_points=None, decimation='lttb'):
+    """
+    Plots the experiments of one group of outliers with the outlier points marked in red.
+
+    The points of all the experiments are drawn at once: one collection for the error bars, one scatter for the
+    points (coloured by experiment) and one scatter for the outliers. The legend uses one proxy entry per experiment.
+
+    Parameters:
+    -----------
+    outliers : pd.DataFrame
+        The outlier points to mark, with the same data column names as the experiments.
+    experiments : list
+        The experiments of the group.
+    xlog : bool, optional
+        A flag to specify if the x-axis should be logarithmic. Default is False.
+    ylog : bool, optional
+        A flag to specify if the y-axis should be logarithmic. Default is False.
+    fig_size : tuple, optional
+        The dimensions of the figure to be plotted. Default is (9, 6).
+    show : bool, optional
+        Whether to display the plot. If False, the figure is returned instead. Default is True.
+    max_legend_entries : int, optional
+        Maximum number of experiments listed in the legend; the rest are summarized in one entry. Default is 30.
+    max_points : int, optional
+        Maximum number of points drawn per experiment. The outlier points are always drawn. If None, all points
+        are drawn. Default is None.
+    decimation : str, optional
+        Method used to select the drawn points, 'lttb' or 'minmax' (see `decimate`). Default is 'lttb'.
+
+    Returns:
+    --------
+    None | matplotlib.figure.Figure :
+        Nothing when the plot is displayed; the figure when `show` is False.
+    """
+    headers = list(experiments[0].data.columns.values) if experiments else list(outliers.columns.values)
+    datas = [experiment.data for experiment in experiments]
+    if max_points is not None:
+        datas = [decimate_data(data, max_points, decimation, keep, xlog, ylog)
+                 for data, keep in zip(datas, _outlier_masks(outliers, experiments, headers))]
+    x, y, xerr, yerr, owner = _stack_experiment_data(datas)
+
+    # One colour of the property cycle per experiment
+    colors = to_rgba_array(plt.rcParams['axes.prop_cycle'].by_key().get('color', ['C0']))
+    experiment_colors = colors[np.arange(len(experiments)) % len(colors)]
+
+    fig = plt.figure(figsize=fig_size)
+
+    # Error bars of every experiment in a single call
+    has_xerr = np.isfinite(xerr).any()
+    has_yerr = np.isfinite(yerr).any()
+    if has_xerr or has_yerr:
+        plt.errorbar(x, y, xerr=xerr if has_xerr else None, yerr=yerr if has_yerr else None,
+                     fmt='none', ecolor='black', capsize=3, elinewidth=1)
+
+    # Normal data and outliers
+    plt.scatter(x, y, c=experiment_colors[owner], s=25, zorder=2.5)
+    plt.scatter(pd.to_numeric(outliers[headers[0]], errors='coerce'), pd.to_numeric(outliers[headers[1]], errors='coerce'),
+                color='red', s=50, zorder=3, marker='x')
+
+    # Legend entries without drawing anything
+    handles = [Line2D([], [], color='red', marker='x', linestyle='none', markersize=7, label='Outliers')]
+    handles += [Line2D([], [], color=color, marker='o', linestyle='none', markersize=5, label=experiment.X4_ID)
+                for experiment, color in zip(experiments[:max_legend_entries], experiment_colors)]
+    if len(experiments) > max_legend_entries:
+        handles.append(Line2D([], [], linestyle='none', label='... and {} more'.format(len(experiments) - max_legend_entries)))
+
+    if xlog: plt.xscale('log')
+    if ylog: plt.yscale('log')
+    plt.xlabel(headers[0], fontsize=16, labelpad=10)
+    plt.ylabel(headers[1], fontsize=16, labelpad=10)
+    plt.xticks(fontsize=14)
+    plt.yticks(fontsize=14)
+    plt.legend(handles=handles)
+    if not show: return fig
+    plt.show()
+
+
+def plot_outliers(outliers_df, experiments, xlog=False, ylog=False, fig_size=(9,6), max_points=None, decimation='lttb'):
+    """
+    Plots outliers along with their corresponding experiments using matplotlib and seaborn libraries.
+
+    The function accepts a DataFrame containing outlier data and a list of experiment objects.
+    It plots these outliers and the normal data on a 2D graph. Both outlier and normal data points
+    can be visualized with or without error bars along the x and y axes. Logarithmic scaling for both axes
+    and figure size customization are also supported.
+
+    Parameters:
+    -----------
+    outliers_df : pd.DataFrame
+        A DataFrame containing the outlier data points. Should have an 'exp_id' column (or, for older group files,
+        an 'X4_ID' column) which matches the experiments.
+    experiments : list
+        A list of experiment objects to be plotted. Each object should have a 'data' attribute which is a pandas DataFrame.
+    xlog : bool, optional
+        A flag to specify if the x-axis should be logarithmic. Default is False.
+    ylog : bool, optional
+        A flag to specify if the y-axis should be logarithmic. Default is False.
+    fig_size : tuple, optional
+        The dimensions of the figure to be plotted. Default is (9, 6).
+    max_points : int, optional
+        Maximum number of points drawn per experiment; the outliers are always drawn. Default is None (all points).
+    decimation : str, optional
+        Method used to select the drawn points, 'lttb' or 'minmax' (see `decimate`). Default is 'lttb'.
+
+    Returns:
+    --------
+    None :
+        The function does not return anything; it generates and displays the plot.
+
+    Example:
+    --------
+    plot_outliers(outliers_dataframe, [experiment1, experiment2], xlog=True, ylog=False, fig_size=(10,8))
+
+    Notes:
+    ------
+    - The function first identifies the DataFrame columns that are specific to outliers, not present in normal data.
+    - It then groups outliers based on these specific columns before plotting (see `group_outliers`).
+    - Normal data and outliers from the same experiment are plotted together for better visualization.
+    """
+
+    groupby_columns, groups = group_outliers(outliers_df, experiments)
+
+    print('Grouped outliers according to columns: {}'.format(groupby_columns))
+
+    for _, group_outliers_df, group_experiments in groups:
+        plot_outlier_group(group_outliers_df, group_experiments, xlog=xlog, ylog=ylog, fig_size=fig_size,
+                           max_points=max_points, decimation=decimation)
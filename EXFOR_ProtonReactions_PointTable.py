@@ -0,0 +1,282 @@
+"""
+================================================================================
+TITLE: Struct-of-Arrays Point Table for Proton Experiment Data
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script flattens a list of Experiment objects into a single columnar
+    table of data points. Every point of every experiment is stored in flat
+    NumPy arrays (abscissa, value, uncertainty, owning experiment, point index)
+    and experiments are described by offsets into those arrays. Vectorized
+    analyses (interpolation, consensus curves, segmented reductions) can then
+    work on all experiments at once instead of looping over DataFrames.
+
+MAIN FEATURES:
+    - Detection of the abscissa/value/uncertainty columns of each experiment.
+    - Construction of the point table with points sorted by abscissa inside
+      each experiment.
+    - Assignment of a reaction channel code to every experiment.
+    - Helpers to expand per-experiment values to per-point values.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - Experiment (custom class)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_PointTable as pt`
+    2. Build the table: `table = pt.build_point_table(experiments)`
+    3. Use the flat arrays: `table.x`, `table.y`, `table.dy`, `table.offsets`
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+
+
+# Experiment attributes that define a reaction channel. Two experiments belong to the same channel when
+# all these attributes and the names of their abscissa/value columns are equal.
+CHANNEL_ATTRIBUTES = ['target_Z', 'target_A', 'target_state', 'projectile', 'reaction', 'E_inc',
+                      'final_Z', 'final_A', 'final_state', 'MTrat', 'Ratio_isomer', 'quantity',
+                      'frame', 'MF', 'MT']
+
+
+def get_data_columns(data):
+    """
+    Returns the names of the abscissa, value and uncertainty columns of an experiment's data.
+
+    Most EXFORTABLES files store the data as 'E xs dxs dE' (or angle/value variants). Files with a leading
+    'Z' column (e.g. fission yields) carry two extra leading columns, so the relevant columns are shifted
+    by two positions, as done in the IQR outlier detection notebook.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        The 'data' attribute of an Experiment object.
+
+    Returns:
+    --------
+    tuple
+        (x_column, y_column, dy_column). Any of them is None if the data does not have enough columns.
+
+    Example:
+    --------
+    x_col, y_col, dy_col = get_data_columns(experiment.data)
+    """
+    columns = list(data.columns)
+    # Files with a leading 'Z' column have the abscissa and value in the third and fourth columns
+    start = 2 if len(columns) > 0 and columns[0] == 'Z' else 0
+    x_column = columns[start] if len(columns) > start else None
+    y_column = columns[start + 1] if len(columns) > start + 1 else None
+    dy_column = columns[start + 2] if len(columns) > start + 2 else None
+    return x_column, y_column, dy_column
+
+
+def channel_key(experiment):
+    """
+    Builds the reaction channel key of an Experiment object.
+
+    Parameters:
+    -----------
+    experiment : Experiment
+        The experiment whose channel key is computed.
+
+    Returns:
+    --------
+    tuple
+        The values of CHANNEL_ATTRIBUTES followed by the names of the abscissa and value columns.
+    """
+    x_column, y_column, _ = get_data_columns(experiment.data)
+    return tuple(getattr(experiment, attr, None) for attr in CHANNEL_ATTRIBUTES) + (x_column, y_column)
+
+
+class PointTable:
+    """
+    Columnar (struct-of-arrays) representation of the data points of a list of experiments.
+
+    Per-point arrays have one entry per data point, per-experiment arrays have one entry per experiment and
+    per-channel lists have one entry per reaction channel. The points of experiment `i` are stored in the slice
+    `offsets[i]:offsets[i+1]` of the per-point arrays, sorted by increasing abscissa.
+    """
+    def __init__(self):
+        """
+        Initializes an empty PointTable.
+        """
+        # Per-point arrays
+        self.exp_index = np.empty(0, dtype=np.int64)     # Position of the experiment in the source list
+        self.point_index = np.empty(0, dtype=np.int64)   # Row of the point in experiment.data
+        self.x = np.empty(0, dtype=np.float64)           # Abscissa (energy, angle, ...)
+        self.y = np.empty(0, dtype=np.float64)           # Value (cross section, yield, ...)
+        self.dy = np.empty(0, dtype=np.float64)          # Uncertainty of the value (NaN if not given)
+        # Per-experiment arrays
+        self.offsets = np.zeros(1, dtype=np.int64)       # Start of each experiment in the per-point arrays
+        self.channel = np.empty(0, dtype=np.int64)       # Channel code of each experiment
+        self.exp_id = np.empty(0, dtype=np.int64)        # Experiment id (exp_id) of each experiment
+        self.X4_ID = []                                  # EXFOR ID of each experiment
+        self.title = []                                  # File name of each experiment
+        # Per-channel list
+        self.channel_keys = []                           # Channel key (see channel_key) of each channel code
+
+
+    def __len__(self):
+        """
+        Returns the number of data points stored in the table.
+        """
+        return len(self.x)
+
+
+    @property
+    def n_experiments(self):
+        """
+        Number of experiments stored in the table.
+        """
+        return len(self.offsets) - 1
+
+
+    @property
+    def n_channels(self):
+        """
+        Number of reaction channels stored in the table.
+        """
+        return len(self.channel_keys)
+
+
+    @property
+    def counts(self):
+        """
+        Number of points of each experiment.
+        """
+        return np.diff(self.offsets)
+
+
+    def point_channel(self):
+        """
+        Returns the channel code of every data point.
+        """
+        return self.channel[self.exp_index]
+
+
+    def channels_dataframe(self):
+        """
+        Returns a DataFrame describing every channel code (one row per channel).
+        """
+        columns = CHANNEL_ATTRIBUTES + ['x_column', 'y_column']
+        channels = pd.DataFrame(self.channel_keys, columns=columns)
+        channels.index.name = 'channel'
+        return channels
+
+
+    def to_dataframe(self):
+        """
+        Converts the per-point arrays into a DataFrame (one row per data point).
+        """
+        return pd.DataFrame({'exp_index': self.exp_index,
+                             'exp_id': self.exp_id[self.exp_index],
+                             'X4_ID': np.asarray(self.X4_ID, dtype=object)[self.exp_index] if len(self) else [],
+                             'point_index': self.point_index,
+                             'channel': self.point_channel(),
+                             'x': self.x,
+                             'y': self.y,
+                             'dy': self.dy})
+
+
+def build_point_table(experiments):
+    """
+    Flattens a list of Experiment objects into a PointTable.
+
+    The abscissa, value and uncertainty columns of each experiment are detected with `get_data_columns` and
+    converted to float (text-loaded experiments store strings). Points with a missing abscissa or value are
+    dropped. Inside each experiment the points are sorted by increasing abscissa; the original row of every
+    point is kept in `table.point_index`. Experiments without an 'exp_id' use their position in the list.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    table : PointTable
+        The point table. Experiment `i` of the input list is experiment `i` of the table (it may have no points).
+
+    Example:
+    --------
+    table = build_point_table(experiments)
+    """
+    table = PointTable()
+    channel_codes = {}
+
+    x_blocks, y_blocks, dy_blocks, row_blocks = [], [], [], []
+    counts = np.zeros(len(experiments), dtype=np.int64)
+    channels = np.zeros(len(experiments), dtype=np.int64)
+    exp_ids = np.zeros(len(experiments), dtype=np.int64)
+
+    # One pass over the experiments to extract their columns as NumPy arrays
+    for i, experiment in enumerate(experiments):
+        data = experiment.data
+        x_column, y_column, dy_column = get_data_columns(data)
+
+        # Assign a channel code to the experiment
+        key = channel_key(experiment)
+        if key not in channel_codes:
+            channel_codes[key] = len(channel_codes)
+            table.channel_keys.append(key)
+        channels[i] = channel_codes[key]
+        exp_id = getattr(experiment, 'exp_id', None)
+        exp_ids[i] = i if exp_id is None else exp_id
+        table.X4_ID.append(experiment.X4_ID)
+        table.title.append(experiment.title)
+
+        if x_column is None or y_column is None or data.empty:
+            continue
+
+        x = pd.to_numeric(data[x_column], errors='coerce').to_numpy(dtype=np.float64)
+        y = pd.to_numeric(data[y_column], errors='coerce').to_numpy(dtype=np.float64)
+        if dy_column is not None:
+            dy = pd.to_numeric(data[dy_column], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            dy = np.full(len(x), np.nan)
+
+        # Keep only the points with a defined abscissa and value
+        valid = np.isfinite(x) & np.isfinite(y)
+        rows = np.flatnonzero(valid)
+        x_blocks.append(x[valid])
+        y_blocks.append(y[valid])
+        dy_blocks.append(dy[valid])
+        row_blocks.append(rows)
+        counts[i] = len(rows)
+
+    table.channel = channels
+    table.exp_id = exp_ids
+    table.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    if x_blocks:
+        exp_index = np.repeat(np.arange(len(experiments), dtype=np.int64), counts)
+        x = np.concatenate(x_blocks)
+        # Sort the points by abscissa inside each experiment (experiments stay in their original order)
+        order = np.lexsort((x, exp_index))
+        table.exp_index = exp_index[order]
+        table.x = x[order]
+        table.y = np.concatenate(y_blocks)[order]
+        table.dy = np.concatenate(dy_blocks)[order]
+        table.point_index = np.concatenate(row_blocks).astype(np.int64)[order]
+
+    return table
+
+
+def segment_ids(offsets):
+    """
+    Expands segment offsets into the segment id of every element.
+
+    Parameters:
+    -----------
+    offsets : np.ndarray
+        Segment offsets (length n_segments + 1, first element 0).
+
+    Returns:
+    --------
+    np.ndarray
+        Array of length offsets[-1] with the segment id of each element.
+    """
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
@@ -0,0 +1,557 @@
+"""
+================================================================================
+TITLE: Local In-Memory Query Service for the Experiment Database
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script keeps a loaded experiment database in the memory of a single
+    local server process, so that several notebooks on the same machine can
+    query it without each of them reading (and holding) its own copy of the
+    binary file. The server is built on asyncio and listens on a local TCP
+    port or a Unix socket. It answers filter, unique-value, experiment-fetch
+    and point-range queries. Requests and responses are a small JSON header
+    followed by a binary payload of NumPy arrays (`.npz`), so the data points
+    are sent as packed arrays instead of pickled DataFrames. A thin blocking
+    client mirrors `filter_experiments` and `get_unique_values` and rebuilds
+    Experiment objects from the payloads.
+
+MAIN FEATURES:
+    - Database loaded once and kept in memory by the server.
+    - Filter and unique-value queries on the metadata, without touching the data.
+    - Experiment fetch by exp_id, with the data sent as NumPy arrays.
+    - Point-range queries (abscissa range and attribute filters) on a point table.
+    - Blocking client usable from notebooks (no event loop needed).
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - Experiment (custom class)
+    - UtilityFunctions (custom module)
+    - PointTable (custom module)
+
+USAGE:
+    1. Start the server: `python EXFOR_ProtonReactions_QueryService.py EXFOR_ProtonReactions_Database.bin`
+       (add `--socket /tmp/exfor.sock` to listen on a Unix socket instead of 127.0.0.1:8765)
+    2. Connect: `client = QueryClient()` (or `QueryClient(path='/tmp/exfor.sock')`)
+    3. Query: `client.filter_experiments('MT', 5)`, `client.get_unique_values('quantity')`
+    4. Points: `client.get_points(x_min=10, x_max=20, MT=5)`
+================================================================================
+"""
+
+import io
+import json
+import socket
+import struct
+import asyncio
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import Experiment
+from EXFOR_ProtonReactions_UtilityFunctions import read_experiments_from_binary, build_experiment_index
+from EXFOR_ProtonReactions_PointTable import build_point_table
+
+
+# Default address of the service
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Framing of the messages: length of the JSON header (4 bytes) and of the binary payload (8 bytes)
+_HEADER_LENGTH = struct.Struct('!I')
+_PAYLOAD_LENGTH = struct.Struct('!Q')
+
+
+def encode_arrays(arrays):
+    """
+    Packs a dictionary of NumPy arrays into the bytes of an uncompressed `.npz` file.
+    """
+    if not arrays:
+        return b''
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_arrays(payload):
+    """
+    Unpacks the bytes produced by `encode_arrays` into a dictionary of NumPy arrays.
+    """
+    if not payload:
+        return {}
+    with np.load(io.BytesIO(payload), allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+def _json_default(value):
+    """
+    Converts the NumPy scalars found in the experiment attributes into Python values for JSON.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def encode_message(header, payload=b''):
+    """
+    Builds a message: header length, JSON header, payload length and payload.
+    """
+    header = json.dumps(header, default=_json_default).encode('utf-8')
+    return _HEADER_LENGTH.pack(len(header)) + header + _PAYLOAD_LENGTH.pack(len(payload)) + payload
+
+
+def _column_array(series):
+    """
+    Converts a data column into a NumPy array that can be stored without pickle (numbers or unicode strings).
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy()
+    return series.astype(str).to_numpy(dtype=str)
+
+
+def pack_experiments(experiments):
+    """
+    Converts a list of experiments into a JSON-able description and a dictionary of arrays.
+
+    Experiments with the same data columns are packed together: the values of every column are concatenated and
+    the points of the k-th experiment of a group are the slice `offsets[k]:offsets[k+1]`.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects.
+
+    Returns:
+    --------
+    description : dict
+        'attributes' (the attributes of every experiment, except the data) and 'groups' (the data columns and
+        the positions of the experiments of every group).
+    arrays : dict
+        'g<group>/<column>' (concatenated values) and 'g<group>/offsets' arrays.
+    """
+    attributes, groups, arrays = [], {}, {}
+    for position, experiment in enumerate(experiments):
+        attributes.append({name: value for name, value in vars(experiment).items() if name != 'data'})
+        key = tuple(str(column) for column in experiment.data.columns)
+        groups.setdefault(key, []).append(position)
+
+    description = {'attributes': attributes, 'groups': []}
+    for number, (columns, positions) in enumerate(groups.items()):
+        datas = [experiments[position].data for position in positions]
+        offsets = np.zeros(len(datas) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in datas])
+        arrays['g{}/offsets'.format(number)] = offsets
+        for c, column in enumerate(columns):
+            arrays['g{}/{}'.format(number, column)] = np.concatenate([_column_array(data.iloc[:, c]) for data in datas]) \
+                if offsets[-1] else np.empty(0)
+        description['groups'].append({'columns': list(columns), 'positions': positions})
+    return description, arrays
+
+
+def unpack_experiments(description, arrays):
+    """
+    Rebuilds the Experiment objects packed with `pack_experiments`.
+    """
+    experiments = [None] * len(description['attributes'])
+    for number, group in enumerate(description['groups']):
+        offsets = arrays['g{}/offsets'.format(number)]
+        values = [arrays['g{}/{}'.format(number, column)] for column in group['columns']]
+        for k, position in enumerate(group['positions']):
+            experiment = Experiment()
+            for name, value in description['attributes'][position].items():
+                setattr(experiment, name, value)
+            start, stop = offsets[k], offsets[k + 1]
+            experiment.data = pd.DataFrame({column: column_values[start:stop]
+                                            for column, column_values in zip(group['columns'], values)})
+            experiments[position] = experiment
+    return experiments
+
+
+class ExperimentDatabase:
+    """
+    In-memory experiment database answering the queries of the service.
+    """
+    def __init__(self, experiments):
+        """
+        Initializes the database.
+
+        Parameters:
+        -----------
+        experiments : list
+            A list of Experiment objects (e.g. from `read_experiments_from_binary`).
+        """
+        self.experiments = experiments                              # Experiments, in database order
+        self.index = build_experiment_index(experiments)            # exp_id -> Experiment
+        self.metadata = pd.DataFrame([{name: value for name, value in vars(experiment).items() if name != 'data'}
+                                      for experiment in experiments],
+                                     dtype=object)                  # One row per experiment, original values
+        self._point_table = None                                    # Built on the first point-range query
+
+
+    @property
+    def point_table(self):
+        """
+        Point table of the database (see PointTable), built on first use.
+        """
+        if self._point_table is None:
+            self._point_table = build_point_table(self.experiments)
+        return self._point_table
+
+
+    def _check_attribute(self, attribute):
+        """
+        Raises a KeyError with the available attributes if `attribute` is not a metadata column.
+        """
+        if attribute not in self.metadata.columns:
+            raise KeyError('Attribute {} does not exist. Available attributes: {}'.format(
+                attribute, list(self.metadata.columns)))
+
+
+    def _mask(self, filters):
+        """
+        Returns the boolean mask of the experiments whose attributes are equal to the given values (a None value
+        selects the missing ones, as `IS NULL` in the Catalog).
+        """
+        mask = np.ones(len(self.metadata), dtype=bool)
+        for attribute, value in filters.items():
+            self._check_attribute(attribute)
+            column = self.metadata[attribute]
+            if value is None:
+                mask &= column.isna().to_numpy(dtype=bool)
+            else:
+                mask &= (column == value).to_numpy(dtype=bool)
+        return mask
+
+
+    def filter(self, attribute, value):
+        """
+        Returns the positions of the experiments whose `attribute` is equal to `value`.
+        """
+        return np.flatnonzero(self._mask({attribute: value}))
+
+
+    def unique(self, attribute):
+        """
+        Returns the sorted distinct values of `attribute` with their original types, missing values excluded (as
+        the Catalog).
+        """
+        self._check_attribute(attribute)
+        column = self.metadata[attribute]
+        values = list(dict.fromkeys(value.item() if isinstance(value, np.generic) else value
+                                    for value in column[~column.isna()].tolist()))
+        try:
+            return sorted(values)
+        except TypeError:
+            # Values of several types (e.g. numbers and strings) are sorted by their text
+            return sorted(values, key=str)
+
+
+    def fetch(self, exp_ids):
+        """
+        Returns the experiments with the given ids (unknown ids are skipped).
+        """
+        return [self.index[exp_id] for exp_id in exp_ids if 0 <= exp_id < len(self.index) and self.index[exp_id] is not None]
+
+
+    def points(self, x_min=None, x_max=None, filters=None):
+        """
+        Returns the points of the experiments matching `filters` whose abscissa is in [x_min, x_max].
+
+        Returns:
+        --------
+        dict
+            'exp_id', 'point_index', 'x', 'y' and 'dy' arrays (see PointTable).
+        """
+        table = self.point_table
+        point_mask = self._mask(filters or {})[table.exp_index]
+        if x_min is not None:
+            point_mask &= table.x >= x_min
+        if x_max is not None:
+            point_mask &= table.x <= x_max
+        return {'exp_id': table.exp_id[table.exp_index[point_mask]],
+                'point_index': table.point_index[point_mask],
+                'x': table.x[point_mask],
+                'y': table.y[point_mask],
+                'dy': table.dy[point_mask]}
+
+
+    def handle(self, request):
+        """
+        Answers a request. Returns the response header and payload.
+        """
+        query = request.get('query')
+        if query == 'info':
+            return {'status': 'ok', 'experiments': len(self.experiments), 'attributes': list(self.metadata.columns)}, b''
+        if query == 'filter':
+            positions = self.filter(request['attribute'], request['value'])
+            if not request.get('fetch', True):
+                return {'status': 'ok'}, encode_arrays({'exp_id': self.metadata['exp_id'].to_numpy(np.int64)[positions]})
+            description, arrays = pack_experiments([self.experiments[position] for position in positions])
+            return dict(description, status='ok'), encode_arrays(arrays)
+        if query == 'unique':
+            return {'status': 'ok', 'values': self.unique(request['attribute'])}, b''
+        if query == 'fetch':
+            description, arrays = pack_experiments(self.fetch(request['exp_ids']))
+            return dict(description, status='ok'), encode_arrays(arrays)
+        if query == 'points':
+            return {'status': 'ok'}, encode_arrays(self.points(request.get('x_min'), request.get('x_max'),
+                                                               request.get('filters')))
+        raise ValueError('Unknown query {}'.format(query))
+
+
+async def _read_message(reader):
+    """
+    Reads one message from an asyncio stream. Returns (header, payload).
+    """
+    length, = _HEADER_LENGTH.unpack(await reader.readexactly(_HEADER_LENGTH.size))
+    header = json.loads(await reader.readexactly(length))
+    length, = _PAYLOAD_LENGTH.unpack(await reader.readexactly(_PAYLOAD_LENGTH.size))
+    payload = await reader.readexactly(length) if length else b''
+    return header, payload
+
+
+async def start_server(database, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    """
+    Starts the asyncio server of a database.
+
+    Every connection can send any number of requests. The queries only read the database and run in the event
+    loop one at a time, so no locking is needed.
+
+    Parameters:
+    -----------
+    database : ExperimentDatabase
+        The database to serve.
+    host : str, optional
+        Host of the TCP server. Default is '127.0.0.1' (local connections only).
+    port : int, optional
+        Port of the TCP server. Default is 8765.
+    path : str, optional
+        If given, the server listens on this Unix socket instead of TCP.
+
+    Returns:
+    --------
+    asyncio.Server
+        The running server.
+    """
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request, _ = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    header, payload = database.handle(request)
+                except Exception as error:
+                    # str() of a KeyError quotes its message, so the message is taken from its arguments
+                    message = str(error.args[0]) if len(error.args) == 1 else str(error)
+                    header, payload = {'status': 'error', 'error': type(error).__name__, 'message': message}, b''
+                writer.write(encode_message(header, payload))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if path is not None:
+        return await asyncio.start_unix_server(handle_connection, path=path)
+    return await asyncio.start_server(handle_connection, host=host, port=port)
+
+
+def serve(filename, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    """
+    Loads a binary database and serves it until the process is interrupted.
+
+    Parameters:
+    -----------
+    filename : str
+        The binary database (see `write_experiments_to_binary`).
+    host, port, path :
+        Address of the server (see `start_server`).
+    """
+    print('Loading {}...'.format(filename))
+    database = ExperimentDatabase(read_experiments_from_binary(filename))
+
+    async def main():
+        server = await start_server(database, host, port, path)
+        print('Serving {} experiments on {}'.format(len(database.experiments), path or '{}:{}'.format(host, port)))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print('Server stopped')
+
+
+class QueryClient:
+    """
+    Blocking client of the query service, mirroring the query functions of UtilityFunctions.
+
+    Example:
+    --------
+    with QueryClient() as client:
+        experiments = client.filter_experiments('MT', 5)
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, timeout=None):
+        """
+        Connects to the service.
+
+        Parameters:
+        -----------
+        host : str, optional
+            Host of the TCP server. Default is '127.0.0.1'.
+        port : int, optional
+            Port of the TCP server. Default is 8765.
+        path : str, optional
+            Unix socket of the server (instead of TCP).
+        timeout : float, optional
+            Timeout of the socket operations in seconds. Default is None (no timeout).
+        """
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)     # Connection to the server
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.socket.makefile('rb')                                # Buffered reader of the responses
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+        self.stream.close()
+        self.socket.close()
+
+
+    def _read_exactly(self, n):
+        data = self.stream.read(n)
+        if len(data) < n:
+            raise ConnectionError('Connection closed by the server')
+        return data
+
+
+    def request(self, **request):
+        """
+        Sends a request and returns the response header and the decoded arrays.
+
+        Raises:
+        -------
+        KeyError, ValueError, RuntimeError:
+            The error raised by the server while answering the request.
+        """
+        self.socket.sendall(encode_message(request))
+        length, = _HEADER_LENGTH.unpack(self._read_exactly(_HEADER_LENGTH.size))
+        header = json.loads(self._read_exactly(length))
+        length, = _PAYLOAD_LENGTH.unpack(self._read_exactly(_PAYLOAD_LENGTH.size))
+        arrays = decode_arrays(self._read_exactly(length) if length else b'')
+        if header.get('status') != 'ok':
+            error = {'KeyError': KeyError, 'ValueError': ValueError}.get(header.get('error'), RuntimeError)
+            raise error(header.get('message'))
+        return header, arrays
+
+
+    def info(self):
+        """
+        Returns the number of experiments and the attributes of the served database.
+        """
+        header, _ = self.request(query='info')
+        return {'experiments': header['experiments'], 'attributes': header['attributes']}
+
+
+    def filter_experiments(self, attribute, value):
+        """
+        Filters the served experiments by the value of an attribute, as `filter_experiments`.
+
+        Returns:
+        --------
+        filtered_list : list | None
+            The matching Experiment objects. Returns None if the attribute does not exist or no experiments
+            meet the condition.
+        """
+        try:
+            header, arrays = self.request(query='filter', attribute=attribute, value=value)
+        except KeyError as error:
+            print(error.args[0])
+            return None
+        experiments = unpack_experiments(header, arrays)
+        if len(experiments) == 0:
+            print('No experiments with {} = {}\n'.format(attribute, value))
+            print('Available values for {}:'.format(attribute))
+            print(self.get_unique_values(attribute))
+            return None
+        print('{} experiments with {} = {}'.format(len(experiments), attribute, value))
+        return experiments
+
+
+    def filter_ids(self, attribute, value):
+        """
+        Returns the exp_id of the served experiments whose `attribute` is equal to `value`, without their data.
+        """
+        _, arrays = self.request(query='filter', attribute=attribute, value=value, fetch=False)
+        return arrays.get('exp_id', np.empty(0, dtype=np.int64))
+
+
+    def get_unique_values(self, attribute):
+        """
+        Returns the distinct values of an attribute of the served experiments, as `get_unique_values`.
+
+        Returns:
+        --------
+        unique_values : list | None
+            The sorted distinct values (missing values excluded). Returns None if the attribute does not exist.
+        """
+        try:
+            header, _ = self.request(query='unique', attribute=attribute)
+        except KeyError as error:
+            print(error.args[0])
+            return None
+        return header['values']
+
+
+    def fetch_experiments(self, exp_ids):
+        """
+        Returns the served experiments with the given ids (see `build_experiment_index`).
+        """
+        header, arrays = self.request(query='fetch', exp_ids=[int(exp_id) for exp_id in np.atleast_1d(exp_ids)])
+        return unpack_experiments(header, arrays)
+
+
+    def get_points(self, x_min=None, x_max=None, **filters):
+        """
+        Returns the points whose abscissa is in [x_min, x_max], of the experiments matching the filters.
+
+        Parameters:
+        -----------
+        x_min, x_max : float, optional
+            Limits of the abscissa (energy, angle, ...). Default is None (no limit).
+        **filters :
+            Attribute values the experiments must have (e.g. MT=5, quantity='Cross section').
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per point with 'exp_id', 'point_index', 'x', 'y' and 'dy'.
+
+        Example:
+        --------
+        points = client.get_points(x_min=10, x_max=20, target_Z=26, MT=5)
+        """
+        _, arrays = self.request(query='points', x_min=x_min, x_max=x_max, filters=filters)
+        return pd.DataFrame(arrays, columns=['exp_id', 'point_index', 'x', 'y', 'dy'])
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve an EXFOR proton reactions database to local clients.')
+    parser.add_argument('database', help='Binary database written by write_experiments_to_binary.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Host of the TCP server.')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port of the TCP server.')
+    parser.add_argument('--socket', default=None, help='Unix socket to listen on instead of TCP.')
+    args = parser.parse_args()
+    serve(args.database, args.host, args.port, args.socket)
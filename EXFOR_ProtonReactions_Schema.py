@@ -0,0 +1,264 @@
+"""
+================================================================================
+TITLE: Data-Schema Signatures and Registry for Proton Experiments
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script describes the layout of every experiment with a short
+    data-schema signature computed when the file is parsed: the column headers
+    of the data, the uncertainty columns that actually contain values (dxs, dE,
+    ...) and the metadata attributes that are set. A registry maps every
+    signature to the ids of its experiments, so experiments can be grouped by
+    schema (e.g. the classified groups of `classify_experiments_by_data`) with
+    a metadata-only operation, without preparing their data.
+
+MAIN FEATURES:
+    - Signature of an experiment as a plain string ('columns|uncertainties|metadata').
+    - Lazy computation for experiments stored before signatures existed.
+    - Registry from signature to experiment ids, grouping by any part of the signature.
+    - Summary table and JSON persistence of the registry.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - Experiment (custom class)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Schema as sc`
+    2. Build the registry: `registry = sc.build_schema_registry(experiments)`
+    3. Group the experiments: `groups = registry.groups('columns')`, `registry.summary()`
+================================================================================
+"""
+
+import sys
+import json
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import Experiment
+
+
+# Parts of a signature, in order. They are separated by '|' and their items by spaces (EXFORTABLES headers
+# and attribute names never contain spaces)
+SCHEMA_FIELDS = ['columns', 'uncertainties', 'metadata']
+
+# Metadata attributes of an experiment (every attribute of the Experiment class except the data and the ids)
+METADATA_ATTRIBUTES = sorted(name for name in vars(Experiment()) if name not in ('data', 'exp_id', 'schema'))
+
+
+def _is_set(value):
+    """
+    Whether an attribute value is set (None, '' and NaN are not).
+    """
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return value.strip() != ''
+    return value == value
+
+
+def _has_values(column):
+    """
+    Whether a data column contains values. Columns with only NaN or 0 (the padding of the parser) do not.
+    """
+    values = column.to_numpy()
+    if values.dtype.kind != 'f':
+        # Text-loaded experiments store strings
+        values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+    return bool(np.any((values == values) & (values != 0)))
+
+
+def data_schema(experiment):
+    """
+    Computes the data-schema signature of an experiment.
+
+    The uncertainty columns are the columns after the abscissa and the value (dxs and dE in most files, shifted
+    by two positions in files with a leading 'Z' column, as in `get_data_columns`). The metadata are the
+    METADATA_ATTRIBUTES that are set.
+
+    Parameters:
+    -----------
+    experiment : Experiment
+        The experiment.
+
+    Returns:
+    --------
+    str
+        The signature, e.g. 'E xs dxs dE|dxs|MF MT X4_ID ...'. Equal signatures are the same (interned) object.
+    """
+    columns = [str(column) for column in experiment.data.columns]
+    start = 2 if columns[:1] == ['Z'] else 0
+    uncertainties = [column for position, column in enumerate(columns[start + 2:], start=start + 2)
+                     if _has_values(experiment.data.iloc[:, position])]
+    metadata = [name for name in METADATA_ATTRIBUTES if _is_set(getattr(experiment, name, None))]
+    return sys.intern('|'.join([' '.join(columns), ' '.join(uncertainties), ' '.join(metadata)]))
+
+
+def get_schema(experiment):
+    """
+    Returns the signature of an experiment, computing and storing it if the experiment does not have one
+    (e.g. loaded from a database written before signatures existed).
+    """
+    if getattr(experiment, 'schema', None) is None:
+        experiment.schema = data_schema(experiment)
+    return experiment.schema
+
+
+def parse_schema(signature):
+    """
+    Splits a signature into its parts.
+
+    Returns:
+    --------
+    dict
+        'columns', 'uncertainties' and 'metadata' as tuples of names.
+    """
+    return {field: tuple(part.split()) for field, part in zip(SCHEMA_FIELDS, signature.split('|'))}
+
+
+def schema_key(signature, by='columns'):
+    """
+    Returns the part(s) of a signature used to group experiments.
+
+    Parameters:
+    -----------
+    signature : str
+        The signature.
+    by : str or list, optional
+        'signature' (the whole signature), one of SCHEMA_FIELDS or a list of them. Default is 'columns'.
+    """
+    if by == 'signature':
+        return signature
+    fields = [by] if isinstance(by, str) else list(by)
+    unknown = [field for field in fields if field not in SCHEMA_FIELDS]
+    if unknown:
+        raise ValueError("Unknown schema field(s) {}. Use 'signature' or any of {}".format(unknown, SCHEMA_FIELDS))
+    parts = dict(zip(SCHEMA_FIELDS, signature.split('|')))
+    return '|'.join(parts[field] for field in fields)
+
+
+class SchemaRegistry:
+    """
+    Registry from data-schema signature to the ids of the experiments that have it.
+
+    Example:
+    --------
+    registry = build_schema_registry(experiments)
+    for key, exp_ids in registry.groups('columns').items():
+        print(key, len(exp_ids))
+    """
+    def __init__(self):
+        """
+        Initializes an empty registry.
+        """
+        self.signatures = {}            # Signature -> experiment ids, in order of first appearance
+        self.exp_ids = []               # Registered experiment ids, in order of registration
+        self.order = []                 # Signature of every registered experiment
+
+
+    def __len__(self):
+        """
+        Returns the number of registered experiments.
+        """
+        return len(self.exp_ids)
+
+
+    def add(self, exp_id, signature):
+        """
+        Registers an experiment id with its signature.
+        """
+        signature = sys.intern(signature)
+        self.signatures.setdefault(signature, []).append(exp_id)
+        self.exp_ids.append(exp_id)
+        self.order.append(signature)
+
+
+    def register(self, experiment):
+        """
+        Registers an experiment (its 'exp_id' and signature).
+        """
+        self.add(experiment.exp_id, get_schema(experiment))
+
+
+    def groups(self, by='columns'):
+        """
+        Groups the registered experiments by (part of) their signature.
+
+        Parameters:
+        -----------
+        by : str or list, optional
+            See `schema_key`. Default is 'columns', the grouping of `classify_experiments_by_data`.
+
+        Returns:
+        --------
+        dict
+            Group key -> experiment ids. Groups are in order of first appearance and the ids of every group in
+            order of registration.
+        """
+        keys = {signature: schema_key(signature, by) for signature in self.signatures}
+        groups = {}
+        for exp_id, signature in zip(self.exp_ids, self.order):
+            groups.setdefault(keys[signature], []).append(exp_id)
+        return groups
+
+
+    def summary(self, by='signature'):
+        """
+        Returns a DataFrame with one row per group: the parts of the signature that define it, the number of
+        experiments and the first experiment id.
+        """
+        fields = SCHEMA_FIELDS if by == 'signature' else [by] if isinstance(by, str) else list(by)
+        rows = []
+        for key, exp_ids in self.groups(by).items():
+            row = dict(zip(fields, key.split('|')))
+            row.update({'n_experiments': len(exp_ids), 'first_exp_id': exp_ids[0]})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+    def save(self, filename):
+        """
+        Saves the registry to a JSON file.
+        """
+        signatures = list(self.signatures)
+        positions = {signature: position for position, signature in enumerate(signatures)}
+        with open(filename, 'w') as f:
+            json.dump({'signatures': signatures,
+                       'experiments': [[exp_id, positions[signature]]
+                                       for exp_id, signature in zip(self.exp_ids, self.order)]}, f)
+
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Loads a registry saved with `save`.
+        """
+        with open(filename, 'r') as f:
+            content = json.load(f)
+        registry = cls()
+        for exp_id, position in content['experiments']:
+            registry.add(exp_id, content['signatures'][position])
+        return registry
+
+
+def build_schema_registry(experiments):
+    """
+    Builds the schema registry of a list of experiments.
+
+    Only the stored signatures are read (see `get_schema` for experiments without one), so this does not touch
+    the data of parsed experiments.
+
+    Parameters:
+    -----------
+    experiments : list
+        A list of Experiment objects with an 'exp_id'.
+
+    Returns:
+    --------
+    SchemaRegistry
+        The registry, with the experiments in the order of the list.
+    """
+    registry = SchemaRegistry()
+    for experiment in experiments:
+        registry.register(experiment)
+    return registry
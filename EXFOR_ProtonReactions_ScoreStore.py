@@ -0,0 +1,434 @@
+"""
+================================================================================
+TITLE: Columnar Outlier Score Store and Ensemble Voting
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script keeps the results of every outlier detection method in a
+    persistent, columnar store on disk. Points are identified by a stable key
+    (experiment id plus point index) and every detector writes two columns: its
+    raw score and its verdict. Methods can then be compared or combined with
+    vectorized ensemble functions (majority or weighted voting and rank
+    aggregation) without running any detector again.
+
+MAIN FEATURES:
+    - Directory store with one .npy file per column and a JSON manifest.
+    - Crash-safe writes: every write stages a new generation of the columns and
+      commits it by replacing the manifest, so the store is never left with
+      columns of different lengths.
+    - Alignment of the points of each detector run on the sorted key column.
+    - Memory-mapped reading of the stored columns.
+    - Majority / weighted voting and rank aggregation over all points.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_ScoreStore as ss`
+    2. Open a store: `store = ss.ScoreStore('EXFOR_ProtonReactions_Scores')`
+    3. Write a method: `store.write_dataframe('svm', df, scores, is_outlier, higher_is_outlier=False)`
+    4. Combine methods: `votes = store.majority_vote()`
+================================================================================
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import pandas as pd
+import numpy as np
+
+
+# Verdict codes stored in the '<method>.outlier.npy' columns
+NOT_SCORED = -1
+INLIER = 0
+OUTLIER = 1
+
+
+def combine_keys(exp_id, point_index):
+    """
+    Packs (experiment id, point index) pairs into single int64 keys (experiment id in the high 32 bits).
+    """
+    return (np.asarray(exp_id, dtype=np.int64) << 32) | np.asarray(point_index, dtype=np.int64)
+
+
+def split_keys(keys):
+    """
+    Unpacks int64 keys into (experiment id, point index) arrays.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+def point_keys(df):
+    """
+    Returns the (experiment id, point index) of every row of a classified group.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        A classified group (or an `outliers_df` built from it) with 'exp_id' and 'point_index' columns.
+
+    Returns:
+    --------
+    tuple
+        (exp_id, point_index) arrays.
+
+    Raises:
+    -------
+    ValueError:
+        If the 'exp_id' or 'point_index' column is missing (group files written before the ids were added must
+        be regenerated: keys made up from the row order would not be stable).
+    """
+    missing = [col for col in ('exp_id', 'point_index') if col not in df.columns]
+    if missing:
+        raise ValueError('Missing point id column(s) {}: regenerate the classified group from experiments with '
+                         'exp_id and point_index'.format(', '.join(missing)))
+    return df['exp_id'].to_numpy(dtype=np.int64), df['point_index'].to_numpy(dtype=np.int64)
+
+
+class ScoreStore:
+    """
+    Persistent columnar store of per-point outlier scores and verdicts.
+
+    The store is a directory holding 'manifest.json' (description of the methods and current generation) and
+    the columns of the current generation in 'generation-<n>/': 'keys.npy' (sorted int64 point keys), one
+    '<method>.score.npy' (float64, NaN if the method did not score the point) and one '<method>.outlier.npy'
+    (int8 verdict: 1 outlier, 0 inlier, -1 not scored) per method.
+
+    Every change writes a new generation (unchanged columns are hard-linked, or copied) and then atomically
+    replaces the manifest, so an interrupted write leaves the previous generation in use.
+    """
+    def __init__(self, path):
+        """
+        Opens the store at `path`, creating the directory if it does not exist.
+
+        Parameters:
+        -----------
+        path : str
+            Directory of the store.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'n_points': 0, 'generation': 0, 'methods': {}}
+
+
+    def __len__(self):
+        """
+        Returns the number of points in the store.
+        """
+        return self.manifest['n_points']
+
+
+    @property
+    def methods(self):
+        """
+        Names of the methods stored.
+        """
+        return list(self.manifest['methods'].keys())
+
+
+    def _generation_path(self, generation):
+        """
+        Directory of the columns of a generation.
+        """
+        return os.path.join(self.path, 'generation-{}'.format(generation))
+
+
+    def _column_path(self, name, generation=None):
+        """
+        Path of the .npy file of a column (of the current generation by default).
+        """
+        generation = self.manifest['generation'] if generation is None else generation
+        return os.path.join(self._generation_path(generation), name + '.npy')
+
+
+    def _save_manifest(self, manifest):
+        """
+        Atomically writes a manifest to disk.
+        """
+        temp_path = os.path.join(self.path, 'manifest.json.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, os.path.join(self.path, 'manifest.json'))
+
+
+    def _commit(self, manifest, columns):
+        """
+        Writes a new generation with the columns given (name -> array) and the unchanged columns of the current
+        generation that `manifest` still uses, then makes it current by replacing the manifest.
+        """
+        generation = self.manifest['generation'] + 1
+        staging = self._generation_path(generation)
+        # Left over by an interrupted write
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        names = ['keys'] if manifest['n_points'] else []
+        for method in manifest['methods']:
+            names += self._column_names(method)
+        for name in names:
+            target = self._column_path(name, generation)
+            if name in columns:
+                with open(target, 'wb') as f:
+                    np.save(f, columns[name])
+            else:
+                try:
+                    os.link(self._column_path(name), target)
+                except OSError:
+                    shutil.copyfile(self._column_path(name), target)
+
+        manifest['generation'] = generation
+        self._save_manifest(manifest)
+        self.manifest = manifest
+
+        # Previous generations (open memory maps keep their data until they are closed)
+        for entry in os.listdir(self.path):
+            if entry.startswith('generation-') and entry != os.path.basename(staging):
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+
+    def _load(self, name, mmap=True):
+        """
+        Loads a column (memory-mapped by default).
+        """
+        return np.load(self._column_path(name), mmap_mode='r' if mmap else None)
+
+
+    def keys(self):
+        """
+        Returns the sorted int64 keys of the points in the store.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64)
+        return self._load('keys')
+
+
+    def _column_names(self, method):
+        """
+        Names of the score and verdict columns of a method.
+        """
+        if not re.fullmatch(r'[A-Za-z0-9_\-]+', method):
+            raise ValueError('Invalid method name {!r}: use letters, digits, "_" or "-"'.format(method))
+        return method + '.score', method + '.outlier'
+
+
+    def _extend_keys(self, new_keys, skip=None):
+        """
+        Extends the key column with new keys. Returns the extended keys and a dictionary with the new key
+        column and the existing columns (except those of method `skip`) re-aligned on it, empty if no key was
+        added.
+        """
+        old_keys = np.asarray(self.keys())
+        all_keys = np.union1d(old_keys, new_keys)
+        if len(all_keys) == len(old_keys):
+            return old_keys, {}
+
+        # Position of the old points in the extended key column
+        position = np.searchsorted(all_keys, old_keys)
+        columns = {'keys': all_keys}
+        for method in self.methods:
+            if method == skip:
+                continue
+            score_name, outlier_name = self._column_names(method)
+            columns[score_name] = np.full(len(all_keys), np.nan)
+            columns[score_name][position] = self._load(score_name)
+            columns[outlier_name] = np.full(len(all_keys), NOT_SCORED, dtype=np.int8)
+            columns[outlier_name][position] = self._load(outlier_name)
+        return all_keys, columns
+
+
+    def write(self, method, exp_id, point_index, scores, is_outlier, higher_is_outlier=True, params=None):
+        """
+        Writes (or overwrites) the score and verdict columns of a method.
+
+        Parameters:
+        -----------
+        method : str
+            Name of the method (letters, digits, '_' or '-'), e.g. 'svm' or 'iqr'.
+        exp_id : np.ndarray
+            Experiment id of every scored point.
+        point_index : np.ndarray
+            Point index of every scored point.
+        scores : np.ndarray
+            Raw score of every point (NaN if the method has no score).
+        is_outlier : np.ndarray
+            Boolean verdict of every point.
+        higher_is_outlier : bool, optional
+            Whether higher scores are more anomalous (True for reconstruction errors, False for
+            `decision_function` of scikit-learn detectors). Default is True.
+        params : dict, optional
+            JSON-serializable parameters of the run, kept in the manifest.
+
+        Example:
+        --------
+        store.write('svm', exp_id, point_index, ocsvm.decision_function(X), pred == -1, higher_is_outlier=False)
+        """
+        score_name, outlier_name = self._column_names(method)
+        new_keys = combine_keys(exp_id, point_index)
+        if len(np.unique(new_keys)) != len(new_keys):
+            raise ValueError('Duplicated point keys in the results of method {}'.format(method))
+
+        all_keys, columns = self._extend_keys(new_keys, skip=method)
+        position = np.searchsorted(all_keys, new_keys)
+
+        columns[score_name] = np.full(len(all_keys), np.nan)
+        columns[score_name][position] = np.asarray(scores, dtype=np.float64)
+        columns[outlier_name] = np.full(len(all_keys), NOT_SCORED, dtype=np.int8)
+        columns[outlier_name][position] = np.where(np.asarray(is_outlier, dtype=bool), OUTLIER, INLIER)
+
+        methods = dict(self.manifest['methods'])
+        methods[method] = {'higher_is_outlier': bool(higher_is_outlier),
+                           'n_scored': int(len(new_keys)),
+                           'n_outliers': int(np.count_nonzero(is_outlier)),
+                           'written': time.strftime('%Y-%m-%d %H:%M:%S'),
+                           'params': params if params is not None else {}}
+        self._commit(dict(self.manifest, n_points=len(all_keys), methods=methods), columns)
+
+
+    def write_dataframe(self, method, df, scores, is_outlier, higher_is_outlier=True, params=None):
+        """
+        Writes the results of a detector run on a classified group, taking the point keys from `df`.
+
+        See `write` for the parameters and `point_keys` for how the keys are obtained.
+        """
+        exp_id, point_index = point_keys(df)
+        self.write(method, exp_id, point_index, scores, is_outlier, higher_is_outlier, params)
+
+
+    def remove(self, method):
+        """
+        Removes the columns of a method from the store.
+        """
+        methods = {name: entry for name, entry in self.manifest['methods'].items() if name != method}
+        self._commit(dict(self.manifest, methods=methods), {})
+
+
+    def scores(self, methods=None):
+        """
+        Returns the raw scores as an (n_points x n_methods) array (NaN where a method did not score a point).
+        """
+        methods = self.methods if methods is None else list(methods)
+        if not methods:
+            return np.empty((len(self), 0))
+        return np.column_stack([self._load(self._column_names(m)[0]) for m in methods])
+
+
+    def verdicts(self, methods=None):
+        """
+        Returns the verdicts as an (n_points x n_methods) int8 array (1 outlier, 0 inlier, -1 not scored).
+        """
+        methods = self.methods if methods is None else list(methods)
+        if not methods:
+            return np.empty((len(self), 0), dtype=np.int8)
+        return np.column_stack([self._load(self._column_names(m)[1]) for m in methods])
+
+
+    def to_dataframe(self, methods=None):
+        """
+        Returns the store as a DataFrame with 'exp_id', 'point_index' and the score/verdict columns.
+        """
+        methods = self.methods if methods is None else list(methods)
+        exp_id, point_index = split_keys(self.keys())
+        df = pd.DataFrame({'exp_id': exp_id, 'point_index': point_index})
+        for method, score, verdict in zip(methods, self.scores(methods).T, self.verdicts(methods).T):
+            df[method + '_score'] = score
+            df[method + '_outlier'] = verdict
+        return df
+
+
+    def majority_vote(self, methods=None, weights=None, threshold=0.5):
+        """
+        Combines the verdicts of several methods by (weighted) majority voting.
+
+        Only the methods that scored a point take part in its vote.
+
+        Parameters:
+        -----------
+        methods : list, optional
+            Methods taking part in the vote. Default is all the methods in the store.
+        weights : dict | list, optional
+            Weight of every method. Default is 1 for all of them.
+        threshold : float, optional
+            Minimum (weighted) fraction of outlier votes to flag a point. Default is 0.5 (strict majority
+            is obtained with a value slightly above 0.5).
+
+        Returns:
+        --------
+        pd.DataFrame
+            'exp_id', 'point_index', 'n_votes' (methods that scored the point), 'outlier_fraction' and
+            'is_outlier' for every point of the store.
+
+        Example:
+        --------
+        votes = store.majority_vote(weights={'svm': 1, 'lof': 1, 'autoencoder': 2})
+        """
+        methods = self.methods if methods is None else list(methods)
+        if isinstance(weights, dict):
+            weights = [weights.get(method, 1.0) for method in methods]
+        weights = np.ones(len(methods)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        verdicts = self.verdicts(methods)
+        scored = verdicts != NOT_SCORED
+        total_weight = (scored * weights).sum(axis=1)
+        outlier_weight = ((verdicts == OUTLIER) * weights).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(total_weight > 0, outlier_weight / total_weight, np.nan)
+
+        exp_id, point_index = split_keys(self.keys())
+        return pd.DataFrame({'exp_id': exp_id, 'point_index': point_index,
+                             'n_votes': scored.sum(axis=1),
+                             'outlier_fraction': fraction,
+                             'is_outlier': fraction >= threshold})
+
+
+    def rank_aggregate(self, methods=None, weights=None):
+        """
+        Combines the raw scores of several methods by averaging their normalized ranks.
+
+        The scores of every method are oriented so that higher means more anomalous and converted to ranks in
+        (0, 1] among the points scored by that method. The aggregated score of a point is the (weighted) mean
+        rank over the methods that scored it, so methods with different score scales can be combined.
+
+        Parameters:
+        -----------
+        methods : list, optional
+            Methods to aggregate. Default is all the methods in the store.
+        weights : dict | list, optional
+            Weight of every method. Default is 1 for all of them.
+
+        Returns:
+        --------
+        pd.DataFrame
+            'exp_id', 'point_index', 'n_scores' and 'aggregated_rank' (1 is the most anomalous) for every point,
+            sorted by decreasing aggregated rank.
+        """
+        methods = self.methods if methods is None else list(methods)
+        if isinstance(weights, dict):
+            weights = [weights.get(method, 1.0) for method in methods]
+        weights = np.ones(len(methods)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        scores = pd.DataFrame(self.scores(methods), columns=methods)
+        for method in methods:
+            if not self.manifest['methods'][method]['higher_is_outlier']:
+                scores[method] = -scores[method]
+        # Normalized ranks (NaN scores stay NaN)
+        ranks = scores.rank(pct=True).to_numpy()
+        scored = ~np.isnan(ranks)
+        total_weight = (scored * weights).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aggregated = np.where(total_weight > 0, np.nansum(ranks * weights, axis=1) / total_weight, np.nan)
+
+        exp_id, point_index = split_keys(self.keys())
+        result = pd.DataFrame({'exp_id': exp_id, 'point_index': point_index,
+                               'n_scores': scored.sum(axis=1),
+                               'aggregated_rank': aggregated})
+        return result.sort_values('aggregated_rank', ascending=False, kind='stable').reset_index(drop=True)
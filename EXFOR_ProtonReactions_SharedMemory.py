@@ -0,0 +1,356 @@
+"""
+================================================================================
+TITLE: Shared-Memory Experiment Database for Worker Processes
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script publishes a loaded experiment database into a shared memory
+    segment so that the worker processes of a pool (outlier detection, plot
+    export, ...) can read it without unpickling their own copy of the
+    experiment list or receiving pickled slices of it. The data points of all
+    experiments are stored column by column in flat float64 arrays with
+    per-experiment offsets, and the metadata (the Experiment attributes) as
+    one array per attribute. Workers attach to the segment by name and get
+    read-only NumPy views of the arrays, without any copy. The process that
+    publishes the database owns the segment and removes it when it is closed.
+    The data arrays are positional: slot j holds the j-th column of every
+    experiment and the column names of each experiment are kept in its
+    'data_columns' header, so the segment grows with the widest experiment
+    and not with the number of distinct column names.
+
+MAIN FEATURES:
+    - Single shared memory segment with every array and a small picklable handle.
+    - Zero-copy, read-only NumPy views in the attached processes.
+    - Rebuilding of the data (or the whole Experiment) of any experiment on demand.
+    - Metadata filters on the shared arrays.
+    - Deterministic cleanup: context manager for the owner and the attached views,
+      plus a finalizer if the owner forgets to close it.
+    - Pool initializer to attach once per worker process.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - Experiment (custom class)
+
+USAGE:
+    1. Publish: `with SharedDatabase(experiments) as shared:`
+    2. Start the pool: `ProcessPoolExecutor(initializer=init_worker, initargs=(shared.handle,))`
+    3. In the worker: `db = get_worker_database()`, then `db.data(i)`, `db.column('xs')`, `db.filter('MT', 5)`
+================================================================================
+"""
+
+import os
+import weakref
+from multiprocessing import shared_memory, resource_tracker
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import Experiment
+
+
+# Alignment of the arrays in the segment (bytes)
+_ALIGNMENT = 64
+
+# Database attached by init_worker in a worker process
+_WORKER_DATABASE = None
+
+
+def _metadata_array(values):
+    """
+    Converts the values of an attribute into an array that can be stored in shared memory.
+
+    Integer attributes are stored as int64, numeric attributes with missing values as float64 (None becomes NaN)
+    and any other attribute as a fixed-width unicode array (None becomes '').
+    """
+    present = [value for value in values if value is not None]
+    numeric = all(isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+                  for value in present)
+    if numeric and present:
+        if len(present) == len(values) and all(isinstance(value, (int, np.integer)) for value in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(['' if value is None else str(value) for value in values], dtype=str)
+
+
+def _data_arrays(experiments):
+    """
+    Builds the offsets and one float64 array per column position: 'data/j' holds the j-th column of every
+    experiment (NaN for experiments with fewer columns). The names are stored in 'meta/data_columns'.
+    """
+    offsets = np.zeros(len(experiments) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(experiment.data) for experiment in experiments])
+
+    width = max((len(experiment.data.columns) for experiment in experiments), default=0)
+    arrays = {'offsets': offsets}
+    for slot in range(width):
+        arrays['data/{}'.format(slot)] = np.full(offsets[-1], np.nan)
+    for i, experiment in enumerate(experiments):
+        for slot, column in enumerate(experiment.data.columns):
+            # Text-loaded experiments store strings
+            arrays['data/{}'.format(slot)][offsets[i]:offsets[i + 1]] = pd.to_numeric(experiment.data[column],
+                                                                                       errors='coerce')
+    arrays['meta/data_columns'] = np.array([' '.join(str(column) for column in experiment.data.columns)
+                                            for experiment in experiments], dtype=str)
+    return arrays
+
+
+def _layout(arrays):
+    """
+    Computes the position of every array in the segment. Returns (manifest, size in bytes).
+    """
+    manifest, size = {}, 0
+    for name, array in arrays.items():
+        size = -(-size // _ALIGNMENT) * _ALIGNMENT
+        manifest[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': size}
+        size += array.nbytes
+    return manifest, max(size, 1)
+
+
+def _views(shm, manifest):
+    """
+    Creates read-only NumPy views of the arrays stored in a segment.
+    """
+    views = {}
+    for name, entry in manifest.items():
+        view = np.ndarray(entry['shape'], dtype=np.dtype(entry['dtype']), buffer=shm.buf, offset=entry['offset'])
+        view.flags.writeable = False
+        views[name] = view
+    return views
+
+
+def _release(shm, unlink):
+    """
+    Closes (and optionally removes) a segment. Used by the finalizers.
+    """
+    try:
+        shm.close()
+    except BufferError:
+        # Some views are still referenced: the mapping is released when they are garbage collected
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedDatabaseView:
+    """
+    Read-only view of a database published with SharedDatabase.
+
+    The arrays are NumPy views of the shared segment: they must not be used after `close` (copy them first if
+    they are needed later).
+    """
+    def __init__(self, shm, manifest, owner=False):
+        """
+        Initializes the view. Use `SharedDatabase` (owner) or `attach_shared_database` (other processes).
+        """
+        self.name = shm.name                                        # Name of the segment
+        self.arrays = _views(shm, manifest)                         # Array name -> read-only view
+        self.offsets = self.arrays['offsets']                       # Start of each experiment in the data arrays
+        self.headers = [str(header).split() for header in self.arrays['meta/data_columns']]   # Columns of each experiment
+        self.data_columns = list(dict.fromkeys(column for header in self.headers for column in header))   # Column names
+        self.attributes = [name[5:] for name in manifest if name.startswith('meta/')]     # Metadata attributes
+        self._shm = shm                                             # Shared memory segment
+        self._owner = owner                                         # Whether closing removes the segment
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def __len__(self):
+        """
+        Returns the number of experiments.
+        """
+        return len(self.offsets) - 1
+
+
+    def close(self):
+        """
+        Releases the views and detaches from the segment (and removes it if this is the owner's view).
+        """
+        if self._shm is None:
+            return
+        self.arrays, self.offsets, self.headers = {}, None, []
+        _release(self._shm, self._owner)
+        self._shm = None
+
+
+    def column(self, name):
+        """
+        Returns the values of a data column for every point of the database (NaN for experiments without it).
+
+        The column sits at a different position in each experiment, so the result is a new array gathered from
+        the positional slots and not a view of the segment.
+        """
+        if name not in self.data_columns:
+            raise KeyError(name)
+        values = np.full(self.offsets[-1], np.nan)
+        for i, header in enumerate(self.headers):
+            if name in header:
+                start, stop = self.offsets[i], self.offsets[i + 1]
+                values[start:stop] = self.arrays['data/{}'.format(header.index(name))][start:stop]
+        return values
+
+
+    def metadata(self, attribute):
+        """
+        Returns the values of an attribute for every experiment.
+        """
+        return self.arrays['meta/' + attribute]
+
+
+    def metadata_dataframe(self):
+        """
+        Returns the metadata of every experiment as a DataFrame (one row per experiment).
+        """
+        return pd.DataFrame({attribute: self.metadata(attribute) for attribute in self.attributes})
+
+
+    def filter(self, attribute, value):
+        """
+        Returns the positions of the experiments whose `attribute` is equal to `value`.
+        """
+        return np.flatnonzero(self.metadata(attribute) == value)
+
+
+    def data(self, i):
+        """
+        Returns the data of the i-th experiment as a DataFrame with its original columns.
+        """
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return pd.DataFrame({column: self.arrays['data/{}'.format(slot)][start:stop]
+                             for slot, column in enumerate(self.headers[i])})
+
+
+    def experiment(self, i):
+        """
+        Rebuilds the i-th experiment as an Experiment object (missing attributes are None).
+        """
+        experiment = Experiment()
+        for attribute in self.attributes:
+            if attribute == 'data_columns':
+                continue
+            value = self.metadata(attribute)[i]
+            if isinstance(value, np.floating) and np.isnan(value) or isinstance(value, np.str_) and value == '':
+                value = None
+            setattr(experiment, attribute, value.item() if isinstance(value, np.generic) else value)
+        experiment.data = self.data(i)
+        return experiment
+
+
+class SharedDatabase:
+    """
+    Publishes a list of experiments into a shared memory segment owned by this process.
+
+    Example:
+    --------
+    with SharedDatabase(experiments) as shared:
+        with ProcessPoolExecutor(initializer=init_worker, initargs=(shared.handle,)) as executor:
+            results = list(executor.map(work, range(len(shared.view))))
+    """
+    def __init__(self, experiments, name=None):
+        """
+        Copies the data points and the metadata of the experiments into a new shared memory segment.
+
+        Parameters:
+        -----------
+        experiments : list
+            A list of Experiment objects.
+        name : str, optional
+            Name of the segment. Default is None (a random name).
+        """
+        arrays = _data_arrays(experiments)
+        attributes = {}
+        for experiment in experiments:
+            for attribute in vars(experiment):
+                if attribute != 'data':
+                    attributes.setdefault(attribute, None)
+        for attribute in attributes:
+            arrays['meta/' + attribute] = _metadata_array([getattr(experiment, attribute, None)
+                                                           for experiment in experiments])
+
+        manifest, size = _layout(arrays)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        for array_name, entry in manifest.items():
+            target = np.ndarray(entry['shape'], dtype=np.dtype(entry['dtype']), buffer=shm.buf, offset=entry['offset'])
+            target[...] = arrays[array_name]
+            del target
+
+        self.handle = {'name': shm.name, 'manifest': manifest, 'owner_pid': os.getpid()}   # Passed to the workers
+        self.size = size                                                    # Size of the segment (bytes)
+        self.view = SharedDatabaseView(shm, manifest, owner=True)          # Views of the owner process
+        # Remove the segment even if close is never called
+        self._finalizer = weakref.finalize(self, _release, shm, True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        """
+        Removes the segment. Attached processes keep their mapping until they close it.
+        """
+        self.view.close()
+        self._finalizer.detach()
+
+
+def attach_shared_database(handle):
+    """
+    Attaches to a database published with SharedDatabase.
+
+    On Python < 3.13, attaching registers the segment with the resource tracker of the process, which removes it
+    (and warns about a leak) when that tracker exits. Processes started with multiprocessing by the owner (pool
+    workers) inherit the owner's tracker, so their registration is harmless. Any other process (an unrelated
+    script, or a plain subprocess of the owner, which starts its own tracker) unregisters the segment so that only
+    the owner removes it.
+
+    Parameters:
+    -----------
+    handle : dict
+        The `handle` attribute of the SharedDatabase.
+
+    Returns:
+    --------
+    SharedDatabaseView
+        Read-only views of the database. Close it (or use it as a context manager) when done.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=handle['name'], track=False)
+    except TypeError:
+        # Whether this process already talks to a tracker (the owner and its multiprocessing children do)
+        inherited = getattr(resource_tracker._resource_tracker, '_fd', None) is not None \
+            and handle['owner_pid'] in (os.getpid(), os.getppid())
+        shm = shared_memory.SharedMemory(name=handle['name'])
+        if not inherited:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+    view = SharedDatabaseView(shm, handle['manifest'])
+    weakref.finalize(view, _release, shm, False)
+    return view
+
+
+def init_worker(handle):
+    """
+    Pool initializer: attaches the worker process to a shared database (see `get_worker_database`).
+    """
+    global _WORKER_DATABASE
+    _WORKER_DATABASE = attach_shared_database(handle)
+
+
+def get_worker_database():
+    """
+    Returns the database attached by `init_worker` in this worker process.
+    """
+    if _WORKER_DATABASE is None:
+        raise RuntimeError('No shared database attached. Use init_worker as the initializer of the pool')
+    return _WORKER_DATABASE
@@ -0,0 +1,483 @@
+"""
+================================================================================
+TITLE: Streaming Batches and Incremental Scoring for the Autoencoder Method
+AUTHOR: EXFOR-ProtonReactions-Analysis contributors
+DATE: 18-10-2026
+
+DESCRIPTION:
+    This script feeds a classified group to the autoencoder in fixed-size
+    batches read straight from the on-disk group CSV file(s), instead of
+    loading, cleaning and scaling the whole group in memory. A first scan of
+    the files reproduces `clean_dataframe` (dropped uncertainty and constant
+    columns) and collects the min/max statistics of the MinMaxScaler. Training
+    and scoring then stream batches, and the reconstruction error threshold is
+    obtained from a streaming quantile sketch, so the peak memory depends on
+    the batch and chunk sizes and not on the size of the group.
+
+MAIN FEATURES:
+    - GroupBatchSource: chunked CSV reader with streaming cleaning and min/max scaling.
+    - Deterministic train/validation split computed per row, without shuffling the files.
+    - Endless batch generators for Keras `fit` (with `steps_per_epoch`).
+    - StreamingQuantile: mergeable log-bucket quantile sketch with bounded relative error.
+    - Streaming reconstruction errors, percentile threshold and extraction of the outliers.
+
+DEPENDENCIES:
+    - pandas
+    - numpy
+    - tensorflow/keras (only for the model passed by the user)
+    - ScoreStore (custom module)
+
+USAGE:
+    1. Import the script: `import EXFOR_ProtonReactions_Streaming as st`
+    2. Create the source: `source = st.GroupBatchSource('EXFOR_ProtonReactions_Classified_Group_1.csv')`
+    3. Train: `st.train_autoencoder(autoencoder, source, epochs=50)`
+    4. Detect: `outliers_df, threshold = st.detect_outliers_streaming(autoencoder, source, percentile=99.0)`
+================================================================================
+"""
+
+import os
+import tempfile
+import pandas as pd
+import numpy as np
+from EXFOR_ProtonReactions_Experiment_Class import ID_COLUMNS
+from EXFOR_ProtonReactions_ScoreStore import point_keys
+
+
+# Multiplier used to spread the row numbers in [0, 1) for the train/validation split
+_SPLIT_MULTIPLIER = 0.6180339887498949
+
+
+class StreamingQuantile:
+    """
+    Streaming quantile sketch for non-negative values with a bounded relative error.
+
+    Values are counted in logarithmic buckets of ratio gamma = (1 + alpha) / (1 - alpha), so any quantile is
+    returned with a relative error below `alpha`. Updates are vectorized with `np.bincount` and the memory
+    depends only on the dynamic range of the values, not on their number. Two sketches with the same
+    `relative_accuracy` can be merged.
+    """
+    def __init__(self, relative_accuracy=0.001):
+        """
+        Initializes an empty sketch.
+
+        Parameters:
+        -----------
+        relative_accuracy : float, optional
+            Maximum relative error of the returned quantiles. Default is 0.001.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.counts = np.zeros(0, dtype=np.int64)   # Counts of the positive buckets
+        self.min_index = 0                          # Bucket index of counts[0]
+        self.zero_count = 0                         # Number of values equal to zero
+        self.count = 0                              # Total number of values
+
+
+    def update(self, values):
+        """
+        Adds an array of values (NaN values are ignored, negative values are treated as zero).
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        if len(positive) == 0:
+            return
+
+        index = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+        self._add_counts(int(index.min()), np.bincount(index - index.min()))
+
+
+    def _add_counts(self, min_index, counts):
+        """
+        Adds bucket counts starting at bucket `min_index`, growing the bucket array if needed.
+        """
+        if len(self.counts) == 0:
+            self.counts = counts.astype(np.int64)
+            self.min_index = min_index
+            return
+        new_min = min(self.min_index, min_index)
+        new_max = max(self.min_index + len(self.counts), min_index + len(counts))
+        if new_min != self.min_index or new_max != self.min_index + len(self.counts):
+            grown = np.zeros(new_max - new_min, dtype=np.int64)
+            grown[self.min_index - new_min:self.min_index - new_min + len(self.counts)] = self.counts
+            self.counts = grown
+            self.min_index = new_min
+        self.counts[min_index - self.min_index:min_index - self.min_index + len(counts)] += counts
+
+
+    def merge(self, other):
+        """
+        Merges another sketch with the same relative accuracy into this one.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches with different relative accuracy')
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(other.counts):
+            self._add_counts(other.min_index, other.counts)
+
+
+    def quantile(self, q):
+        """
+        Returns the estimated q-quantile (0 <= q <= 1), or NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = self.zero_count + np.cumsum(self.counts)
+        bucket = int(np.searchsorted(cumulative, rank, side='right'))
+        bucket = min(bucket, len(self.counts) - 1)
+        # Representative value of the bucket (gamma^(i-1), gamma^i]
+        return 2 * self.gamma**(self.min_index + bucket) / (self.gamma + 1)
+
+
+    def percentile(self, p):
+        """
+        Returns the estimated p-th percentile (0 <= p <= 100), like `np.percentile`.
+        """
+        return self.quantile(p / 100.0)
+
+
+class GroupBatchSource:
+    """
+    Reads a classified group from its CSV file(s) in chunks and serves scaled, fixed-size feature batches.
+
+    The constructor scans the files once to find the feature columns (as `clean_dataframe` would keep them) and
+    the min/max of every feature over the training rows. Several files (e.g. Group_4_1 and Group_4_2) are read
+    one after another as a single partitioned group.
+    """
+    def __init__(self, paths, batch_size=256, uncertainties=False, validation_fraction=0.2, seed=0,
+                 chunk_rows=100000, dtype=np.float32):
+        """
+        Initializes the source and scans the files.
+
+        Parameters:
+        -----------
+        paths : str | list
+            Path of the group CSV file, or list of paths of its partitions.
+        batch_size : int, optional
+            Number of rows per batch. Default is 256.
+        uncertainties : bool, optional
+            Whether to keep the columns starting with 'd' (see `clean_dataframe`). Default is False.
+        validation_fraction : float, optional
+            Fraction of rows assigned to the validation split. Default is 0.2.
+        seed : int, optional
+            Seed of the train/validation split and of the batch shuffling. Default is 0.
+        chunk_rows : int, optional
+            Number of CSV rows read at a time. Default is 100000.
+        dtype : np.dtype, optional
+            Data type of the served batches. Default is np.float32.
+        """
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.batch_size = batch_size
+        self.uncertainties = uncertainties
+        self.validation_fraction = validation_fraction
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+        self.dtype = dtype
+        self.columns = []           # Feature columns after cleaning
+        self.data_min = None        # Minimum of every feature (training rows)
+        self.data_max = None        # Maximum of every feature (training rows)
+        self.n_rows = 0             # Total number of rows
+        self.n_train = 0            # Number of training rows
+        self.scan()
+
+
+    def _read_chunks(self, usecols=None):
+        """
+        Yields (first_row, chunk) for every CSV chunk of every file, first_row being the global row number.
+        """
+        first_row = 0
+        for path in self.paths:
+            for chunk in pd.read_csv(path, chunksize=self.chunk_rows, usecols=usecols):
+                yield first_row, chunk
+                first_row += len(chunk)
+
+
+    def _is_validation(self, first_row, n):
+        """
+        Deterministic train/validation assignment of n consecutive rows.
+        """
+        rows = np.arange(first_row, first_row + n, dtype=np.float64)
+        offset = (self.seed * _SPLIT_MULTIPLIER) % 1.0
+        return ((rows * _SPLIT_MULTIPLIER + offset) % 1.0) < self.validation_fraction
+
+
+    def scan(self):
+        """
+        Scans the files to find the feature columns and the min/max of every feature over the training rows.
+        """
+        all_columns = None
+        col_min = col_max = train_min = train_max = None
+        has_nan = has_value = None
+        n_rows = n_train = 0
+
+        for first_row, chunk in self._read_chunks():
+            if all_columns is None:
+                all_columns = [col for col in chunk.columns if col not in ID_COLUMNS]
+                if not self.uncertainties:
+                    all_columns = [col for col in all_columns if not col.startswith('d')]
+                n_columns = len(all_columns)
+                col_min, train_min = np.full(n_columns, np.inf), np.full(n_columns, np.inf)
+                col_max, train_max = np.full(n_columns, -np.inf), np.full(n_columns, -np.inf)
+                has_nan = np.zeros(n_columns, dtype=bool)
+                has_value = np.zeros(n_columns, dtype=bool)
+
+            values = chunk[all_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            finite = ~np.isnan(values)
+            has_nan |= ~finite.all(axis=0)
+            has_value |= finite.any(axis=0)
+            with np.errstate(invalid='ignore'):
+                col_min = np.fmin(col_min, np.nanmin(np.where(finite, values, np.inf), axis=0))
+                col_max = np.fmax(col_max, np.nanmax(np.where(finite, values, -np.inf), axis=0))
+                train = values[~self._is_validation(first_row, len(chunk))]
+                if len(train):
+                    train_min = np.fmin(train_min, np.nanmin(np.where(np.isnan(train), np.inf, train), axis=0))
+                    train_max = np.fmax(train_max, np.nanmax(np.where(np.isnan(train), -np.inf, train), axis=0))
+                n_train += len(train)
+            n_rows += len(chunk)
+
+        if all_columns is None:
+            raise ValueError('No data found in {}'.format(self.paths))
+
+        # A column has a single unique value (and is dropped by clean_dataframe) if it is all NaN,
+        # or if it has no NaN and its minimum equals its maximum
+        constant = ~has_value | (~has_nan & (col_min == col_max))
+        keep = ~constant
+        self.columns = [col for col, k in zip(all_columns, keep) if k]
+        self.data_min = np.where(np.isfinite(train_min[keep]), train_min[keep], 0.0)
+        self.data_max = np.where(np.isfinite(train_max[keep]), train_max[keep], 1.0)
+        self.n_rows = n_rows
+        self.n_train = n_train
+
+
+    @property
+    def input_dim(self):
+        """
+        Number of feature columns.
+        """
+        return len(self.columns)
+
+
+    def steps(self, split=None):
+        """
+        Number of batches per pass over the given split ('train', 'validation' or None for all rows).
+        """
+        n = {'train': self.n_train, 'validation': self.n_rows - self.n_train}.get(split, self.n_rows)
+        return int(np.ceil(n / self.batch_size))
+
+
+    def transform(self, values):
+        """
+        Applies the min/max scaling of the source to an array of features (like MinMaxScaler.transform).
+        """
+        scale = self.data_max - self.data_min
+        scale = np.where(scale == 0, 1.0, scale)
+        return ((values - self.data_min) / scale).astype(self.dtype)
+
+
+    def blocks(self, split=None, shuffle=False, with_rows=False, epoch=0):
+        """
+        Yields the scaled features chunk by chunk.
+
+        Parameters:
+        -----------
+        split : str, optional
+            'train', 'validation' or None for all rows. Default is None.
+        shuffle : bool, optional
+            Whether to shuffle the rows inside every chunk. Default is False.
+        with_rows : bool, optional
+            Whether to also yield the global row numbers of the block. Default is False.
+        epoch : int, optional
+            Epoch number, used to vary the shuffling between epochs. Default is 0.
+        """
+        rng = np.random.default_rng((self.seed, epoch))
+        for first_row, chunk in self._read_chunks(usecols=self.columns):
+            rows = np.arange(first_row, first_row + len(chunk))
+            if split is not None:
+                validation = self._is_validation(first_row, len(chunk))
+                mask = validation if split == 'validation' else ~validation
+                chunk, rows = chunk[mask], rows[mask]
+            values = self.transform(chunk[self.columns].to_numpy(dtype=np.float64))
+            if shuffle:
+                permutation = rng.permutation(len(values))
+                values, rows = values[permutation], rows[permutation]
+            yield (values, rows) if with_rows else values
+
+
+    def batches(self, split=None, shuffle=False, with_rows=False, epoch=0):
+        """
+        Yields fixed-size batches of scaled features (the last batch of a pass may be smaller).
+
+        Parameters are the same as in `blocks`.
+        """
+        pending, pending_rows = [], []
+        n_pending = 0
+        for block in self.blocks(split, shuffle, True, epoch):
+            values, rows = block
+            pending.append(values)
+            pending_rows.append(rows)
+            n_pending += len(values)
+            if n_pending < self.batch_size:
+                continue
+            values, rows = np.concatenate(pending), np.concatenate(pending_rows)
+            n_full = len(values) // self.batch_size * self.batch_size
+            for start in range(0, n_full, self.batch_size):
+                batch = values[start:start + self.batch_size]
+                yield (batch, rows[start:start + self.batch_size]) if with_rows else batch
+            pending, pending_rows = [values[n_full:]], [rows[n_full:]]
+            n_pending = len(values) - n_full
+        if n_pending:
+            values, rows = np.concatenate(pending), np.concatenate(pending_rows)
+            yield (values, rows) if with_rows else values
+
+
+    def keras_generator(self, split='train', shuffle=True):
+        """
+        Endless generator of (x, x) batches for `model.fit`, to be used with `steps_per_epoch=source.steps(split)`.
+        """
+        epoch = 0
+        while True:
+            for batch in self.batches(split, shuffle, epoch=epoch):
+                yield batch, batch
+            epoch += 1
+
+
+def train_autoencoder(autoencoder, source, epochs=50, validation=True, **fit_kwargs):
+    """
+    Trains a compiled autoencoder with batches streamed from a GroupBatchSource.
+
+    Parameters:
+    -----------
+    autoencoder : keras.Model
+        The compiled autoencoder (input dimension `source.input_dim`).
+    source : GroupBatchSource
+        The batch source of the group.
+    epochs : int, optional
+        Number of epochs. Default is 50.
+    validation : bool, optional
+        Whether to evaluate the validation split after every epoch. Default is True.
+    **fit_kwargs :
+        Extra arguments passed to `autoencoder.fit`.
+
+    Returns:
+    --------
+    history : keras.callbacks.History
+        The training history, as returned by `fit`.
+
+    Example:
+    --------
+    history = train_autoencoder(autoencoder, source, epochs=50)
+    """
+    if validation and source.steps('validation') > 0:
+        fit_kwargs['validation_data'] = source.keras_generator('validation', shuffle=False)
+        fit_kwargs['validation_steps'] = source.steps('validation')
+    return autoencoder.fit(source.keras_generator('train'), steps_per_epoch=source.steps('train'),
+                           epochs=epochs, **fit_kwargs)
+
+
+def reconstruction_errors(autoencoder, source, errors_path, sketch=None):
+    """
+    Computes the reconstruction error of every row of the group and stores it in a memory-mapped .npy file.
+
+    Parameters:
+    -----------
+    autoencoder : keras.Model
+        The trained autoencoder.
+    source : GroupBatchSource
+        The batch source of the group.
+    errors_path : str
+        Path of the .npy file where the errors (one float per row, in file order) are written.
+    sketch : StreamingQuantile, optional
+        Sketch updated with the errors. A new one is created if None.
+
+    Returns:
+    --------
+    tuple
+        (errors, sketch): the memory-mapped errors and the updated quantile sketch.
+    """
+    sketch = StreamingQuantile() if sketch is None else sketch
+    errors = np.lib.format.open_memmap(errors_path, mode='w+', dtype=np.float64, shape=(source.n_rows,))
+    for batch, rows in source.batches(with_rows=True):
+        predictions = autoencoder.predict_on_batch(batch)
+        batch_errors = np.mean(np.power(batch - np.asarray(predictions), 2), axis=1)
+        errors[rows] = batch_errors
+        sketch.update(batch_errors)
+    errors.flush()
+    return errors, sketch
+
+
+def detect_outliers_streaming(autoencoder, source, percentile=99.0, errors_path=None, store=None, method='autoencoder'):
+    """
+    Detects the outliers of a group with a trained autoencoder, streaming the data from the group files.
+
+    The reconstruction errors are computed batch by batch, the threshold is the given percentile of the
+    errors estimated with a StreamingQuantile sketch, and a last pass over the files collects the original
+    values of the rows whose error exceeds the threshold.
+
+    Parameters:
+    -----------
+    autoencoder : keras.Model
+        The trained autoencoder.
+    source : GroupBatchSource
+        The batch source of the group.
+    percentile : float, optional
+        Percentile of the reconstruction error used as threshold. Default is 99.0.
+    errors_path : str, optional
+        Path of a .npy file to keep the reconstruction errors. A temporary file is used if None.
+    store : ScoreStore, optional
+        If given, the reconstruction errors and verdicts of every row are written to it (the group files need
+        the 'exp_id' and 'point_index' columns, see `point_keys`).
+    method : str, optional
+        Name of the method in the store. Default is 'autoencoder'.
+
+    Returns:
+    --------
+    tuple
+        (outliers_df, threshold): the outlier rows with their original values (the cleaned feature columns
+        plus the identification columns, like in the notebook) and the error threshold.
+
+    Example:
+    --------
+    outliers_df, threshold = detect_outliers_streaming(autoencoder, source, percentile=99.0)
+    """
+    temporary = errors_path is None
+    if temporary:
+        handle, errors_path = tempfile.mkstemp(suffix='.npy')
+        os.close(handle)
+
+    try:
+        errors, sketch = reconstruction_errors(autoencoder, source, errors_path)
+        threshold = sketch.percentile(percentile)
+
+        # Collect the original values of the outlier rows (and the point keys of all rows for the store)
+        outliers = []
+        exp_ids, point_indices = [], []
+        for first_row, chunk in source._read_chunks():
+            mask = errors[first_row:first_row + len(chunk)] > threshold
+            if mask.any():
+                columns = source.columns + [col for col in ID_COLUMNS if col in chunk.columns]
+                outliers.append(chunk.loc[mask, columns])
+            if store is not None:
+                exp_id, point_index = point_keys(chunk)
+                exp_ids.append(exp_id)
+                point_indices.append(point_index)
+        if store is not None:
+            scores = np.array(errors)
+            store.write(method, np.concatenate(exp_ids), np.concatenate(point_indices), scores, scores > threshold,
+                        higher_is_outlier=True, params={'percentile': percentile, 'threshold': threshold})
+        del errors
+    finally:
+        if temporary:
+            os.remove(errors_path)
+
+    outliers_df = pd.concat(outliers) if outliers else pd.DataFrame(columns=source.columns + ID_COLUMNS)
+    print('Percentage of outliers: {:.2f}%'.format(len(outliers_df) / source.n_rows * 100))
+    return outliers_df, threshold
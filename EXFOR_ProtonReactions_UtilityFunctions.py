@@ -12,16 +12,19 @@ DESCRIPTION:
 
 MAIN FEATURES:
     - Data Reading: Reads experiment data from specified file formats.
+    - Ingestion: Checkpointed, resumable ingestion of the full library into a binary database.
     - Data Manipulation: Utilizes pandas and numpy for data cleaning and transformation.
-    - Visualization: Uses matplotlib and seaborn for data visualization.
+    - Visualization: Plotting functions (matplotlib and seaborn) live in the Plotting
+      module and are only imported when first used.
     - Experiment Object: Utilizes a custom Experiment class for better data management.
 
 DEPENDENCIES:
     - pandas
     - numpy
-    - matplotlib
-    - seaborn
     - Experiment (custom class)
+    - Instrumentation (custom module)
+    - Schema (custom module)
+    - Plotting (custom module, imported on first use of a plotting function)
 
 USAGE:
     1. Import the script: `import proton_func as pf`
@@ -34,14 +37,43 @@ USAGE:
 
 import pandas as pd
 import numpy as np
-from EXFOR_ProtonReactions_Experiment_Class import Experiment
+from EXFOR_ProtonReactions_Experiment_Class import Experiment, ID_COLUMNS
+from EXFOR_ProtonReactions_Instrumentation import ProgressReporter, optional_stage
+from EXFOR_ProtonReactions_Schema import data_schema, get_schema, SchemaRegistry
 import os
+import io
+import fnmatch
+import json
 import pickle
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-
-def read_experiment(filename):
+import shutil
+import time
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+
+
+# Default exclusion rules of the EXFORTABLES tree: directories and files that do not contain experiments
+# ('*/*list' only matches the subdirectories of a target, as in read_proton_experiments_from_exfortables)
+EXFORTABLES_EXCLUDE_DIRS = ['*/*list']
+EXFORTABLES_EXCLUDE_FILES = ['*list', '*ruth']
+
+# Header lines of the text format: (label, Experiment attribute), in the order expected by read_experiments_from_txt
+TXT_HEADER_FIELDS = [('# Title       : ', 'title'),
+                     ('# Reaction    : ', 'reaction'),
+                     ('# Ratio isomer: ', 'Ratio_isomer'),
+                     ('# Quantity    : ', 'quantity'),
+                     ('# Frame       : ', 'frame'),
+                     ('# MF          : ', 'MF'),
+                     ('# MT          : ', 'MT'),
+                     ('# X4 ID       : ', 'X4_ID'),
+                     ('# X4 code     : ', 'X4_code'),
+                     ('# Author      : ', 'author'),
+                     ('# Year        : ', 'year'),
+                     ('# Data points : ', 'data_points')]
+
+
+def read_experiment(filename, verbose=True):
     """
     This function reads a file specified by 'filename', processes its content line by line, and populates the properties 
     of an Experiment object according to specific keywords present in the file. It finally returns this populated 
@@ -74,6 +106,7 @@ def read_experiment(filename):
     - year (int/str): the year of the experiment.
     - data_points (int/str): the number of data points in the experiment.
     - data (pd.DataFrame): the data of the experiment.
+    - schema (str): the data-schema signature of the experiment (see the Schema module).
     - Reference (str): the reference of the experiment.
 
     If a property value is not found in the file or cannot be converted to its respective type, the value is set to None.
@@ -84,6 +117,7 @@ def read_experiment(filename):
 
     Parameters:
         filename (str): Name or path of the file to read.
+        verbose (bool, optional): Whether to print the name of the file. Default is True.
 
     Returns:
         experiment (Experiment): Populated Experiment object.
@@ -92,149 +126,170 @@ def read_experiment(filename):
         FileNotFoundError: If the file specified by 'filename' does not exist.
     """
 
+    title = filename.split('\\')[-1]
+    if verbose: print('Reading experiment: ', title)
+
+    # Open the file and parse its lines
+    with open(filename, 'r') as f:
+        lines = f.readlines()
+
+    return parse_experiment(lines, title)
+
+
+def parse_experiment(lines, title):
+    """
+    Populates an Experiment object from the lines of an EXFORTABLES file.
+
+    This is the parser used by `read_experiment`; it does not access the disk, so it can be fed with files read
+    from anywhere (e.g. the members of a compressed archive). See `read_experiment` for the file format and the
+    properties of the returned object.
+
+    Parameters:
+        lines (list): The lines of the file, each one ending with '\\n'.
+        title (str): The title of the experiment (usually the file name).
+
+    Returns:
+        experiment (Experiment): Populated Experiment object.
+    """
+
     # Create the experiment
     experiment = Experiment()
-    experiment.title = filename.split('\\')[-1]
-    print('Reading experiment: ', experiment.title)
+    experiment.title = title
     read_header = False         # Flag to read the header
     read_ref = False            # Flag to read the reference
     temp_line = ""              # Temporary line to store the reference
 
-    # Open the file
-    with open(filename, 'r') as f:
-        # Read the first line
-        lines = f.readlines()
-        for line in lines:
-
-            if line.startswith('#') and not read_ref and not read_header:            
-                if line.startswith('# Target Z'):
-                    try:
-                        experiment.target_Z = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.target_Z = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Target A'):
-                    try:
-                        experiment.target_A = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.target_A = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Target state'):
-                    try:
-                        experiment.target_state = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.target_state = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Projectile'):
-                    experiment.projectile = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Reaction    :'):           # This includes the ':' because there is another line with the same beginning in some files
-                    experiment.reaction = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# E-inc'):
-                    experiment.E_inc = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Final Z'):
-                    try:
-                        experiment.final_Z = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.final_Z = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Final A'):
-                    try:
-                        experiment.final_A = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.final_A = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Final state'):
-                    try:
-                        experiment.final_state = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.final_state = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# MTrat'):
-                    try:
-                        experiment.MTrat = float(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.MTrat = float(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Ratio isomer'):
-                    try:
-                        experiment.Ratio_isomer = float(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.Ratio_isomer = float(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Quantity'):
-                    experiment.quantity = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Frame'):
-                    experiment.frame = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# MF'):
-                    try:
-                        experiment.MF = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.MF = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# MT'):
-                    try:
-                        experiment.MT = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.MT = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# X4 ID'):
-                    experiment.X4_ID = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# X4 code'):
-                    experiment.X4_code = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Author'):
-                    experiment.author = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Year'):
-                    try:
-                        experiment.year = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.year = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                elif line.startswith('# Data points'):
-                    try:
-                        experiment.data_points = int(line.split(':')[1].strip())
-                    except ValueError:
-                        experiment.data_points = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
-                    read_header = True           
-                elif line.startswith('# Reference'):
-                    read_ref = True
-
-            elif read_header:
-                header = line.split()[1:]
-                data_list = [[] for i in range(len(header))]
-                read_header = False
-
-            elif read_ref:
-                # If line only contains '#\n', then it is the end of the reference
-                if line == '#\n':
-                    # add the reference to the experiment except for the last two characters (which are '# ')
-                    experiment.reference = temp_line[:-2]
-                    read_ref = False        # Reset the flag
-                    temp_line = ""          # Reset the temporary line
-                    continue                
-                temp_line += line[1:]
-                
-            else:
-                data = line.split()
-                # Get number of splits
-                n = len(data)
-                data_list[0].append(float(data[0]))
-                data_list[1].append(float(data[1]))
-                # If there are 2 splits, then there are no values for dE and dxs
-                if n == 2:
-                    data_list[2].append(np.nan)
-                    data_list[3].append(np.nan)
-                # If there are 3 splits, then there are no values for dE
-                elif n == 3:
-                    data_list[2].append(float(data[2]))
-                    data_list[3].append(np.nan)
-                # If there are 4 splits, then there are values for dE and dxs
-                elif n == 4:
-                    data_list[2].append(float(data[2]))
-                    data_list[3].append(float(data[3]))  
-
-        if read_ref:        # This being True means that the file ended directly after the reference
-            experiment.reference = temp_line[:-2]
-
-        # Close the file
-        f.close()
+    for line in lines:
+
+        if line.startswith('#') and not read_ref and not read_header:            
+            if line.startswith('# Target Z'):
+                try:
+                    experiment.target_Z = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.target_Z = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Target A'):
+                try:
+                    experiment.target_A = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.target_A = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Target state'):
+                try:
+                    experiment.target_state = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.target_state = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Projectile'):
+                experiment.projectile = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Reaction    :'):           # This includes the ':' because there is another line with the same beginning in some files
+                experiment.reaction = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# E-inc'):
+                experiment.E_inc = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Final Z'):
+                try:
+                    experiment.final_Z = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.final_Z = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Final A'):
+                try:
+                    experiment.final_A = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.final_A = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Final state'):
+                try:
+                    experiment.final_state = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.final_state = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# MTrat'):
+                try:
+                    experiment.MTrat = float(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.MTrat = float(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Ratio isomer'):
+                try:
+                    experiment.Ratio_isomer = float(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.Ratio_isomer = float(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Quantity'):
+                experiment.quantity = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Frame'):
+                experiment.frame = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# MF'):
+                try:
+                    experiment.MF = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.MF = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# MT'):
+                try:
+                    experiment.MT = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.MT = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# X4 ID'):
+                experiment.X4_ID = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# X4 code'):
+                experiment.X4_code = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Author'):
+                experiment.author = line.split(':')[1].strip() if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Year'):
+                try:
+                    experiment.year = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.year = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+            elif line.startswith('# Data points'):
+                try:
+                    experiment.data_points = int(line.split(':')[1].strip())
+                except ValueError:
+                    experiment.data_points = int(line.split(':')[1].strip()) if line.split(':')[1].strip() != '' else None
+                read_header = True           
+            elif line.startswith('# Reference'):
+                read_ref = True
+
+        elif read_header:
+            header = line.split()[1:]
+            data_list = [[] for i in range(len(header))]
+            read_header = False
+
+        elif read_ref:
+            # If line only contains '#\n', then it is the end of the reference
+            if line == '#\n':
+                # add the reference to the experiment except for the last two characters (which are '# ')
+                experiment.reference = temp_line[:-2]
+                read_ref = False        # Reset the flag
+                temp_line = ""          # Reset the temporary line
+                continue                
+            temp_line += line[1:]
+            
+        else:
+            data = line.split()
+            # Get number of splits
+            n = len(data)
+            data_list[0].append(float(data[0]))
+            data_list[1].append(float(data[1]))
+            # If there are 2 splits, then there are no values for dE and dxs
+            if n == 2:
+                data_list[2].append(np.nan)
+                data_list[3].append(np.nan)
+            # If there are 3 splits, then there are no values for dE
+            elif n == 3:
+                data_list[2].append(float(data[2]))
+                data_list[3].append(np.nan)
+            # If there are 4 splits, then there are values for dE and dxs
+            elif n == 4:
+                data_list[2].append(float(data[2]))
+                data_list[3].append(float(data[3]))  
+
+    if read_ref:        # This being True means that the file ended directly after the reference
+        experiment.reference = temp_line[:-2]
     
     # Create a data frame using 'header' and 'E', 'xs', 'dxs' and 'dE' lists
     experiment.data = pd.DataFrame(data_list, index=header).T
 
+    # Record the data-schema signature (headers, uncertainties with values and metadata that is set)
+    experiment.schema = data_schema(experiment)
+
     # Return the experiment
     return experiment
 
 
-def write_experiments_to_binary(experiments, filename):
+def write_experiments_to_binary(experiments, filename, instrumentation=None):
     """
     This function writes a list of Experiment objects to a binary file.
     It uses Python's pickle library for object serialization.
@@ -242,6 +297,7 @@ def write_experiments_to_binary(experiments, filename):
     Parameters:
         experiments (list): A list of Experiment objects to be written to the file.
         filename (str): The name of the file where the experiments will be written.
+        instrumentation (Instrumentation, optional): If given, the writing is timed as the 'serialize' stage.
 
     Returns:
         None
@@ -256,9 +312,11 @@ def write_experiments_to_binary(experiments, filename):
         Be aware of the potential security risks if you're unpickling data from an untrusted source.
     """
     
-    with open(filename, 'wb') as f:
-        for experiment in experiments:
-            pickle.dump(experiment, f)
+    with optional_stage(instrumentation, 'serialize') as record:
+        with open(filename, 'wb') as f:
+            for experiment in experiments:
+                pickle.dump(experiment, f)
+        record['items'] = len(experiments)
 
 
 
@@ -275,6 +333,7 @@ def read_experiments_from_binary(filename):
 
     Note:
         The function uses Python's pickle library, so be cautious of potential security risks if you're unpickling data from an untrusted source.
+        Experiments saved without an 'exp_id' (older databases) get their position in the file as experiment id.
     """
 
     loaded_experiments = []
@@ -290,21 +349,109 @@ def read_experiments_from_binary(filename):
                 print("Error in deserializing object. Skipping...")
                 break
 
+    assign_experiment_ids(loaded_experiments)
+
     return loaded_experiments
 
 
-def write_experiments_to_txt(experiments, filename):
+def format_data_block(data):
+    """
+    Formats the data of an experiment as text: a header line with the column names followed by one line per row.
+
+    The columns are converted to strings with NumPy (shortest representation that round-trips, 'NaN' for missing
+    values) and joined in a single pass, which is much faster than `DataFrame.to_string` and does not pad the
+    columns for display.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        The 'data' attribute of an Experiment object.
+
+    Returns:
+    --------
+    str
+        The formatted block, ending with a newline.
     """
-    write_experiments_to_txt(experiments, filename)
+    header = ' '.join(str(column) for column in data.columns)
+    if data.empty:
+        return header + '\n'
+
+    columns = []
+    for column in data.columns:
+        values = data[column].to_numpy()
+        if values.dtype.kind == 'f':
+            strings = values.astype(str)
+            strings[np.isnan(values)] = 'NaN'
+        else:
+            strings = values.astype(str)
+        columns.append(strings)
+    rows = np.stack(columns, axis=1).tolist()
+
+    return header + '\n' + '\n'.join(map(' '.join, rows)) + '\n'
+
+
+def format_experiment_txt(experiment):
+    """
+    Formats one experiment in the text format of `write_experiments_to_txt`, from '# Title' to '# END'.
+
+    Parameters:
+    -----------
+    experiment : Experiment
+        The experiment to format.
+
+    Returns:
+    --------
+    str
+        The text block of the experiment.
+    """
+    lines = []
+    for label, attribute in TXT_HEADER_FIELDS:
+        # If the information is None, then write an empty string
+        value = getattr(experiment, attribute, None)
+        lines.append(label + ('' if value is None else str(value)) + '\n')
+    lines.append(format_data_block(experiment.data))
+    # The reference starts on the line after '# Reference' and ends with a newline (nothing if it is empty)
+    reference = '' if experiment.reference is None else experiment.reference
+    if reference and not reference.endswith('\n'): reference += '\n'
+    lines.append('# Reference   : \n' + reference)
+    # Write a line to separate the reference from the next experiment
+    lines.append('# END\n')
+    return ''.join(lines)
+
+
+def _write_txt_shard(task):
+    """
+    Writes the text blocks of a list of experiments to a shard file (worker of `write_experiments_to_txt`).
+    """
+    experiments, filename = task
+    with open(filename, 'w') as f:
+        for experiment in experiments:
+            f.write(format_experiment_txt(experiment))
+    return filename
+
+
+def write_experiments_to_txt(experiments, filename, processes=1, shards=None, instrumentation=None):
+    """
+    write_experiments_to_txt(experiments, filename, processes=1, shards=None, instrumentation=None)
 
     Serializes a list of experiment objects into a text file, capturing various attributes of each experiment. 
     The function handles empty string attributes by writing them as such in the output file. Once all experiment details are written, the file is closed.
 
+    Every experiment is formatted into a single buffer (see `format_experiment_txt`) and written with one call.
+    With several processes, the experiments are split into contiguous shards that are written by worker processes
+    to temporary files ('<filename>.partXXXX') and then concatenated in order, followed by '# END OF FILE'.
+
     Parameters:
         experiments (list): A list of experiment objects.
                             
         filename (str): The name of the output text file where the experiment details will be serialized.
 
+        processes (int, optional): Number of worker processes. Default is 1 (write from the current process).
+
+        shards (int, optional): Number of shards when processes > 1. Default is 4 shards per process.
+
+        instrumentation (Instrumentation, optional): If given, the writing is timed as the 'serialize' stage.
+
     Returns:
         None
 
@@ -312,36 +459,45 @@ def write_experiments_to_txt(experiments, filename):
         experiments = [experiment1, experiment2]
         filename = "experiments.txt"
         write_experiments_to_txt(experiments, filename)
+        write_experiments_to_txt(experiments, filename, processes=8)
 
     Note:
-        Ensure that each experiment object in the list has all the mentioned attributes. Missing attributes will lead to an error.
+        Ensure that each experiment object in the list has all the mentioned attributes. Missing attributes are written as empty values.
+        With several processes the experiments are pickled to the workers, which pays off for large databases only.
     """
 
-    with open(filename, 'w') as f:
-        for experiment in experiments:
-            # Write the header
-            f.write('# Title       : ' + experiment.title + '\n')
-            # Write the information. If the information is '', then write an empty string
-            f.write('# Reaction    : ' + experiment.reaction  + '\n' if experiment.reaction is not None else '# Reaction    : \n')
-            f.write('# Ratio isomer: ' + str(experiment.Ratio_isomer) + '\n' if experiment.Ratio_isomer is not None else '# Ratio isomer: \n')
-            f.write('# Quantity    : ' + experiment.quantity + '\n' if experiment.quantity is not None else '# Quantity    : \n')
-            f.write('# Frame       : ' + experiment.frame + '\n' if experiment.frame is not None else '# Frame       : \n')
-            f.write('# MF          : ' + str(experiment.MF) + '\n' if experiment.MF is not None else '# MF          : \n')
-            f.write('# MT          : ' + str(experiment.MT) + '\n' if experiment.MT is not None else '# MT          : \n')
-            f.write('# X4 ID       : ' + experiment.X4_ID + '\n' if experiment.X4_ID is not None else '# X4 ID       : \n')
-            f.write('# X4 code     : ' + experiment.X4_code + '\n' if experiment.X4_code is not None else '# X4 code     : \n')
-            f.write('# Author      : ' + experiment.author + '\n' if experiment.author is not None else '# Author      : \n')
-            f.write('# Year        : ' + str(experiment.year) + '\n' if experiment.year is not None else '# Year        : \n')
-            f.write('# Data points : ' + str(experiment.data_points) + '\n' if experiment.data_points is not None else '# Data points : \n')    
-            # Write the data
-            f.write(experiment.data.to_string(header=True, index=False))
-            # Write the reference 
-            # If the reference is '', then write an empty string
-            f.write('\n# Reference   : \n' + experiment.reference + '\n' if experiment.reference is not None else '# Reference   : \n') 
-            # Write a line to separate the reference from the next experiment
-            f.write('# END\n')
-    
-        f.write('# END OF FILE')
+    with optional_stage(instrumentation, 'serialize') as record:
+        if processes is None or processes <= 1 or len(experiments) < 2:
+            with open(filename, 'w') as f:
+                for experiment in experiments:
+                    f.write(format_experiment_txt(experiment))
+                f.write('# END OF FILE')
+        else:
+            _write_txt_in_shards(experiments, filename, processes, shards)
+        record['items'] = len(experiments)
+
+
+def _write_txt_in_shards(experiments, filename, processes, shards):
+    """
+    Writes the text file of `write_experiments_to_txt` with several processes.
+    """
+    # Split the experiments into contiguous shards so that the concatenation keeps their order
+    n_shards = min(shards if shards is not None else 4 * processes, len(experiments))
+    bounds = np.linspace(0, len(experiments), n_shards + 1).astype(int)
+    tasks = [(experiments[bounds[i]:bounds[i + 1]], '{}.part{:04d}'.format(filename, i)) for i in range(n_shards)]
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            parts = list(executor.map(_write_txt_shard, tasks))
+        with open(filename, 'w') as f:
+            for part in parts:
+                with open(part, 'r') as p:
+                    shutil.copyfileobj(p, f, 1024 * 1024)
+            f.write('# END OF FILE')
+    finally:
+        # Remove the shard files
+        for _, part in tasks:
+            if os.path.exists(part): os.remove(part)
 
 
 def read_experiments_from_txt(filename):
@@ -356,6 +512,7 @@ def read_experiments_from_txt(filename):
     - The file should end with a line containing '# END OF FILE'.
     
     If a field is missing, the corresponding attribute in the Experiment object is set to an empty string ('').
+    The text format does not store the experiment id, so every experiment gets its position in the file as 'exp_id'.
 
     Parameters:
     ------------
@@ -393,6 +550,8 @@ def read_experiments_from_txt(filename):
         if line.startswith('# END OF FILE'):
             # Close the file
             f.close()
+            # Assign the experiment ids (position in the file)
+            assign_experiment_ids(experiments)
             # Return the list of experiments
             return experiments
         # While you dont read '# END' read lines
@@ -459,23 +618,174 @@ def read_experiments_from_txt(filename):
                 line = f.readline()             # In the last iteration, the line is '# END'
             # If the reference is empty, then set it to ''. If not, then remove the last '\n'
             if experiment.reference != '': experiment.reference[:-1]
+            # Record the data-schema signature
+            experiment.schema = data_schema(experiment)
             # Add the experiment to the list of experiments
             experiments.append(experiment)
             # Read the line '# END OF FILE' or next experiment
             line = f.readline()
 
 
-def read_proton_experiments_from_exfortables(path):
+def _read_bytes(filename):
+    """
+    Reads the raw content of a file (I/O thread of `prefetch_files`).
+    """
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def prefetch_files(files, threads=8, depth=64, max_bytes=64 * 1024**2):
+    """
+    Reads the raw content of files ahead of their use with a pool of I/O threads.
+
+    On synced or network filesystems most of the time of reading a file is the latency of opening and reading
+    it, during which the CPU is idle. This generator keeps up to `depth` files being read (or read and not used
+    yet) by `threads` threads, so that the caller can parse a file while the next ones are being read. It stops
+    reading ahead when the files being read or read and not used yet take `max_bytes`: the size of every file
+    (from `os.stat`) is reserved when its read is submitted and released when it is yielded.
+
+    Parameters:
+    ------------
+    files : list
+        The paths of the files.
+    threads : int, optional
+        Number of I/O threads (maximum number of files read at the same time). Default is 8.
+    depth : int, optional
+        Maximum number of files read ahead. Default is 64.
+    max_bytes : int, optional
+        Maximum size of the files read ahead (at least one file is always read). Default is 64 MB.
+
+    Yields:
+    -------
+    tuple
+        (filename, content) in the order of `files`. An error reading a file is raised when its turn comes.
+
+    Example:
+    --------
+    for filename, content in prefetch_files(files, threads=16):
+        ...
+    """
+    reserved = 0            # Size of the files submitted and not yielded yet
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        position = 0
+        try:
+            while pending or position < len(files):
+                # Read ahead while the depth and the memory cap allow it
+                while position < len(files) and len(pending) < depth and (not pending or reserved < max_bytes):
+                    try:
+                        size = os.stat(files[position]).st_size
+                    except OSError:
+                        # The error is raised by the read, when the turn of the file comes
+                        size = 0
+                    pending.append((files[position], executor.submit(_read_bytes, files[position]), size))
+                    reserved += size
+                    position += 1
+                filename, future, size = pending.popleft()
+                reserved -= size
+                yield filename, future.result()
+        finally:
+            # Do not read the remaining files if the caller stops early
+            for _, future, _ in pending:
+                future.cancel()
+
+
+def _parse_buffer(task):
+    """
+    Parses the raw content of an experiment file (parser of `read_experiment_files`). Returns the experiment
+    and the parse time.
+    """
+    filename, content = task
+    start = time.perf_counter()
+    # Same decoding and newline handling as read_experiment, which opens the file in text mode
+    lines = io.TextIOWrapper(io.BytesIO(content)).readlines()
+    experiment = parse_experiment(lines, filename.split('\\')[-1])
+    return experiment, time.perf_counter() - start
+
+
+def read_experiment_files(files, io_threads=8, processes=1, prefetch_depth=64, prefetch_bytes=64 * 1024**2):
+    """
+    Reads experiment files with the I/O overlapped with the parsing.
+
+    The files are read ahead by `prefetch_files` and their contents are parsed in this process or, with
+    `processes` > 1, in a pool of worker processes fed with at most 4 buffers per process at a time (so the
+    memory cap of the prefetching also bounds the buffers waiting in the pool).
+
+    Parameters:
+    ------------
+    files : list
+        The paths of the files.
+    io_threads : int, optional
+        Number of I/O threads. Default is 8.
+    processes : int, optional
+        Number of processes used to parse the files. Default is 1 (parse in the current process).
+    prefetch_depth : int, optional
+        Maximum number of files read ahead. Default is 64.
+    prefetch_bytes : int, optional
+        Maximum size of the buffers read ahead. Default is 64 MB.
+
+    Yields:
+    -------
+    tuple
+        (filename, experiment, parse seconds) in the order of `files`.
+    """
+    buffers = prefetch_files(files, io_threads, prefetch_depth, prefetch_bytes)
+    if processes is None or processes <= 1:
+        for filename, content in buffers:
+            experiment, seconds = _parse_buffer((filename, content))
+            yield filename, experiment, seconds
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        for filename, content in buffers:
+            pending.append((filename, executor.submit(_parse_buffer, (filename, content))))
+            if len(pending) >= 4 * processes:
+                filename, future = pending.popleft()
+                yield (filename, *future.result())
+        while pending:
+            filename, future = pending.popleft()
+            yield (filename, *future.result())
+
+
+def read_proton_experiments_from_exfortables(path, root='', processes=1, files=None, cache=None, instrumentation=None,
+                                             progress=True, io_threads=0, prefetch_depth=64,
+                                             prefetch_bytes=64 * 1024**2):
     """
     Reads all proton experiment files located in a given directory and its subdirectories.
     
     The function recursively traverses through all directories and subdirectories under the specified path.
     It reads files that do not have names ending with 'list' or 'ruth' and returns a list of Experiment objects.
+    Every experiment gets a compact integer id ('exp_id') equal to its position in the returned list.
+    If `path` is a tar (.tar, .tar.gz, .tar.xz, ...) or zip archive, the experiments are read directly from the
+    archive with `read_proton_experiments_from_archive`.
     
     Parameters:
     ------------
     path : str
-        The absolute or relative path to the root directory containing proton experiment files.
+        The absolute or relative path to the root directory containing proton experiment files, or to an archive.
+    root : str, optional
+        Only for archives: directory inside the archive that plays the role of the root directory. Default is ''.
+    processes : int, optional
+        Number of processes used to parse the files of an archive, or of a directory read with `io_threads`.
+        Default is 1.
+    files : list, optional
+        Files to read instead of walking the directory (e.g. a list saved with `save_file_list`). Default is None.
+    cache : str, optional
+        File list cache passed to `walk_exfortables`: the list is loaded from it if it exists and saved to it
+        otherwise. Default is None (always walk the directory).
+    instrumentation : Instrumentation, optional
+        If given, the reading is timed as the 'parse' stage and the parse time of every file is recorded.
+    progress : bool, optional
+        Whether to print the progress (at most once every few seconds). Default is True.
+    io_threads : int, optional
+        Only for directories: number of threads that read the files ahead of the parser (see
+        `read_experiment_files`), for synced or network filesystems where the latency of every file dominates.
+        Default is 0 (every file is read when it is parsed).
+    prefetch_depth : int, optional
+        With `io_threads`: maximum number of files read ahead. Default is 64.
+    prefetch_bytes : int, optional
+        With `io_threads`: maximum size of the files read ahead. Default is 64 MB.
         
     Returns:
     ---------
@@ -497,51 +807,594 @@ def read_proton_experiments_from_exfortables(path):
     ------
     - The function assumes that each Experiment object has attributes corresponding to the fields in the text files.
     - The function relies on `read_experiment()` for reading individual experiment files.
+    - The files are found with `walk_exfortables` and read in sorted order, so the 'exp_id' of every experiment
+      does not depend on the order in which the filesystem lists the directories.
     """
 
-    # Get name of all directories in the path
-    dirs = [d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
+    # Archives are read without extracting them
+    if os.path.isfile(path):
+        return read_proton_experiments_from_archive(path, root=root, processes=processes,
+                                                    instrumentation=instrumentation, progress=progress)
+
+    with optional_stage(instrumentation, 'parse') as record:
+        # Get the experiment files (a single scan of every directory)
+        if files is None:
+            files = walk_exfortables(path, cache=cache)
+
+        experiments = []
+        reporter = ProgressReporter(len(files), 'Reading experiments', enabled=progress)
+
+        if io_threads:
+            # Read the files ahead with I/O threads while the previous ones are parsed
+            for f, experiment, seconds in read_experiment_files(files, io_threads, processes, prefetch_depth,
+                                                                prefetch_bytes):
+                if instrumentation is not None: instrumentation.record_file(f, seconds)
+                experiment.exp_id = len(experiments)
+                experiments.append(experiment)
+                reporter.update()
+        else:
+            # Go through all files
+            for f in files:
+                # Read the experiment
+                start = time.perf_counter()
+                experiment = read_experiment(f, verbose=False)
+                if instrumentation is not None: instrumentation.record_file(f, time.perf_counter() - start)
+                experiment.exp_id = len(experiments)
+                # Add the experiment to the list of experiments
+                experiments.append(experiment)
+                reporter.update()
+
+        reporter.close()
+        record['items'] = len(experiments)
+    return experiments
+
 
-    experiments = []
+def _parse_file(filename):
+    """
+    Reads an experiment file, catching any error (worker of `ingest_proton_experiments`).
+
+    Returns:
+    --------
+    tuple
+        (experiment, error, seconds): the experiment (None if the file failed), the error ('Type: message',
+        None if it did not fail) and the time needed.
+    """
+    start = time.perf_counter()
+    try:
+        experiment, error = read_experiment(filename, verbose=False), None
+    except Exception as e:
+        experiment, error = None, '{}: {}'.format(type(e).__name__, e)
+    return experiment, error, time.perf_counter() - start
+
+
+def _fsync(f):
+    """
+    Flushes a file to disk, so that a checkpoint never refers to data that is still in a buffer.
+    """
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _write_checkpoint(filename, checkpoint):
+    """
+    Atomically writes an ingestion checkpoint.
+    """
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w') as f:
+        json.dump(checkpoint, f, indent=1)
+        _fsync(f)
+    os.replace(temp_filename, filename)
+
+
+def load_quarantine(filename):
+    """
+    Loads the quarantine log written by `ingest_proton_experiments`.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per quarantined file, with the 'file' and the 'error' it raised.
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return pd.DataFrame(columns=['file', 'error'])
+    with open(filename, 'r') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()], columns=['file', 'error'])
+
+
+def ingest_proton_experiments(path, database, batch_size=500, processes=1, checkpoint=None, restart=False,
+                              files=None, cache=None, instrumentation=None, progress=True):
+    """
+    Reads all proton experiment files of an EXFORTABLES directory into a binary database, in checkpointed
+    batches that can be resumed after a failure.
+
+    The files are parsed in batches of `batch_size` and every batch is appended to the binary database (the
+    format of `write_experiments_to_binary`) as soon as it is parsed. After every batch a checkpoint records the
+    number of files done, the size of the database and of the quarantine log. Files that cannot be parsed are
+    not read again: they are written to the quarantine log ('<database>.quarantine', one JSON line per file with
+    its error) and skipped. If the run is interrupted, calling the function again truncates the database and
+    the quarantine log to the last checkpoint (dropping a batch that was being written) and continues from there.
+
+    Parameters:
+    ------------
+    path : str
+        The EXFORTABLES directory with the proton experiment files. Archives are not supported (use
+        `read_proton_experiments_from_archive`): their files can only be selected once the whole archive is read.
+    database : str
+        The binary database to write.
+    batch_size : int, optional
+        Number of files parsed between two checkpoints. Default is 500.
+    processes : int, optional
+        Number of processes used to parse the files of a batch. Default is 1 (parse in the current process).
+    checkpoint : str, optional
+        The checkpoint file. Default is None ('<database>.checkpoint'). The list of files is saved next to it
+        ('<checkpoint>.files') so that a resumed run reads the same files in the same order.
+    restart : bool, optional
+        Whether to ignore an existing checkpoint and start again. Default is False (resume).
+    files : list, optional
+        Files to read instead of walking the directory. Only used when starting (not when resuming).
+    cache : str, optional
+        File list cache passed to `walk_exfortables`. Only used when starting.
+    instrumentation : Instrumentation, optional
+        If given, the ingestion is timed as the 'parse' stage and the parse time of every file is recorded.
+    progress : bool, optional
+        Whether to print the progress (at most once every few seconds). Default is True.
+
+    Returns:
+    ---------
+    quarantine : pd.DataFrame
+        The quarantined files and their errors (see `load_quarantine`).
+
+    Raises:
+    -------
+    ValueError:
+        If `path` is a file, or when resuming if the database or the quarantine log is missing or shorter than
+        recorded in the checkpoint.
+
+    Example:
+    --------
+    quarantine = ingest_proton_experiments('./exfortables/p', 'EXFOR_ProtonReactions_Database.bin')
+    experiments = read_experiments_from_binary('EXFOR_ProtonReactions_Database.bin')
+
+    Notes:
+    ------
+    - Experiments get consecutive ids ('exp_id') in the order of the files, skipping the quarantined files, so
+      without failures they are the ids of `read_proton_experiments_from_exfortables`.
+    - The checkpoint is kept when the ingestion is complete; calling the function again does nothing.
+    """
+    if os.path.isfile(path):
+        raise ValueError('Checkpointed ingestion reads directories. Use read_proton_experiments_from_archive '
+                         'for archives')
+    checkpoint = database + '.checkpoint' if checkpoint is None else checkpoint
+    file_list = checkpoint + '.files'
+    quarantine_log = database + '.quarantine'
+
+    if os.path.exists(checkpoint) and not restart:
+        # Resume: roll the database and the quarantine log back to the last checkpoint
+        with open(checkpoint, 'r') as f:
+            state = json.load(f)
+        if state['complete']:
+            print(f"Ingestion of {path} already complete: {state['n_experiments']} experiments.")
+            return load_quarantine(quarantine_log)
+        files = load_file_list(file_list)
+        for filename, size in [(database, state['database_size']), (quarantine_log, state['quarantine_size'])]:
+            if not os.path.exists(filename):
+                raise ValueError(f"{filename} is missing but {checkpoint} records a partial ingestion. "
+                                 "Use restart=True")
+            if os.path.getsize(filename) < size:
+                raise ValueError(f"{filename} is shorter than recorded in {checkpoint}. Use restart=True")
+            with open(filename, 'r+b') as f:
+                f.truncate(size)
+        print(f"Resuming from file {state['position']} of {len(files)} ({state['n_experiments']} experiments).")
+    else:
+        if files is None:
+            files = walk_exfortables(path, cache=cache)
+        save_file_list(files, file_list)
+        open(database, 'wb').close()
+        open(quarantine_log, 'wb').close()
+        state = {'path': path, 'n_files': len(files), 'position': 0, 'n_experiments': 0, 'n_quarantined': 0,
+                 'database_size': 0, 'quarantine_size': 0, 'complete': False}
+        _write_checkpoint(checkpoint, state)
+
+    executor = ProcessPoolExecutor(max_workers=processes) if processes is not None and processes > 1 else None
+    reporter = ProgressReporter(len(files) - state['position'], 'Reading experiments', enabled=progress)
+
+    with optional_stage(instrumentation, 'parse') as record:
+        try:
+            for start in range(state['position'], len(files), batch_size):
+                batch = files[start:start + batch_size]
+                if executor is None:
+                    results = [_parse_file(f) for f in batch]
+                else:
+                    results = list(executor.map(_parse_file, batch,
+                                                chunksize=max(1, len(batch) // (4 * processes))))
+
+                # Commit the batch: experiments, quarantined files and then the checkpoint
+                with open(database, 'ab') as db, open(quarantine_log, 'ab') as log:
+                    for f, (experiment, error, seconds) in zip(batch, results):
+                        if instrumentation is not None: instrumentation.record_file(f, seconds)
+                        if error is None:
+                            experiment.exp_id = state['n_experiments']
+                            pickle.dump(experiment, db)
+                            state['n_experiments'] += 1
+                        else:
+                            log.write((json.dumps({'file': f, 'error': error}) + '\n').encode())
+                            state['n_quarantined'] += 1
+                    _fsync(db)
+                    _fsync(log)
+                    state['database_size'] = db.tell()
+                    state['quarantine_size'] = log.tell()
+                state['position'] = start + len(batch)
+                _write_checkpoint(checkpoint, state)
+                reporter.update(len(batch))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        reporter.close()
+
+        state['complete'] = True
+        _write_checkpoint(checkpoint, state)
+        record['items'] = state['n_experiments']
+
+    print(f"Finished! {state['n_experiments']} experiments written to {database}, "
+          f"{state['n_quarantined']} files quarantined in {quarantine_log}.")
+    return load_quarantine(quarantine_log)
+
+
+def walk_exfortables(path, include=None, exclude=EXFORTABLES_EXCLUDE_FILES, exclude_dirs=EXFORTABLES_EXCLUDE_DIRS,
+                     min_depth=2, max_depth=3, leaf_only=True, cache=None):
+    """
+    Finds the experiment files of an EXFORTABLES directory tree with a single scan of every directory.
+
+    The tree is walked with `os.scandir`, whose entries already know whether they are files or directories, so no
+    extra `stat` call is made per entry. With the default options the selected files are the ones historically
+    read by `read_proton_experiments_from_exfortables`: files two or three directories below the root
+    ('target/subdirectory/file' or 'target/subdirectory/subsubdirectory/file'), outside subdirectories ending with
+    'list', not ending with 'list' or 'ruth', and only in directories without subdirectories. These are the rules
+    of `is_exfortables_experiment`, used for archives.
+
+    Patterns are shell-style (`fnmatch`) and case sensitive. A pattern containing '/' is matched against the path
+    relative to the root, component by component: it must have as many components as the path and '*' does not
+    match across '/' (e.g. '*/*list' only matches directories one level below a target). Any other pattern is
+    matched against the file or directory name, at every depth.
+
+    Parameters:
+    -----------
+    path : str
+        Root directory of the tree.
+    include : list, optional
+        If given, only the files matching one of these patterns are selected. Default is None (all files).
+    exclude : list, optional
+        Files matching one of these patterns are skipped. Default is EXFORTABLES_EXCLUDE_FILES.
+    exclude_dirs : list, optional
+        Directories matching one of these patterns are not entered. Default is EXFORTABLES_EXCLUDE_DIRS.
+    min_depth : int, optional
+        Minimum number of directories between the root and a selected file. Default is 2.
+    max_depth : int | None, optional
+        Maximum number of directories between the root and a selected file. None for no limit. Default is 3.
+    leaf_only : bool, optional
+        If True, the files of directories that contain subdirectories (above `max_depth`) are skipped. Default is True.
+    cache : str, optional
+        File list cache: if the file exists, the list is loaded from it (see `load_file_list`) instead of walking
+        the tree; otherwise the list is saved to it after the walk. Default is None.
 
-    # Go through all directories
-    for d in dirs:
-        # Get name of all subdirectories in the path that dont end with 'list'
-        subdirs = [sd for sd in os.listdir(os.path.join(path, d)) if os.path.isdir(os.path.join(path, d, sd)) and not sd.endswith('list')]
-        # Go through all subdirectories
-        for sd in subdirs:
-            # Check if there is any subsubdirectory inside the subdirectory
-            contains_subsubdir = False
-            for item in os.scandir(os.path.join(path, d, sd)):
-                if item.is_dir():
-                    contains_subsubdir = True
-                    break
-            # If there is no subsubdirectory, then the files are in the subdirectory
-            if contains_subsubdir:
-                # Get name of all subdirectories in the path
-                subsubdirs = [ssd for ssd in os.listdir(os.path.join(path, d, sd)) if os.path.isdir(os.path.join(path, d, sd, ssd))]
-                # Go through all subdirectories
-                for ssd in subsubdirs:
-                    # Get the name of all the files which dont end with 'list' or 'ruth'
-                    files = [f for f in os.listdir(os.path.join(path, d, sd, ssd)) if os.path.isfile(os.path.join(path, d, sd, ssd, f)) and not f.endswith('list') and not f.endswith('ruth')]
-                    # Go through all files
-                    for f in files:
-                        # Read the experiment
-                        experiment = read_experiment(os.path.join(path, d, sd, ssd, f))
-                        # Add the experiment to the list of experiments
-                        experiments.append(experiment)
-            else:
-                # Get the name of all the files which dont end with 'list' or 'ruth'
-                files = [f for f in os.listdir(os.path.join(path, d, sd)) if os.path.isfile(os.path.join(path, d, sd, f)) and not f.endswith('list') and not f.endswith('ruth')]
-                # Go through all files
-                for f in files:
-                    # Read the experiment
-                    experiment = read_experiment(os.path.join(path, d, sd, f))
-                    # Add the experiment to the list of experiments
-                    experiments.append(experiment)
+    Returns:
+    --------
+    files : list
+        The paths of the selected files, sorted by their path relative to the root.
+
+    Example:
+    --------
+    files = walk_exfortables('EXFORTABLES/p', exclude_dirs=['*list', 'FY'], max_depth=None, cache='p_files.txt')
+    """
+    if cache is not None and os.path.exists(cache):
+        return load_file_list(cache)
+
+    def matches(patterns, name, relative):
+        parts = relative.split('/')
+        for pattern in patterns:
+            if '/' not in pattern:
+                if fnmatch.fnmatchcase(name, pattern):
+                    return True
+            elif (len(pattern.split('/')) == len(parts)
+                  and all(fnmatch.fnmatchcase(part, component) for part, component in zip(parts, pattern.split('/')))):
+                return True
+        return False
+
+    include = list(include) if include is not None else None
+    exclude = list(exclude) if exclude is not None else []
+    exclude_dirs = list(exclude_dirs) if exclude_dirs is not None else []
+
+    selected = []
+    stack = [('', 0)]           # (directory relative to the root, number of directories below the root)
+    while stack:
+        relative_dir, depth = stack.pop()
+        subdirs, dir_files = [], []
+        with os.scandir(os.path.join(path, *relative_dir.split('/')) if relative_dir else path) as entries:
+            for entry in entries:
+                relative = relative_dir + '/' + entry.name if relative_dir else entry.name
+                # Directories are only entered (and only hide the files next to them) within max_depth
+                if entry.is_dir():
+                    if max_depth is None or depth < max_depth:
+                        subdirs.append(relative)
+                        if not matches(exclude_dirs, entry.name, relative):
+                            stack.append((relative, depth + 1))
+                elif entry.is_file():
+                    dir_files.append((entry.name, relative))
+
+        if depth < min_depth or (leaf_only and subdirs):
+            continue
+        for name, relative in dir_files:
+            if include is not None and not matches(include, name, relative):
+                continue
+            if matches(exclude, name, relative):
+                continue
+            selected.append(relative)
+
+    selected.sort()
+    files = [os.path.join(path, *relative.split('/')) for relative in selected]
+
+    if cache is not None:
+        save_file_list(files, cache)
+    return files
+
+
+def save_file_list(files, filename):
+    """
+    Saves a list of files (e.g. the result of `walk_exfortables`) to a text file, one path per line.
+
+    Parameters:
+    -----------
+    files : list
+        The paths of the files.
+    filename : str
+        The name of the output text file.
+    """
+    with open(filename, 'w') as f:
+        f.write(''.join(file + '\n' for file in files))
+
+
+def load_file_list(filename):
+    """
+    Loads a list of files saved with `save_file_list`.
+
+    Parameters:
+    -----------
+    filename : str
+        The name of the text file.
+
+    Returns:
+    --------
+    files : list
+        The paths of the files.
+    """
+    with open(filename, 'r') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def is_exfortables_experiment(parts):
+    """
+    Tells whether a file of the EXFORTABLES tree is an experiment file, following the rules of
+    `read_proton_experiments_from_exfortables`.
+
+    Experiment files are at 'target/subdirectory/file' or 'target/subdirectory/subsubdirectory/file' below the
+    root, the subdirectory name does not end with 'list' and the file name does not end with 'list' or 'ruth'.
+
+    Parameters:
+    -----------
+    parts : list
+        The components of the file path relative to the root directory.
+
+    Returns:
+    --------
+    bool
+        True if the file is an experiment file.
+    """
+    return (len(parts) in (3, 4) and not parts[1].endswith('list')
+            and not parts[-1].endswith('list') and not parts[-1].endswith('ruth'))
+
+
+def _iter_archive(archive):
+    """
+    Yields (name, is_dir, read) for every member of a tar or zip archive, where `read()` returns the content of
+    a file member. Tar archives (compressed or not) are read as a stream, so `read` must be called before moving
+    to the next member. Nothing is extracted to disk.
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as z:
+            for info in z.infolist():
+                yield info.filename, info.is_dir(), (lambda info=info: z.read(info))
+    else:
+        # 'r|*' reads the archive sequentially with transparent decompression (gz, bz2, xz)
+        with tarfile.open(archive, 'r|*') as tar:
+            for member in tar:
+                if member.isdir():
+                    yield member.name, True, None
+                elif member.isfile():
+                    yield member.name, False, (lambda member=member: tar.extractfile(member).read())
+
+
+def _parse_archive_member(task):
+    """
+    Parses the content of an archive member into an Experiment object (worker of `read_proton_experiments_from_archive`).
+    """
+    name, content = task
+    start = time.perf_counter()
+    # Same newline handling as reading the file in text mode
+    text = content.decode('utf-8', errors='replace').replace('\r\n', '\n')
+    experiment = parse_experiment(text.splitlines(keepends=True), name)
+    return experiment, time.perf_counter() - start
+
+
+def read_proton_experiments_from_archive(archive, root='', processes=1, batch_size=1000, instrumentation=None, progress=True):
+    """
+    Reads all proton experiment files of a compressed EXFORTABLES archive without extracting it.
+
+    The members of a tar (.tar, .tar.gz, .tar.xz, .tar.bz2) or zip archive are streamed in order and only the
+    files selected by the rules of `read_proton_experiments_from_exfortables` (see `is_exfortables_experiment`
+    and `walk_exfortables`) are parsed, in batches of `batch_size` files, either in the current process or in a
+    pool of worker processes. Files directly below a subdirectory are parsed at the end of the archive, once it
+    is known whether the subdirectory contains subsubdirectories.
+    The experiments are returned sorted by their path relative to `root`, as the files of the directory reader,
+    so every experiment gets the same 'exp_id' (its position in the list) whether the library is read from the
+    directory or from an archive, whatever the order of the members. The member name is used as title.
+
+    Parameters:
+    ------------
+    archive : str
+        Path to the archive.
+    root : str, optional
+        Directory inside the archive that plays the role of the root directory of
+        `read_proton_experiments_from_exfortables` (e.g. 'p' for an archive created with `tar czf p.tgz p`).
+        Default is '' (the top level of the archive).
+    processes : int, optional
+        Number of processes used to parse the files. Default is 1 (parse in the current process).
+    batch_size : int, optional
+        Number of files read from the archive before they are parsed. Default is 1000.
+    instrumentation : Instrumentation, optional
+        If given, the reading is timed as the 'parse' stage and the parse time of every file is recorded.
+    progress : bool, optional
+        Whether to print the progress (at most once every few seconds). Default is True.
+
+    Returns:
+    ---------
+    experiments : list
+        A list of Experiment objects containing data read from the archive.
+
+    Example:
+    --------
+    experiments = read_proton_experiments_from_archive('EXFORTABLES_p.tar.xz', root='p', processes=8)
+    """
+
+    prefix = [part for part in root.replace('\\', '/').split('/') if part]
+    parsed = []                 # (relative parts, experiment) of every parsed file
+    with_subdirs = set()        # Subdirectories that contain subsubdirectories
+    pending = []                # Files next to subsubdirectories or not, only known at the end of the archive
+    batch = []
+
+    executor = ProcessPoolExecutor(max_workers=processes) if processes is not None and processes > 1 else None
+    reporter = ProgressReporter(None, 'Reading experiments', enabled=progress)
+
+    def parse_batch(batch):
+        tasks = [(name, content) for _, name, content in batch]
+        if executor is None:
+            results = [_parse_archive_member(task) for task in tasks]
+        else:
+            results = list(executor.map(_parse_archive_member, tasks, chunksize=max(1, len(tasks) // (4 * processes))))
+        for (parts, name, _), (experiment, seconds) in zip(batch, results):
+            parsed.append((parts, experiment))
+            if instrumentation is not None: instrumentation.record_file(name, seconds)
+        reporter.update(len(batch))
+
+    def add(member):
+        batch.append(member)
+        if len(batch) >= batch_size:
+            parse_batch(batch)
+            batch.clear()
+
+    with optional_stage(instrumentation, 'parse') as record:
+        try:
+            for name, is_dir, read in _iter_archive(archive):
+                parts = [part for part in name.split('/') if part and part != '.']
+                if parts[:len(prefix)] != prefix:
+                    continue
+                parts = parts[len(prefix):]
+                # Remember which subdirectories contain subsubdirectories
+                if len(parts) >= (3 if is_dir else 4):
+                    with_subdirs.add(tuple(parts[:2]))
+                if is_dir or not is_exfortables_experiment(parts):
+                    continue
+                if len(parts) == 3:
+                    pending.append((parts, name, read()))
+                else:
+                    add((parts, name, read()))
+            # As in the directory reader, the files next to subsubdirectories are not read
+            for member in pending:
+                if tuple(member[0][:2]) not in with_subdirs:
+                    add(member)
+            pending.clear()
+            if batch:
+                parse_batch(batch)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        reporter.close()
+
+        # Same order as the directory reader (see walk_exfortables), not the order of the members
+        parsed.sort(key=lambda item: '/'.join(item[0]))
+        experiments = []
+        for _, experiment in parsed:
+            experiment.exp_id = len(experiments)
+            experiments.append(experiment)
+        record['items'] = len(experiments)
+
+    return experiments
+
+
+def assign_experiment_ids(experiments):
+    """
+    Gives a compact integer id ('exp_id') to the experiments that do not have one yet.
+
+    Experiments without an id (e.g. loaded from databases written before ids existed) get their position in
+    the list, which matches the ids assigned by `read_proton_experiments_from_exfortables` for a full database.
+
+    Parameters:
+    ------------
+    experiments : list
+        A list of Experiment objects. They are modified in place.
+
+    Returns:
+    ---------
+    experiments : list
+        The same list of experiments.
+    """
+    for position, experiment in enumerate(experiments):
+        if getattr(experiment, 'exp_id', None) is None:
+            experiment.exp_id = position
     return experiments
 
 
+def build_experiment_index(experiments):
+    """
+    Builds a lookup array from experiment id to Experiment object.
+
+    Outliers and classified groups carry the 'exp_id' of every point, so the experiment of any point is found
+    with `index[exp_id]` (and the point itself with `index[exp_id].data.iloc[point_index]`) instead of
+    searching the list by X4_ID, which is not unique.
+
+    Parameters:
+    ------------
+    experiments : list
+        A list of Experiment objects with an 'exp_id'.
+
+    Returns:
+    ---------
+    index : np.ndarray
+        Object array of length max(exp_id) + 1 with the experiment of every id (None for unused ids).
+
+    Raises:
+    -------
+    ValueError
+        If two experiments share an id (e.g. lists combined from two databases). Use `assign_experiment_ids` on
+        experiments without ids or renumber them before building the index.
+
+    Example:
+    --------
+    index = build_experiment_index(experiments)
+    experiment = index[outliers_df['exp_id'].iloc[0]]
+    """
+    assign_experiment_ids(experiments)
+    ids = np.array([experiment.exp_id for experiment in experiments], dtype=np.int64)
+    unique_ids, counts = np.unique(ids, return_counts=True)
+    if np.any(counts > 1):
+        duplicated = unique_ids[counts > 1]
+        raise ValueError('{} experiment ids are shared by several experiments (e.g. {}). The experiment ids must be '
+                         'unique to build the index.'.format(len(duplicated), duplicated[:5].tolist()))
+    index = np.empty(ids.max() + 1 if len(ids) else 0, dtype=object)
+    for exp_id, experiment in zip(ids, experiments):
+        index[exp_id] = experiment
+    return index
+
+
 def filter_experiments(experiments, attribute, value):
     """
     Filters a list of Experiment objects based on the specified attribute and its value.
@@ -653,12 +1506,13 @@ def get_unique_values(experiments, attribute):
     return unique_values
 
 
-def clean_dataframe(df, uncertainties=False):
+def clean_dataframe(df, uncertainties=False, instrumentation=None):
     """
     Cleans a DataFrame by removing redundant columns for analysis.
 
     This function eliminates all columns with only one unique value and, 
     if the `uncertainties` flag is False, all columns starting with 'd'.
+    The identification columns (X4_ID, exp_id and point_index) are always kept.
 
     Parameters:
     -----------
@@ -666,6 +1520,8 @@ def clean_dataframe(df, uncertainties=False):
         The DataFrame to be cleaned.
     uncertainties : bool, optional
         Whether to retain columns that start with 'd'. Default is False.
+    instrumentation : Instrumentation, optional
+        If given, the cleaning is timed as the 'clean' stage.
 
     Returns:
     --------
@@ -680,15 +1536,17 @@ def clean_dataframe(df, uncertainties=False):
     ------
     - The function relies on pandas for DataFrame operations.
     """
-    # Drop the columns which heading starts with 'd'
-    if not uncertainties: df = df.drop([col for col in df.columns if col.startswith('d')], axis=1)
-
-    # Get the number of unique values per column
-    unique_values = df.apply(lambda x: len(x.unique()))
-    # Get the columns with only one unique value
-    columns_to_drop = unique_values[unique_values == 1].index
-    # Drop the columns
-    df = df.drop(columns_to_drop, axis=1)
+    with optional_stage(instrumentation, 'clean') as record:
+        # Drop the columns which heading starts with 'd'
+        if not uncertainties: df = df.drop([col for col in df.columns if col.startswith('d')], axis=1)
+
+        # Get the number of unique values per column
+        unique_values = df.apply(lambda x: len(x.unique()))
+        # Get the columns with only one unique value (except the identification columns)
+        columns_to_drop = [col for col in unique_values[unique_values == 1].index if col not in ID_COLUMNS]
+        # Drop the columns
+        df = df.drop(columns_to_drop, axis=1)
+        record['items'] = len(df)
     # Return the cleaned dataframe
     return df
 
@@ -746,244 +1604,132 @@ def classify_experiments(experiments, attribute):
     return dfs
 
 
-def classify_experiments_by_data(experiments):
+def classify_experiments_by_data(experiments, groups=None, by='columns', instrumentation=None, progress=True,
+                                 output_dir=None):
     """
     Classifies a list of Experiment objects based on their column headers after data preparation.
     
-    The function processes each Experiment object, extracts its dataframe representation using 
-    the `prepare_data` method, and then groups these dataframes by their column headers. 
-    Each grouped dataframe is then saved as a CSV file. Finally, it prints the summary of the 
-    classification process.
+    The experiments are grouped with their data-schema signatures (recorded when the files are parsed, see the
+    Schema module), which is a metadata-only operation: the columns after data preparation only depend on the
+    column headers of the data, because `prepare_data` always adds the same attributes. The data of the selected
+    groups is then prepared with the `prepare_data` method, each group is saved as a CSV file and the summary of
+    the classification process is printed.
 
     Parameters:
     -----------
     experiments : list
         A list of Experiment objects to be classified.
+    groups : list, optional
+        Numbers of the groups to prepare and save (as printed, starting at 1). Default is None (all groups).
+        The experiments of the other groups are not modified.
+    by : str or list, optional
+        Part of the signature used to group the experiments (see `schema_key` in the Schema module). Default is
+        'columns', the column headers. Use 'signature' to also split the groups by the uncertainties with values
+        and the metadata that is set.
+    instrumentation : Instrumentation, optional
+        If given, the grouping is timed as the 'classify' stage and the data preparation and saving as the
+        'prepare' stage.
+    progress : bool, optional
+        Whether to print the progress (at most once every few seconds). Default is True.
+    output_dir : str, optional
+        Directory where the CSV files are written (created if it does not exist). Default is None (the working
+        directory).
 
     Returns:
     --------
-    None
+    grouped_dataframes : dict
+        Group number -> prepared DataFrame of the group, for the selected groups.
 
     Example:
     --------
     classify_experiments_by_data(experiment_list)
+    classify_experiments_by_data(experiment_list, groups=[1, 4])
 
     Notes:
     ------
     - Assumes each Experiment object has a `prepare_data` method that returns a DataFrame.
+    - The groups are numbered in order of first appearance, whichever groups are selected, so the same group
+      always gets the same number (and CSV file name).
     - The output grouped DataFrames are written as CSV files with a specific naming convention.
     """
-    # Dictionary to store dataframes grouped by their column headers
-    grouped_dataframes = {}
-        
     total_experiments = len(experiments)
     print(f"Processing {total_experiments} experiments...")
-        
-    for idx, experiment in enumerate(experiments, start=1):
-        print(f"Processing experiment {idx} out of {total_experiments}...")
-            
-        # Prepare the data
-        df = experiment.prepare_data()
-            
-        # Create a key based on the column headers
-        key = tuple(df.columns)
-            
-        # If the key already exists in the dictionary, concatenate the dataframe. Otherwise, create a new entry.
-        if key in grouped_dataframes:
-            grouped_dataframes[key] = pd.concat([grouped_dataframes[key], df], axis=0)
-        else:
-            grouped_dataframes[key] = df
-        
-    # Display the detected groups of headers on the screen
-    group_number = 1
-    for key in grouped_dataframes.keys():
-        print(f"\nGroup {group_number}:")
-        print(", ".join(key))
-        print("="*50)
-        group_number += 1
-
-    # Save each grouped dataframe to a CSV file
-    total_groups = len(grouped_dataframes)
-    print(f"\nSaving {total_groups} grouped dataframes to CSV files...")
-    for idx, (key, df) in enumerate(grouped_dataframes.items(), start=1):
-        filename = f"EXFOR_ProtonReactions_Classified_Group_{idx}.csv"
-        df.to_csv(filename, index=False)
-        print(f"Group {idx}'s dataframe saved as {filename}")
-
-    print(f"\nFinished! {len(grouped_dataframes)} groups of experiments found based on column headers.")
-
-    
-
-def plot_experiments(experiments, xlog=False, ylog=False, fig_size=(9,6)):
-    """
-    Plots a list of experiments using matplotlib and seaborn libraries.
-
-    The function accepts a list of experiment objects and plots them on a 2D graph based on
-    their data attributes. It can plot with or without error bars along the x and y axes.
-    Additionally, it supports logarithmic scaling for both axes and allows figure size customization.
-
-    Parameters:
-    -----------
-    experiments : list
-        A list of experiment objects to be plotted. Each object should have a 'data' attribute 
-        which is a pandas DataFrame containing the relevant data.
-    xlog : bool, optional
-        A flag to specify if the x-axis should be logarithmic. Default is False.
-    ylog : bool, optional
-        A flag to specify if the y-axis should be logarithmic. Default is False.
-    fig_size : tuple, optional
-        The dimensions of the figure to be plotted. Default is (9, 6).
 
-    Returns:
-    --------
-    None : 
-        The function does not return anything; it generates and displays the plot.
+    with optional_stage(instrumentation, 'classify') as record:
+        # Group the positions of the experiments in the list by signature and number the groups. Positions are
+        # used instead of the ids, which are not unique in lists combined from several databases
+        assign_experiment_ids(experiments)
+        registry = SchemaRegistry()
+        for position, experiment in enumerate(experiments):
+            registry.add(position, get_schema(experiment))
+        classified = dict(enumerate(registry.groups(by).values(), start=1))
+        record['items'] = total_experiments
+
+    selected = list(classified) if groups is None else [number for number in groups if number in classified]
+    missing = [] if groups is None else [number for number in groups if number not in classified]
+    if missing:
+        print(f"Groups {missing} not found. There are {len(classified)} groups.")
+
+    # Dictionary to store the prepared dataframe of every selected group
+    grouped_dataframes = {}
+    n_selected = sum(len(classified[number]) for number in selected)
+    reporter = ProgressReporter(n_selected, 'Processing experiments', enabled=progress)
 
-    Example:
-    --------
-    plot_experiments([experiment1, experiment2], xlog=True, ylog=False, fig_size=(10,8))
+    with optional_stage(instrumentation, 'prepare') as record:
+        for number in selected:
+            # Prepare the data of the experiments of the group and concatenate them once
+            frames = []
+            for position in classified[number]:
+                frames.append(experiments[position].prepare_data())
+                reporter.update()
+            grouped_dataframes[number] = pd.concat(frames, axis=0)
+        reporter.close()
+        _save_classified_groups(grouped_dataframes, len(classified), output_dir)
+        record['items'] = n_selected
 
-    Notes:
-    ------
-    - The function first validates that all experiments have the same DataFrame columns.
-    - The plotting accounts for possible error attributes in the x and y axes.
-    - The resulting plot can be customized through optional parameters like `xlog`, `ylog`, and `fig_size`.
-    """
-    
-    # First, check if there are experiments to plot
-    if not experiments:
-        print('No experiments to plot')
-        return
-    
-    # Then, verify that all dataframes have the same headers
-    headers = list(experiments[0].data.columns.values)
-    for experiment in experiments[1:]:
-        if list(experiment.data.columns.values) != headers:
-            print('Mismatch in headers between experiments.')
-            return
-    
-    # Now proceed to set up and plot each experiment
-    plt.figure(figsize=fig_size)
-    for experiment in experiments:
-        data = experiment.data
-        y_err = data.iloc[:,2].isnull().values.all() or data.iloc[:,2].eq(0).all()
-        x_err = data.iloc[:,3].isnull().values.all() or data.iloc[:,3].eq(0).all()
-        
-        # Depending on y_err and x_err, we decide how to plot
-        if y_err == False and x_err == False:
-            plt.errorbar(x=data[headers[0]], y=data[headers[1]], 
-                        xerr=data[headers[3]], yerr=data[headers[2]],
-                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-        elif y_err == False:
-            plt.errorbar(x=data[headers[0]], y=data[headers[1]], yerr=data[headers[2]], 
-                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-        elif x_err == False:
-            plt.errorbar(x=data[headers[0]], y=data[headers[1]], xerr=data[headers[3]], 
-                        fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-        else:
-            sns.scatterplot(x=headers[0], y=headers[1], data=data, label=experiment.X4_ID)
-    
-    # Set scale, labels, title, and display the plot
-    if xlog: plt.xscale('log')
-    if ylog: plt.yscale('log')
-    
-    plt.xlabel(headers[0], fontsize=16, labelpad=10)
-    plt.ylabel(headers[1], fontsize=16, labelpad=10)
-    plt.xticks(fontsize=14)
-    plt.yticks(fontsize=14)
-    plt.legend()
-    plt.show()
+    return grouped_dataframes
 
 
-def plot_outliers(outliers_df, experiments, xlog=False, ylog=False, fig_size=(9,6)):
+def _save_classified_groups(grouped_dataframes, total_groups, output_dir=None):
     """
-    Plots outliers along with their corresponding experiments using matplotlib and seaborn libraries.
-
-    The function accepts a DataFrame containing outlier data and a list of experiment objects.
-    It plots these outliers and the normal data on a 2D graph. Both outlier and normal data points
-    can be visualized with or without error bars along the x and y axes. Logarithmic scaling for both axes
-    and figure size customization are also supported.
-
-    Parameters:
-    -----------
-    outliers_df : pd.DataFrame
-        A DataFrame containing the outlier data points. Should have an 'X4_ID' column which matches the experiment IDs.
-    experiments : list
-        A list of experiment objects to be plotted. Each object should have a 'data' attribute which is a pandas DataFrame.
-    xlog : bool, optional
-        A flag to specify if the x-axis should be logarithmic. Default is False.
-    ylog : bool, optional
-        A flag to specify if the y-axis should be logarithmic. Default is False.
-    fig_size : tuple, optional
-        The dimensions of the figure to be plotted. Default is (9, 6).
-
-    Returns:
-    --------
-    None :
-        The function does not return anything; it generates and displays the plot.
-
-    Example:
-    --------
-    plot_outliers(outliers_dataframe, [experiment1, experiment2], xlog=True, ylog=False, fig_size=(10,8))
-
-    Notes:
-    ------
-    - The function first identifies the DataFrame columns that are specific to outliers, not present in normal data.
-    - It then groups outliers based on these specific columns before plotting.
-    - Normal data and outliers from the same experiment are plotted together for better visualization.
+    Prints the groups prepared by `classify_experiments_by_data` and saves each of them to a CSV file in
+    `output_dir` (the working directory if None).
     """
+    # Display the detected groups of headers on the screen
+    for number, df in grouped_dataframes.items():
+        print(f"\nGroup {number}:")
+        print(", ".join(df.columns))
+        print("="*50)
 
-    # Get the column names from the 'data' attribute of a corresponding experiment
-    example_experiment = next(experiment for experiment in experiments if experiment.X4_ID in outliers_df['X4_ID'].tolist())
-    data_columns = example_experiment.data.columns.values.tolist()
+    # Save each grouped dataframe to a CSV file
+    print(f"\nSaving {len(grouped_dataframes)} grouped dataframes to CSV files...")
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    for number, df in grouped_dataframes.items():
+        filename = f"EXFOR_ProtonReactions_Classified_Group_{number}.csv"
+        if output_dir is not None:
+            filename = os.path.join(output_dir, filename)
+        df.to_csv(filename, index=False)
+        print(f"Group {number}'s dataframe saved as {filename}")
 
-    # Get columns from outliers_df that are not in 'data' and are also not 'X4_ID'
-    groupby_columns = [col for col in outliers_df.columns if col not in data_columns and col != 'X4_ID']
+    print(f"\nFinished! {total_groups} groups of experiments found based on column headers.")
 
-    grouped_outliers = outliers_df.groupby(groupby_columns)
 
-    print('Grouped outliers according to columns: {}'.format(groupby_columns))
+# Plotting functions moved to EXFOR_ProtonReactions_Plotting. They are imported on first use so that importing this
+# module (e.g. in worker processes or command line tools that only parse, store or query data) does not load
+# matplotlib and seaborn.
+PLOTTING_FUNCTIONS = ['plot_experiments', 'group_outliers', 'plot_outlier_group', 'plot_outliers']
 
-    for _, group in grouped_outliers:
-        plt.figure(figsize=fig_size)
-        x4_ids = group['X4_ID'].tolist()
 
-        # Add a legend entry for the outliers without actually plotting them
-        plt.scatter([], [], color='red', s=50, label='Outliers', marker='x')
+def __getattr__(name):
+    """
+    Imports the plotting functions from EXFOR_ProtonReactions_Plotting on first access.
+    """
+    if name in PLOTTING_FUNCTIONS:
+        import EXFOR_ProtonReactions_Plotting
+        return getattr(EXFOR_ProtonReactions_Plotting, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
-        for experiment in experiments:
-            if experiment.X4_ID in x4_ids:
-                data = experiment.data
-                headers = list(data.columns.values)
-
-                y_err = not (data.iloc[:,2].isnull().values.all() or data.iloc[:,2].eq(0).all())
-                x_err = not (data.iloc[:,3].isnull().values.all() or data.iloc[:,3].eq(0).all())
-
-                # Plot normal data
-                if y_err and x_err:
-                    plt.errorbar(x=data[headers[0]], y=data[headers[1]], 
-                                xerr=data[headers[3]], yerr=data[headers[2]],
-                                fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-                elif y_err:
-                    plt.errorbar(x=data[headers[0]], y=data[headers[1]], yerr=data[headers[2]], 
-                                fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-                elif x_err:
-                    plt.errorbar(x=data[headers[0]], y=data[headers[1]], xerr=data[headers[3]], 
-                                fmt='o', ecolor='black', capsize=3, elinewidth=1,  markersize=5, label=experiment.X4_ID)
-                else:
-                    plt.scatter(x=data[headers[0]], y=data[headers[1]], s=25, label=experiment.X4_ID)
 
-        # Actually plot the outliers
-        for experiment in experiments:
-            if experiment.X4_ID in x4_ids:
-                specific_outliers = outliers_df[outliers_df['X4_ID'] == experiment.X4_ID]
-                plt.scatter(specific_outliers[headers[0]], specific_outliers[headers[1]], color='red', s=50, zorder=3, marker='x')
-
-        if xlog: plt.xscale('log')
-        if ylog: plt.yscale('log')
-        plt.xlabel(headers[0], fontsize=16, labelpad=10)
-        plt.ylabel(headers[1], fontsize=16, labelpad=10)
-        plt.xticks(fontsize=14)
-        plt.yticks(fontsize=14)
-        plt.legend()
-        plt.show()
\ No newline at end of file
+def __dir__():
+    return sorted(list(globals()) + PLOTTING_FUNCTIONS)
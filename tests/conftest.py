@@ -0,0 +1,119 @@
+"""
+Shared pytest configuration: the EXFOR_ProtonReactions_*.py modules live at the root of the repository, and the
+factories of synthetic experiments and EXFORTABLES trees are shared by the test modules as fixtures.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EXFOR_ProtonReactions_Experiment_Class import Experiment
+
+
+def _make_experiment(energies, xs, dxs=None, exp_id=None, x4_id=None, MT=4, reaction='(p,n)'):
+    """
+    Experiment with the given points. Without dxs the data has only the E and xs columns.
+    """
+    experiment = Experiment()
+    experiment.exp_id = exp_id
+    experiment.X4_ID = x4_id if x4_id is not None else 'E{:04d}'.format(exp_id or 0)
+    experiment.title = experiment.X4_ID
+    experiment.MT = MT
+    experiment.reaction = reaction
+    data = {'E': energies, 'xs': xs}
+    if dxs is not None:
+        data.update({'dxs': dxs, 'dE': np.nan})
+    experiment.data = pd.DataFrame(data)
+    return experiment
+
+
+def _peaked_cross_section(energies):
+    return 100 * np.exp(-0.5 * ((np.log(energies) - 3) / 0.8)**2) + 1e-3
+
+
+def _make_peaked_experiment(energies, factor=1.0, relative_uncertainty=0.03, noise=0.03, rng=None, **kwargs):
+    """
+    Experiment of a peaked (log-normal in E) excitation function with multiplicative noise.
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    energies = np.sort(np.asarray(energies, dtype=float))
+    xs = factor * _peaked_cross_section(energies) * rng.lognormal(0, noise, len(energies))
+    return _make_experiment(energies, xs, relative_uncertainty * xs, **kwargs)
+
+
+def _make_channel(factors, n_points=40, seed=0):
+    """
+    One peaked experiment per normalization factor, with random energies in the same range.
+    """
+    rng = np.random.default_rng(seed)
+    return [_make_peaked_experiment(rng.uniform(2, 150, n_points), factor, rng=rng, exp_id=exp_id)
+            for exp_id, factor in enumerate(factors)]
+
+
+HEADER = """# Header      :
+# Target Z    :  26
+# Target A    :  56
+# Target state:
+# Projectile  : p
+# Reaction    : (p,n)
+# E-inc       :
+# Final Z     :  27
+# Final A     :  56
+# Final state :
+# MTrat       :
+# Ratio isomer:
+# Quantity    : Cross section
+# Frame       : L
+# MF          : 3
+# MT          : 5
+# X4 ID       : A{number:04d}002
+# X4 code     : code
+# Author      : Someone
+# Year        : {year}
+# Data points : {n}
+#            E            xs           dxs            dE
+"""
+
+
+def _make_exfortables_tree(root, n_files=12, broken=(4,), seed=0):
+    """
+    Writes an EXFORTABLES-like tree of experiment files. The files in `broken` cannot be parsed.
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(n_files):
+        directory = os.path.join(root, 'Fe056', 'p,n' if i % 2 else 'p,x')
+        os.makedirs(directory, exist_ok=True)
+        n = int(rng.integers(3, 10))
+        E, xs = np.sort(rng.uniform(1, 100, n)), rng.lognormal(0, 1, n)
+        with open(os.path.join(directory, 'p-Fe056-MT005-E{:03d}.X{}'.format(i, 1000 + i)), 'w') as f:
+            if i in broken:
+                f.write('1.0 2.0\n')
+                continue
+            f.write(HEADER.format(number=i, year=1990 + i, n=n))
+            for j in range(n):
+                f.write('{:.6e} {:.6e} {:.6e} {:.6e}\n'.format(E[j], xs[j], 0.1 * xs[j], 0.01 * E[j]))
+            f.write('# Reference   :\n# Some ref\n#\n')
+
+
+@pytest.fixture
+def make_experiment():
+    return _make_experiment
+
+
+@pytest.fixture
+def make_peaked_experiment():
+    return _make_peaked_experiment
+
+
+@pytest.fixture
+def make_channel():
+    return _make_channel
+
+
+@pytest.fixture
+def make_exfortables_tree():
+    return _make_exfortables_tree
@@ -0,0 +1,32 @@
+"""
+Tests of the reading of compressed EXFORTABLES archives (read_proton_experiments_from_archive in
+EXFOR_ProtonReactions_UtilityFunctions).
+"""
+
+import os
+import shutil
+import tarfile
+import EXFOR_ProtonReactions_UtilityFunctions as uf
+
+
+def test_archive_members_are_selected_before_parsing(tmp_path, make_exfortables_tree):
+    tree = str(tmp_path / 'p')
+    make_exfortables_tree(tree, broken=())
+    # A subdirectory with a subsubdirectory: its own files (here not even an experiment) are not read
+    make_exfortables_tree(str(tmp_path / 'nested'), n_files=2, broken=())
+    nested = os.path.join(tree, 'Fe056', 'p,g')
+    shutil.copytree(os.path.join(str(tmp_path / 'nested'), 'Fe056', 'p,n'), os.path.join(nested, 'p,n'))
+    with open(os.path.join(nested, 'README'), 'w') as f:
+        f.write('not an experiment\n')
+    archive = str(tmp_path / 'p.tgz')
+    # Files before the directories that hide them
+    with tarfile.open(archive, 'w:gz') as tar:
+        tar.add(os.path.join(nested, 'README'), arcname='p/Fe056/p,g/README')
+        tar.add(tree, arcname='p')
+
+    experiments = uf.read_proton_experiments_from_archive(archive, root='p', batch_size=2, progress=False)
+    reference = uf.read_proton_experiments_from_exfortables(tree, progress=False)
+
+    assert len(experiments) == len(reference) == 13
+    assert [e.exp_id for e in experiments] == list(range(13))
+    assert all(a.data.equals(b.data) for a, b in zip(experiments, reference))
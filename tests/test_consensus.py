@@ -0,0 +1,99 @@
+"""
+Tests of the channel consensus and leave-one-out residuals (EXFOR_ProtonReactions_Consensus).
+"""
+
+import numpy as np
+from EXFOR_ProtonReactions_Consensus import compute_channel_consensus
+
+
+def make_sine_channel(make_experiment, n_experiments=4, seed=0):
+    rng = np.random.default_rng(seed)
+    experiments = []
+    for exp_id in range(n_experiments):
+        # Partially overlapping ranges, so that some points have fewer peers than others
+        low = rng.uniform(1, 20)
+        energies = rng.uniform(low, low + 40, rng.integers(8, 20))
+        xs = 50 + 10 * np.sin(energies / 7) + rng.normal(0, 2, len(energies))
+        experiments.append(make_experiment(energies, xs, rng.uniform(0.5, 3, len(energies)), exp_id=exp_id))
+    return experiments
+
+
+def consensus_at(residuals, exp_id, x):
+    return residuals[(residuals['exp_id'] == exp_id) & (residuals['x'] == x)]['consensus'].to_numpy()
+
+
+def test_residuals_use_the_leave_one_out_weighted_mean(make_experiment):
+    experiments = make_sine_channel(make_experiment)
+    _, residuals = compute_channel_consensus(experiments)
+
+    for row in residuals.itertuples():
+        sum_w = sum_wy = 0.0
+        n_others = 0
+        for other in experiments:
+            data = other.data.sort_values('E')
+            if other.exp_id == row.exp_id or not data['E'].iloc[0] <= row.x <= data['E'].iloc[-1]:
+                continue
+            w = 1 / np.interp(row.x, data['E'], data['dxs'])**2
+            sum_w += w
+            sum_wy += w * np.interp(row.x, data['E'], data['xs'])
+            n_others += 1
+        if n_others:
+            assert np.isclose(row.consensus, sum_wy / sum_w)
+            assert np.isclose(row.consensus_unc, 1 / np.sqrt(sum_w))
+            assert row.n_experiments == n_others
+        else:
+            assert np.isnan(row.consensus)
+            assert row.n_experiments == 0
+
+
+def test_a_point_does_not_pull_its_own_consensus(make_experiment):
+    experiments = make_sine_channel(make_experiment, seed=1)
+    _, residuals = compute_channel_consensus(experiments)
+    experiments[0].data.loc[0, 'xs'] *= 100
+    _, shifted = compute_channel_consensus(experiments)
+
+    own = (shifted['exp_id'] == 0).to_numpy()
+    assert np.allclose(shifted['consensus'][own], residuals['consensus'][own], equal_nan=True)
+    assert not np.allclose(shifted['consensus'][~own], residuals['consensus'][~own], equal_nan=True)
+
+
+def test_missing_uncertainty_only_changes_its_own_point(make_experiment):
+    energies = [0.0, 1.0, 2.0]
+    experiments = [make_experiment(energies, [100.0] * 3, [5.0, np.nan, 5.0], exp_id=0),
+                   make_experiment(energies, [20.0] * 3, [2.0] * 3, exp_id=1),
+                   make_experiment(energies, [30.0] * 3, [3.0] * 3, exp_id=2)]
+    _, residuals = compute_channel_consensus(experiments)
+
+    # The missing dxs is 10% of the value only at its own point, the neighbours keep their dxs
+    assert np.allclose(consensus_at(residuals, 0, 1.0), (20 / 4 + 30 / 9) / (1 / 4 + 1 / 9))
+    assert np.allclose(consensus_at(residuals, 1, 1.0), (100 / 100 + 30 / 9) / (1 / 100 + 1 / 9))
+    assert np.allclose(consensus_at(residuals, 1, 0.0), (100 / 25 + 30 / 9) / (1 / 25 + 1 / 9))
+    experiments[0].data.loc[1, 'dxs'] = 10.0
+    _, explicit = compute_channel_consensus(experiments)
+    assert np.allclose(residuals['consensus'], explicit['consensus'])
+    assert np.array_equal(residuals['n_experiments'], explicit['n_experiments'])
+
+
+def test_repeated_abscissas_are_merged_per_experiment(make_experiment):
+    experiments = [make_experiment([1.0, 2.0, 2.0, 3.0], [10.0, 10.0, 50.0, 10.0], [1.0] * 4, exp_id=0),
+                   make_experiment([1.0, 2.0, 3.0], [20.0] * 3, [1.0] * 3, exp_id=1),
+                   make_experiment([1.0, 2.0, 3.0], [40.0] * 3, [1.0] * 3, exp_id=2)]
+    curves, residuals = compute_channel_consensus(experiments)
+
+    # Both repeated points see only the other experiments, which see their weighted mean (30 with weight 2)
+    assert np.allclose(consensus_at(residuals, 0, 2.0), [30.0, 30.0])
+    assert np.allclose(consensus_at(residuals, 1, 2.0), (2 * 30 + 40) / 3)
+    assert np.allclose(consensus_at(residuals, 2, 2.0), (2 * 30 + 20) / 3)
+    assert np.allclose(curves[curves['x'] == 2.0]['consensus'], (2 * 30 + 20 + 40) / 4)
+    assert (residuals[residuals['x'] == 2.0]['n_experiments'] == 2).all()
+
+
+def test_single_experiment_channels_have_no_residuals(make_experiment):
+    experiments = make_sine_channel(make_experiment, n_experiments=3, seed=2)
+    experiments.append(make_experiment([5.0, 10.0, 20.0], [1.0, 2.0, 3.0], [0.1, 0.1, 0.1], exp_id=3, MT=5))
+    _, residuals = compute_channel_consensus(experiments)
+
+    alone = residuals[residuals['exp_id'] == 3]
+    assert len(alone) == 3
+    assert alone['residual'].isna().all()
+    assert (alone['n_experiments'] == 0).all()
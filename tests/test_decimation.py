@@ -0,0 +1,82 @@
+"""
+Tests of the LTTB and min/max decimation of the plots (EXFOR_ProtonReactions_Decimation).
+"""
+
+import numpy as np
+from EXFOR_ProtonReactions_Decimation import lttb_indices, minmax_indices, decimate
+
+
+def reference_lttb(x, y, n_out):
+    """
+    Straightforward Largest-Triangle-Three-Buckets, with the buckets of the original description.
+    """
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        if i == n_out - 3:
+            end = n - 1
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            next_end = n - 1 if i + 1 == n_out - 3 else int(np.floor((i + 2) * every)) + 1
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        best, best_area = None, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def make_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(0, 100, n))
+    return x, np.sin(x / 5) + rng.normal(0, 0.3, n)
+
+
+def test_lttb_matches_the_reference_algorithm():
+    for n, n_out in [(1000, 50), (1001, 3), (257, 100), (10000, 777)]:
+        x, y = make_series(n, seed=n_out)
+        selected = lttb_indices(x, y, n_out)
+        assert len(selected) == n_out
+        assert selected[0] == 0 and selected[-1] == n - 1
+        assert np.all(np.diff(selected) > 0)
+        assert np.array_equal(selected, reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_short_series():
+    x, y = make_series(10)
+    assert np.array_equal(lttb_indices(x, y, 10), np.arange(10))
+    assert np.array_equal(lttb_indices(x, y, 50), np.arange(10))
+
+
+def test_minmax_keeps_the_extremes_of_every_bin():
+    x, y = make_series(5000, seed=3)
+    n_bins = 40
+    selected = minmax_indices(x, y, n_bins)
+
+    bins = np.minimum(((x - x[0]) / (x[-1] - x[0]) * n_bins).astype(int), n_bins - 1)
+    expected = {0, len(x) - 1}
+    for b in np.unique(bins):
+        members = np.flatnonzero(bins == b)
+        expected |= {members[np.argmin(y[members])], members[np.argmax(y[members])]}
+    assert np.array_equal(selected, sorted(expected))
+    assert len(selected) <= 2 * n_bins + 2
+
+
+def test_decimate_keeps_flagged_points_and_drops_undrawable_ones():
+    x, y = make_series(3000, seed=4)
+    y = np.abs(y) + 0.01
+    y[10] = -1.0                # Not drawable on a logarithmic axis
+    keep = np.zeros(len(x), dtype=bool)
+    keep[[5, 1500, 2999]] = True
+    for method in ['lttb', 'minmax']:
+        selected = decimate(x, y, 200, method=method, keep=keep, ylog=True)
+        assert len(selected) <= 200
+        assert {5, 1500, 2999} <= set(selected)
+        assert 10 not in selected
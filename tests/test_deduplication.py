@@ -0,0 +1,61 @@
+"""
+Tests of the exact and MinHash near-duplicate detection (EXFOR_ProtonReactions_Deduplication).
+"""
+
+import numpy as np
+import pandas as pd
+from EXFOR_ProtonReactions_Deduplication import minhash_signatures, find_duplicates
+
+
+def make_database(make_experiment, seed=0):
+    rng = np.random.default_rng(seed)
+    energies = np.sort(rng.uniform(2, 100, 50))
+    xs = rng.lognormal(3, 1, 50)
+    extra = np.sort(rng.uniform(100, 150, 3))
+    points = [
+        ('ORIG', 4, energies, xs),
+        # Same points in another order plus three more: near duplicate (Jaccard 50/53), kept as it is longer
+        ('LONGER', 4, np.concatenate((energies[::-1], extra)), np.concatenate((xs[::-1], [5, 6, 7]))),
+        # Same points: exact duplicate
+        ('COPY', 4, energies.copy(), xs.copy()),
+        # Renormalized copy: only a duplicate with scale_invariant
+        ('RENORM', 4, energies, 1.37 * xs),
+        # Other measurement of the same reaction
+        ('OTHER', 4, np.sort(rng.uniform(2, 100, 50)), rng.lognormal(3, 1, 50)),
+        # Same points in another reaction channel
+        ('OTHER_MT', 5, energies, xs),
+    ]
+    return [make_experiment(x, y, exp_id=exp_id, x4_id=x4_id, MT=MT)
+            for exp_id, (x4_id, MT, x, y) in enumerate(points)]
+
+
+def test_signature_agreement_estimates_the_jaccard_index(make_experiment):
+    experiments = make_database(make_experiment)
+    signatures = minhash_signatures(experiments, n_hashes=512)
+    agreement = np.mean(signatures[0] == signatures[1])
+    assert abs(agreement - 50 / 53) < 0.05
+    assert np.mean(signatures[0] == signatures[4]) < 0.05
+    assert np.array_equal(signatures[0], signatures[2])
+
+
+def test_exact_and_near_duplicates_are_grouped_with_the_longest_experiment(make_experiment):
+    experiments = make_database(make_experiment)
+    report = find_duplicates(experiments).set_index('X4_ID')
+
+    assert report.loc['ORIG', 'kind'] == 'near' and report.loc['ORIG', 'duplicate_of'] == 1
+    assert report.loc['COPY', 'kind'] == 'near' and report.loc['COPY', 'duplicate_of'] == 1
+    assert pd.isna(report.loc['LONGER', 'kind']) and report.loc['LONGER', 'group'] == 1
+    for x4_id in ['RENORM', 'OTHER', 'OTHER_MT']:
+        assert pd.isna(report.loc[x4_id, 'kind']) and report.loc[x4_id, 'group'] == -1
+
+
+def test_exact_duplicates_without_near_search(make_experiment):
+    report = find_duplicates(make_database(make_experiment), near=False).set_index('X4_ID')
+    assert report.loc['COPY', 'kind'] == 'exact' and report.loc['COPY', 'duplicate_of'] == 0
+    assert report['kind'].notna().sum() == 1
+
+
+def test_scale_invariant_search_finds_renormalized_copies(make_experiment):
+    report = find_duplicates(make_database(make_experiment), scale_invariant=True).set_index('X4_ID')
+    assert report.loc['RENORM', 'kind'] == 'near'
+    assert pd.isna(report.loc['OTHER', 'kind'])
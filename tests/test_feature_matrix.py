@@ -0,0 +1,42 @@
+"""
+Tests of outlier detection on memory-mapped feature matrices (EXFOR_ProtonReactions_FeatureMatrix).
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import LocalOutlierFactor
+from sklearn.svm import OneClassSVM
+from EXFOR_ProtonReactions_OutlierDetection import fit_and_score
+from EXFOR_ProtonReactions_FeatureMatrix import write_feature_matrix, fit_and_score_matrix, FeatureMatrix
+
+
+def make_group(n=1500, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'exp_id': np.repeat(np.arange(15), n // 15), 'point_index': np.tile(np.arange(n // 15), 15),
+                         'X4_ID': 'A0001002', 'E': rng.lognormal(2, 1, n), 'xs': rng.lognormal(0, 1, n)})
+
+
+def test_transductive_detector_matches_the_dataframe_path(tmp_path):
+    df = make_group()
+    matrix = write_feature_matrix(df, str(tmp_path / 'group'), dtype=np.float64)
+    scores, is_outlier, fit_index = fit_and_score_matrix(matrix, LocalOutlierFactor(contamination=0.02))
+    expected_scores, expected_outliers, _ = fit_and_score(df, LocalOutlierFactor(contamination=0.02))
+
+    assert np.allclose(scores, expected_scores)
+    assert np.array_equal(is_outlier, expected_outliers)
+    assert len(fit_index) == len(df)
+
+
+def test_subsample_fit_after_scaling_in_place(tmp_path):
+    df = make_group()
+    copy = write_feature_matrix(df, str(tmp_path / 'copy'), dtype=np.float64)
+    expected = fit_and_score_matrix(copy, OneClassSVM(nu=0.02), fit_budget=300)
+    in_place = write_feature_matrix(df, str(tmp_path / 'in_place'), dtype=np.float64)
+    in_place.scale(in_place=True)
+
+    scores, is_outlier, fit_index = fit_and_score_matrix(FeatureMatrix(str(tmp_path / 'in_place')),
+                                                         OneClassSVM(nu=0.02), fit_budget=300)
+
+    assert np.array_equal(fit_index, expected[2])
+    assert np.allclose(scores, expected[0])
+    assert np.array_equal(is_outlier, expected[1])
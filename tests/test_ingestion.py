@@ -0,0 +1,80 @@
+"""
+Tests of the checkpointed, resumable ingestion (ingest_proton_experiments in EXFOR_ProtonReactions_UtilityFunctions).
+"""
+
+import os
+import pytest
+import EXFOR_ProtonReactions_UtilityFunctions as uf
+
+
+def test_interrupted_ingestion_resumes_from_the_last_checkpoint(tmp_path, monkeypatch, make_exfortables_tree):
+    tree = str(tmp_path / 'p')
+    make_exfortables_tree(tree)
+    reference_db = str(tmp_path / 'reference.bin')
+    reference_quarantine = uf.ingest_proton_experiments(tree, reference_db, batch_size=3, progress=False)
+    reference = uf.read_experiments_from_binary(reference_db)
+    assert len(reference) == 11 and len(reference_quarantine) == 1
+
+    # Interrupt the third batch, after two checkpoints
+    database = str(tmp_path / 'database.bin')
+    parse_file = uf._parse_file
+    calls = []
+
+    def interrupted(filename):
+        calls.append(filename)
+        if len(calls) == 8:
+            raise KeyboardInterrupt
+        return parse_file(filename)
+
+    monkeypatch.setattr(uf, '_parse_file', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        uf.ingest_proton_experiments(tree, database, batch_size=3, progress=False)
+    # Half-written batch after the checkpoint
+    with open(database, 'ab') as f:
+        f.write(b'partial batch')
+
+    def counted(filename):
+        calls.append(filename)
+        return parse_file(filename)
+
+    calls.clear()
+    monkeypatch.setattr(uf, '_parse_file', counted)
+    quarantine = uf.ingest_proton_experiments(tree, database, batch_size=3, progress=False)
+    resumed = uf.read_experiments_from_binary(database)
+
+    # Only the files after the last checkpoint are parsed again
+    assert calls == uf.load_file_list(database + '.checkpoint.files')[6:]
+    assert [e.title for e in resumed] == [e.title for e in reference]
+    assert [e.exp_id for e in resumed] == list(range(len(reference)))
+    assert all(a.data.equals(b.data) for a, b in zip(resumed, reference))
+    assert quarantine.equals(reference_quarantine)
+
+    # A complete ingestion is not run again
+    calls.clear()
+    uf.ingest_proton_experiments(tree, database, batch_size=3, progress=False)
+    assert calls == []
+
+
+def test_resume_without_the_database_asks_for_a_restart(tmp_path, monkeypatch, make_exfortables_tree):
+    tree = str(tmp_path / 'p')
+    make_exfortables_tree(tree)
+    database = str(tmp_path / 'database.bin')
+    parse_file = uf._parse_file
+    calls = []
+
+    def interrupted(filename):
+        calls.append(filename)
+        if len(calls) == 5:
+            raise KeyboardInterrupt
+        return parse_file(filename)
+
+    monkeypatch.setattr(uf, '_parse_file', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        uf.ingest_proton_experiments(tree, database, batch_size=3, progress=False)
+    monkeypatch.setattr(uf, '_parse_file', parse_file)
+    os.remove(database)
+
+    with pytest.raises(ValueError, match='restart=True'):
+        uf.ingest_proton_experiments(tree, database, batch_size=3, progress=False)
+    uf.ingest_proton_experiments(tree, database, batch_size=3, restart=True, progress=False)
+    assert len(uf.read_experiments_from_binary(database)) == 11
@@ -0,0 +1,84 @@
+"""
+Tests of the batched normalization-factor fit (EXFOR_ProtonReactions_Normalization).
+"""
+
+import numpy as np
+from EXFOR_ProtonReactions_PointTable import build_point_table
+from EXFOR_ProtonReactions_Consensus import build_channel_grid, sample_on_grid
+from EXFOR_ProtonReactions_Normalization import sort_grid_samples, robust_reference, fit_normalization_factors
+
+
+def test_robust_reference_is_leave_one_out_median(make_channel):
+    experiments = make_channel([1.0, 1.2, 0.9, 1.1, 1.5], n_points=15, seed=1)
+    table = build_point_table(experiments)
+    grid_x, grid_offsets = build_channel_grid(table)
+    samples = sort_grid_samples(sample_on_grid(table, grid_x, grid_offsets))
+    excluded = np.array([False, False, False, False, True])
+    reference = robust_reference(table, grid_x, grid_offsets, samples, excluded, min_experiments=1)
+
+    for point in range(len(table)):
+        exp = table.exp_index[point]
+        x = table.x[point]
+        others = []
+        for other in range(table.n_experiments):
+            start, end = table.offsets[other], table.offsets[other + 1]
+            if other == exp or excluded[other] or not table.x[start] <= x <= table.x[end - 1]:
+                continue
+            others.append(np.log(np.interp(x, table.x[start:end], table.y[start:end])))
+        if others:
+            assert reference['n_experiments'][point] == len(others)
+            assert np.isclose(reference['reference'][point], np.exp(np.median(others)))
+        else:
+            assert np.isnan(reference['reference'][point])
+
+
+def test_injected_factor_is_recovered(make_channel):
+    experiments = make_channel([1.0] * 8)
+    experiments[3].data['xs'] *= 1.7
+    experiments[3].data['dxs'] *= 1.7
+
+    report = fit_normalization_factors(experiments)
+
+    assert report['significant'].tolist() == [i == 3 for i in range(8)]
+    assert abs(report['factor'][3] - 1.7) < 3 * report['factor_unc'][3]
+    assert np.allclose(report['factor'].drop(3), 1.0, atol=0.05)
+    assert report['chi2_after'][3] < 0.1 * report['chi2_before'][3]
+
+
+def test_sparse_low_peer_does_not_drive_the_reference(make_channel, make_peaked_experiment):
+    # A 4-point peer whose chord cuts below the peak and whose tail points have small absolute dxs dominated
+    # the 1/dxs^2 weighted mean
+    experiments = make_channel([1.0] * 6)
+    sparse = make_peaked_experiment([2.0, 3.0, 150.0, 160.0], rng=np.random.default_rng(5), exp_id=len(experiments),
+                                    x4_id='SPARSE')
+    experiments[2].data['xs'] *= 2.0
+    experiments[2].data['dxs'] *= 2.0
+
+    report = fit_normalization_factors(experiments + [sparse])
+
+    assert abs(report['factor'][2] - 2.0) < 0.1
+    assert report['significant'].tolist() == [i == 2 for i in range(7)]
+
+
+def test_channels_without_enough_peers_are_not_fitted(make_channel):
+    experiments = make_channel([1.0, 2.0])
+    report = fit_normalization_factors(experiments)
+    assert report['factor'].isna().all()
+    assert not report['significant'].any()
+
+
+def test_missing_uncertainty_is_the_default_relative_uncertainty(make_channel):
+    experiments = make_channel([1.0] * 6, n_points=20)
+    experiments[3].data['xs'] *= 1.5
+    experiments[3].data['dxs'] *= 1.5
+    for experiment in experiments[:4]:
+        experiment.data.loc[[5, 12], 'dxs'] = np.nan
+    missing = fit_normalization_factors(experiments, default_relative_uncertainty=0.1)
+
+    for experiment in experiments[:4]:
+        experiment.data.loc[[5, 12], 'dxs'] = 0.1 * experiment.data.loc[[5, 12], 'xs']
+    explicit = fit_normalization_factors(experiments)
+
+    for column in ['factor', 'factor_unc', 'chi2_before', 'chi2_after']:
+        assert np.allclose(missing[column], explicit[column])
+    assert missing['significant'].tolist() == [i == 3 for i in range(6)]
@@ -0,0 +1,30 @@
+"""
+Tests of the grouping of outliers for plotting (EXFOR_ProtonReactions_Plotting).
+"""
+
+import pandas as pd
+import pytest
+from EXFOR_ProtonReactions_Plotting import group_outliers
+
+
+def make_outliers(experiments):
+    rows = [dict(experiment.data.iloc[0], exp_id=experiment.exp_id, X4_ID=experiment.X4_ID, MT=experiment.MT)
+            for experiment in experiments]
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('id_column', ['exp_id', 'X4_ID'])
+def test_outliers_of_experiments_outside_the_subset_are_dropped(make_experiment, id_column):
+    experiments = [make_experiment([1.0, 2.0], [3.0, 4.0], exp_id=exp_id, MT=4 + exp_id % 2) for exp_id in range(4)]
+    outliers = make_outliers(experiments)
+    if id_column == 'X4_ID':
+        outliers = outliers.drop(columns='exp_id')
+
+    _, groups = group_outliers(outliers, experiments[1:3])
+
+    assert sorted(key[0] if isinstance(key, tuple) else key for key, _, _ in groups) == [4, 5]
+    for _, group, group_experiments in groups:
+        assert len(group) == 1
+        assert [experiment.X4_ID for experiment in group_experiments] == group['X4_ID'].tolist()
+    with pytest.raises(ValueError, match='None of the'):
+        group_outliers(outliers.iloc[[0, 3]], experiments[1:3])
@@ -0,0 +1,95 @@
+"""
+Tests of writing the detector results to the score store (EXFOR_ProtonReactions_ScoreStore).
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import LocalOutlierFactor
+
+from EXFOR_ProtonReactions_OutlierDetection import detect_outliers, IQR_method
+from EXFOR_ProtonReactions_FeatureMatrix import write_feature_matrix, detect_outliers_in_matrix
+from EXFOR_ProtonReactions_Streaming import GroupBatchSource, detect_outliers_streaming
+from EXFOR_ProtonReactions_ScoreStore import ScoreStore, OUTLIER, INLIER
+
+
+def make_group(experiments):
+    frames = []
+    for experiment in experiments:
+        frame = experiment.data[['E', 'xs']].copy()
+        frame['MT'] = experiment.MT
+        frame['X4_ID'] = experiment.X4_ID
+        frame['exp_id'] = experiment.exp_id
+        frame['point_index'] = np.arange(len(frame))
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+    # One point far above the rest of the channel
+    df.loc[5, 'xs'] *= 1000
+    return df
+
+
+class MeanModel:
+    """
+    Stand-in for a trained autoencoder: reconstructs every row as 0.5, so the error grows with the distance.
+    """
+    def predict_on_batch(self, batch):
+        return np.full_like(batch, 0.5)
+
+
+def test_detectors_write_scores_and_verdicts_for_the_ensemble(tmp_path, make_channel):
+    experiments = make_channel([1.0, 1.0, 1.0], n_points=30)
+    df = make_group(experiments)
+    store = ScoreStore(str(tmp_path / 'scores'))
+
+    outliers_df, scores = detect_outliers(df, LocalOutlierFactor(n_neighbors=10, contamination=0.01),
+                                          store=store, method='lof')
+    iqr_outliers_df = IQR_method(df, experiments, 20, store=store)
+
+    assert len(scores) == len(df)
+    assert store.methods == ['lof', 'iqr']
+    assert len(store) == len(df)
+    verdicts = store.verdicts(['lof', 'iqr'])
+    assert verdicts[:, 0].sum() == len(outliers_df)
+    assert (verdicts[:, 1] == OUTLIER).sum() == len(iqr_outliers_df)
+    assert set(np.unique(verdicts)) <= {INLIER, OUTLIER}
+
+    consensus = store.majority_vote()
+    ranking = store.rank_aggregate()
+    assert len(consensus) == len(ranking) == len(df)
+    assert (ranking.loc[0, ['exp_id', 'point_index']].tolist() == [0, 5])
+
+
+def test_detect_outliers_on_an_empty_group_returns_no_scores():
+    df = pd.DataFrame({'E': [], 'xs': [], 'X4_ID': [], 'exp_id': [], 'point_index': []})
+    outliers_df, scores = detect_outliers(df, LocalOutlierFactor())
+    assert outliers_df.empty and len(scores) == 0
+
+
+def test_matrix_and_dataframe_paths_write_the_same_columns(tmp_path, make_channel):
+    df = make_group(make_channel([1.0, 2.0, 0.5], n_points=30))
+    store = ScoreStore(str(tmp_path / 'scores'))
+    matrix = write_feature_matrix(df[['E', 'xs', 'X4_ID', 'exp_id', 'point_index']], str(tmp_path / 'group'),
+                                  dtype=np.float64)
+
+    _, scores = detect_outliers(df[['E', 'xs', 'X4_ID', 'exp_id', 'point_index']],
+                                LocalOutlierFactor(contamination=0.02), store=store, method='lof')
+    _, matrix_scores = detect_outliers_in_matrix(matrix, LocalOutlierFactor(contamination=0.02), store=store,
+                                                 method='lof_matrix')
+
+    assert np.allclose(scores, matrix_scores)
+    assert np.allclose(store.scores(['lof']), store.scores(['lof_matrix']))
+    assert np.array_equal(store.verdicts(['lof']), store.verdicts(['lof_matrix']))
+
+
+def test_streaming_errors_are_written_for_every_row(tmp_path, make_channel):
+    df = make_group(make_channel([1.0, 1.0, 1.0], n_points=30))
+    path = str(tmp_path / 'group.csv')
+    df.to_csv(path, index=False)
+    store = ScoreStore(str(tmp_path / 'scores'))
+
+    outliers_df, threshold = detect_outliers_streaming(MeanModel(), GroupBatchSource(path, batch_size=16),
+                                                       percentile=95.0, store=store)
+
+    assert store.methods == ['autoencoder'] and len(store) == len(df)
+    scores = store.scores(['autoencoder'])[:, 0]
+    assert not np.isnan(scores).any()
+    assert (store.verdicts(['autoencoder'])[:, 0] == OUTLIER).sum() == len(outliers_df) == (scores > threshold).sum()
@@ -0,0 +1,45 @@
+"""
+Tests of the streaming quantile sketch of the reconstruction errors (EXFOR_ProtonReactions_Streaming).
+"""
+
+import numpy as np
+from EXFOR_ProtonReactions_Streaming import StreamingQuantile
+
+
+QUANTILES = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1.0]
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(-3, 2.5, 200000)
+    for accuracy in [0.01, 0.001]:
+        sketch = StreamingQuantile(accuracy)
+        for chunk in np.array_split(values, 37):
+            sketch.update(chunk)
+        for q in QUANTILES:
+            exact = np.quantile(values, q, method='lower')
+            assert abs(sketch.quantile(q) - exact) <= accuracy * exact * (1 + 1e-9)
+
+
+def test_merged_sketches_equal_a_single_sketch():
+    rng = np.random.default_rng(1)
+    parts = [rng.exponential(scale, 5000) for scale in [1e-4, 1.0, 1e3]]
+    single = StreamingQuantile()
+    single.update(np.concatenate(parts))
+    merged = StreamingQuantile()
+    for part in parts:
+        sketch = StreamingQuantile()
+        sketch.update(part)
+        merged.merge(sketch)
+
+    assert merged.count == single.count
+    assert [merged.quantile(q) for q in QUANTILES] == [single.quantile(q) for q in QUANTILES]
+
+
+def test_zeros_and_missing_values():
+    sketch = StreamingQuantile()
+    sketch.update([0.0, 0.0, 0.0, -1.0, np.nan, 2.0, 4.0, 8.0])
+    assert sketch.count == 7
+    assert sketch.quantile(0.5) == 0.0
+    assert abs(sketch.quantile(1.0) - 8.0) <= 0.001 * 8.0
+    assert np.isnan(StreamingQuantile().quantile(0.5))